@@ -1,3 +1,5 @@
+import os
+import logging
 from flask import Flask
 from backend.routes.resume import resume_api
 from backend.routes.jd import jd_api
@@ -6,9 +8,15 @@ from backend.routes.history import history_api
 from backend.routes.dashboard_resume import dashboard_resume_api
 from backend.routes.dashboard_jd import dashboard_jd_api
 from backend.routes.interview import interview_api
+from backend.routes.system import system_api
+from backend.routes.jobs import jobs_api
+from backend.utils.db_indexes import ensure_indexes, STARTUP_INDEX_TIMEOUT_SECONDS
+from backend.utils import lifecycle, tracing, provider_scheduler, write_behind
+from backend.utils.tracing import log_error
 from flask_cors import CORS
 
 def create_app():
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
     app = Flask(__name__)
     CORS(app, supports_credentials=True)
     app.secret_key = "supersecretkey"
@@ -19,4 +27,18 @@ def create_app():
     app.register_blueprint(dashboard_resume_api)
     app.register_blueprint(dashboard_jd_api)
     app.register_blueprint(interview_api)
+    app.register_blueprint(system_api)
+    app.register_blueprint(jobs_api)
+    tracing.install(app)
+    provider_scheduler.install(app)
+    lifecycle.install(app)
+    write_behind.install(app)
+
+    # indexes and backfills belong to `python -m backend.utils.db_indexes migrate`;
+    # this opt-in only builds missing indexes, briefly, for single-box setups
+    if os.getenv("DB_MIGRATE_ON_STARTUP", "0") == "1":
+        try:
+            ensure_indexes(timeout=STARTUP_INDEX_TIMEOUT_SECONDS)
+        except Exception as e:
+            log_error("index_bootstrap_failed", e)
     return app
@@ -0,0 +1,63 @@
+"""
+Throughput of the /submit-answer audio preprocessing stage over synthetic
+browser-style recordings (stereo 44.1 kHz, speech-like bursts framed by
+silence).
+
+    python -m backend.benchmarks.bench_audio_preprocess [--seconds 10 30 120] [--repeat 10]
+"""
+import io
+import time
+import wave
+import argparse
+
+import numpy as np
+
+from backend.utils.audio_preprocess import preprocess_audio
+
+SOURCE_RATE = 44100
+
+
+def synthetic_wav(seconds: float, lead_silence: float = 2.0, tail_silence: float = 3.0) -> bytes:
+    rng = np.random.default_rng(0)
+    n = int(seconds * SOURCE_RATE)
+    t = np.arange(n) / SOURCE_RATE
+    # 180 Hz "voice" with 4 Hz syllable envelope plus a little room noise
+    voice = 0.3 * np.sin(2 * np.pi * 180 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)) ** 2
+    signal = voice + 0.002 * rng.standard_normal(n)
+    signal[: int(lead_silence * SOURCE_RATE)] = 0.002 * rng.standard_normal(int(lead_silence * SOURCE_RATE))
+    signal[n - int(tail_silence * SOURCE_RATE):] = 0.002 * rng.standard_normal(int(tail_silence * SOURCE_RATE))
+    stereo = np.stack([signal, signal * 0.9], axis=1)
+    pcm = (np.clip(stereo, -1, 1) * 32767).astype("<i2").tobytes()
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(SOURCE_RATE)
+        wav.writeframes(pcm)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[10, 30, 120])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'audio':>7} {'in':>9} {'out':>9} {'shrink':>7} {'time':>9} {'MB/s':>7} {'x realtime':>11}")
+    for seconds in args.seconds:
+        data = synthetic_wav(seconds)
+        pcm, _ = preprocess_audio(data)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            preprocess_audio(data)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(
+            f"{seconds:>6.0f}s {len(data) / 1e6:>7.2f}MB {len(pcm) / 1e6:>7.2f}MB "
+            f"{len(data) / len(pcm):>6.1f}x {elapsed * 1e3:>7.1f}ms "
+            f"{len(data) / 1e6 / elapsed:>7.0f} {seconds / elapsed:>10.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
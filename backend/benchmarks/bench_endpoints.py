@@ -0,0 +1,330 @@
+"""
+End-to-end benchmark of every blueprint in create_app, run in-process
+against the deterministic fake Gemini, Cohere and Speech providers and an
+in-memory MongoDB (mongomock) or a local mongod.
+
+    python -m backend.benchmarks.bench_endpoints [--users 16] [--rounds 4] [--latency-ms 50]
+        [--mongo-uri mongodb://localhost:27017] [--save-baseline] [--tolerance 0.5]
+
+Each of --users virtual users (own Flask test client, own session cookie)
+walks the candidate journey: upload and analyze a resume, upload and
+analyze a JD, match score, questions, a spoken answer, history, plus the
+dashboard, jobs and system routes. Steps run as phases: all users run
+step 1 concurrently, then step 2, and so on, so every endpoint gets its
+own p50/p95/p99 latency, throughput and peak RSS, pooled over --rounds
+journeys. Every user sends distinct documents, so caches only help where
+they would in production.
+
+Results are compared with baselines/bench_endpoints.json for the same
+--users/--latency-ms; the run exits non-zero when an endpoint's p95 grows,
+or its throughput drops, by more than --tolerance. --save-baseline
+records the current run instead.
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import wave
+import struct
+import resource
+import argparse
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "bench_endpoints.json")
+
+SKILL_SETS = [
+    "Python, Flask, MongoDB, Docker, AWS",
+    "Java, Spring, PostgreSQL, Kubernetes, Terraform",
+    "TypeScript, React, Node.js, GraphQL, Redis",
+    "Go, gRPC, Kafka, Linux, Prometheus",
+]
+
+
+def configure(args):
+    """Must run before backend is imported: db.py and the providers read env at import."""
+    os.environ["USE_FAKE_PROVIDERS"] = "1"
+    os.environ["FAKE_PROVIDER_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["MONGO_URI"] = args.mongo_uri
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # the fakes have no quota; set PROVIDER_RATE_LIMITS yourself to measure with scheduler throttling
+    os.environ.setdefault("PROVIDER_RATE_LIMITS", json.dumps({p: {"rpm": 0, "tpm": 0} for p in ("gemini", "cohere", "speech")}))
+    if args.mongo_uri.startswith("mongodb://localhost") or args.mongo_uri.startswith("mongodb://127.0.0.1"):
+        os.environ.setdefault("MONGO_TLS", "0")
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if platform.system() == "Darwin" else peak / 1024
+
+
+class PeakRSS:
+    """Samples RSS every few ms while a phase runs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def make_pdf(text: str) -> bytes:
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=10)
+    return doc.tobytes()
+
+
+def make_wav(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        # a 220 Hz tone under a 4 Hz "syllable" envelope; the VAD rejects a flat tone as steady noise
+        w.writeframes(b"".join(struct.pack("<h", int(9000 * abs(math.sin(2 * math.pi * 4 * i / rate))
+                                                     * math.sin(2 * math.pi * 220 * i / rate)))
+                               for i in range(int(seconds * rate))))
+    return buf.getvalue()
+
+
+class VirtualUser:
+    def __init__(self, app, n: int, run_id: str, audio: bytes):
+        self.client = app.test_client()
+        self.n = n
+        skills = SKILL_SETS[n % len(SKILL_SETS)]
+        self.resume = (f"Candidate {run_id}-{n}\nSKILLS\n{skills}\nEXPERIENCE\n"
+                       f"Software Engineer, Acme {n}: built services with {skills}, cut latency {n % 50 + 10}%.\n"
+                       "EDUCATION\nB.S. Computer Science")
+        self.jd = (f"Backend Engineer (req {run_id}-{n})\nWe need {SKILL_SETS[(n + 1) % len(SKILL_SETS)]} "
+                   f"and {skills.split(',')[0]}. You will design APIs and mentor engineers.")
+        # documents are built up front so the timed calls only measure the server
+        self.resume_pdf = make_pdf(self.resume)
+        self.dashboard_pdf = make_pdf(self.resume + "\n(dashboard)")
+        self.audio = audio
+        self.session_id = None
+        self.job_id = None
+
+    def upload_resume(self):
+        return self.client.post("/upload-resume", data={"file": (io.BytesIO(self.resume_pdf), "cv.pdf")})
+
+    def analyze_resume(self):
+        return self.client.post("/analyze-resume", json={})
+
+    def upload_jd(self):
+        return self.client.post("/upload-jd", data={"session_id": self.session_id,
+                                                    "file": (io.BytesIO(self.jd.encode()), "jd.txt")})
+
+    def analyze_jd(self):
+        return self.client.post("/analyze-jd", json={"session_id": self.session_id})
+
+    def match_score(self):
+        return self.client.post("/match-score", json={"session_id": self.session_id})
+
+    def generate_questions(self):
+        return self.client.post("/generate-questions", json={"session_id": self.session_id,
+                                                             "role": "Backend Engineer", "company": "Acme"})
+
+    def submit_answer(self):
+        return self.client.post("/submit-answer", data={"session_id": self.session_id, "question_id": f"q{self.n}",
+                                                        "file": (io.BytesIO(self.audio), "answer.wav")})
+
+    def history(self):
+        return self.client.post("/history", json={"limit": 50})
+
+    def dashboard_resume(self):
+        return self.client.post("/dashboard-upload-resume",
+                                data={"file": (io.BytesIO(self.dashboard_pdf), "cv.pdf")})
+
+    def dashboard_jd(self):
+        return self.client.post("/dashboard-upload-jd", json={"session_id": self.session_id,
+                                                              "jd_text": self.jd + "\n(dashboard)"})
+
+    def job_status(self):
+        return self.client.get(f"/jobs/{self.job_id}")
+
+    def cache_stats(self):
+        return self.client.get("/cache-stats")
+
+
+# (endpoint label, VirtualUser method, hook run on the response)
+STEPS = [
+    ("POST /upload-resume", "upload_resume", lambda u, r: setattr(u, "session_id", r.json["session_id"])),
+    ("POST /analyze-resume", "analyze_resume", None),
+    ("POST /upload-jd", "upload_jd", None),
+    ("POST /analyze-jd", "analyze_jd", None),
+    ("POST /match-score", "match_score", None),
+    ("POST /generate-questions", "generate_questions", None),
+    ("POST /submit-answer", "submit_answer", None),
+    ("POST /history", "history", None),
+    ("POST /dashboard-upload-resume", "dashboard_resume", None),
+    ("POST /dashboard-upload-jd", "dashboard_jd", None),
+    ("GET /jobs/<id>", "job_status", None),
+    ("GET /cache-stats", "cache_stats", None),
+]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_phase(users, method: str, hook):
+    def call(user):
+        started = time.perf_counter()
+        resp = getattr(user, method)()
+        elapsed = time.perf_counter() - started
+        ok = resp.status_code < 400
+        if ok and hook:
+            hook(user, resp)
+        return elapsed, ok
+
+    with PeakRSS() as rss, ThreadPoolExecutor(max_workers=len(users)) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(call, users))
+        wall = time.perf_counter() - started
+    return {
+        "latencies": [t * 1000 for t, _ in results],
+        "wall": wall,
+        "peak_rss_mb": rss.peak,
+        "errors": sum(not ok for _, ok in results),
+    }
+
+
+def summarize(phases) -> dict:
+    latencies = [t for phase in phases for t in phase["latencies"]]
+    return {
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "rps": round(len(latencies) / sum(phase["wall"] for phase in phases), 1),
+        "peak_rss_mb": round(max(phase["peak_rss_mb"] for phase in phases), 1),
+        "errors": sum(phase["errors"] for phase in phases),
+    }
+
+
+def run(args) -> dict:
+    from backend.app import create_app
+
+    app = create_app()
+    audio = make_wav()
+    run_id = str(int(time.time()))
+
+    # one untimed journey pays for imports, index creation and question-bank seeding
+    warmup = VirtualUser(app, -1, run_id + "w", audio)
+    for _, method, hook in STEPS:
+        _prepare(warmup, method)
+        resp = getattr(warmup, method)()
+        if hook and resp.status_code < 400:
+            hook(warmup, resp)
+
+    phases = {label: [] for label, _, _ in STEPS}
+    for round_no in range(args.rounds):
+        users = [VirtualUser(app, n, f"{run_id}r{round_no}", audio) for n in range(args.users)]
+        for label, method, hook in STEPS:
+            for user in users:
+                _prepare(user, method)
+            phases[label].append(run_phase(users, method, hook))
+    return {label: summarize(runs) for label, runs in phases.items()}
+
+
+def _prepare(user, method: str):
+    """Untimed setup some steps need: a finished async job to poll."""
+    if method == "job_status":
+        resp = user.client.post("/analyze-jd?async=1", json={"session_id": user.session_id})
+        user.job_id = resp.json["job_id"]
+        for _ in range(200):
+            if user.client.get(f"/jobs/{user.job_id}").json.get("status") in ("done", "failed"):
+                break
+            time.sleep(0.02)
+
+
+def baseline_key(args) -> str:
+    return f"users={args.users},latency_ms={args.latency_ms}"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    regressions = 0
+    for label, now in results.items():
+        before = baseline.get(label)
+        if not before:
+            continue
+        notes = []
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance) and now["p95_ms"] - before["p95_ms"] > 5:
+            notes.append(f"p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        # ignore sub-millisecond jitter on the cheap routes
+        if now["rps"] < before["rps"] * (1 - tolerance) and 1000 / now["rps"] - 1000 / before["rps"] > 1:
+            notes.append(f"throughput {before['rps']} -> {now['rps']} req/s")
+        if notes:
+            regressions += 1
+            print(f"  REGRESSION {label}: {', '.join(notes)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=4, help="journeys per user; more rounds, steadier p95")
+    parser.add_argument("--latency-ms", type=int, default=50, help="fake provider latency per call")
+    parser.add_argument("--mongo-uri", default="mongomock://", help="mongomock:// or a local mongod URI")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    configure(args)
+    results = run(args)
+
+    print(f"{'endpoint':<30} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'RSS MB':>8} {'errors':>7}")
+    for label, r in results.items():
+        print(f"{label:<30} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} "
+              f"{r['rps']:8.1f} {r['peak_rss_mb']:8.1f} {r['errors']:7d}")
+    errors = sum(r["errors"] for r in results.values())
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baselines = json.load(f)
+    key = baseline_key(args)
+
+    if args.save_baseline:
+        baselines[key] = results
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved baseline {key}")
+        sys.exit(1 if errors else 0)
+
+    if key not in baselines:
+        print(f"no baseline for {key}; run with --save-baseline to record one")
+        sys.exit(1 if errors else 0)
+    regressions = compare(results, baselines[key], args.tolerance)
+    print(f"{regressions} regressions against baseline {key} (tolerance {args.tolerance:.0%})")
+    sys.exit(1 if errors or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare plain-text JD ingestion: the old PyMuPDF "txt" route versus the
+streaming decoder in backend.utils.text_extract.
+
+    python -m backend.benchmarks.bench_jd_ingest [--kb 8 32 256] [--repeat 50]
+"""
+import io
+import time
+import argparse
+
+from werkzeug.datastructures import FileStorage
+
+from backend.utils.text_extract import extract_upload_text
+
+PARAGRAPH = (
+    "We are hiring a Senior Backend Engineer to build data pipelines in Python, "
+    "run services on AWS and Kubernetes, and mentor engineers. Café culture, "
+    "flexible hours, and a 401(k) match.\n"
+)
+
+
+def fitz_txt_extract(data: bytes) -> str:
+    import fitz
+    doc = fitz.open(stream=data, filetype="txt")
+    return "".join([page.get_text() for page in doc])
+
+
+def streaming_extract(data: bytes) -> str:
+    return extract_upload_text(FileStorage(io.BytesIO(data), filename="jd.txt"))
+
+
+def bench(fn, data: bytes, repeat: int) -> float:
+    fn(data)  # warm-up, also pays one-off imports
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kb", type=int, nargs="+", default=[4, 32, 256])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'fitz txt':>12} {'streaming':>12} {'speedup':>9}")
+    for kb in args.kb:
+        data = (PARAGRAPH * (kb * 1024 // len(PARAGRAPH) + 1)).encode("utf-8")[: kb * 1024]
+        old = bench(fitz_txt_extract, data, args.repeat)
+        new = bench(streaming_extract, data, args.repeat)
+        print(f"{kb:>6}KB {old * 1e3:>10.3f}ms {new * 1e3:>10.3f}ms {old / new:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
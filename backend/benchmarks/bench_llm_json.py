@@ -0,0 +1,154 @@
+"""
+Check and time backend.utils.llm_json against a corpus of malformed LLM
+replies (llm_json_corpus.jsonl next to this file), the legacy per-wrapper
+strategies, and random mutations of the corpus.
+
+    python -m backend.benchmarks.bench_llm_json [--repeat 200] [--mutations 200] [--seed 7]
+
+Exits non-zero if a corpus entry parses differently than recorded, or if
+any mutation raises something other than LLMOutputError.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+from backend.utils.llm_json import IncrementalJSONParser, LLMOutputError, parse_llm_output
+from backend.utils.schemas import AnswerFeedback, InterviewQuestions, JDAnalysis, ResumeAnalysis, SegmentNote
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "llm_json_corpus.jsonl")
+SCHEMAS = {
+    "resume": ResumeAnalysis,
+    "jd": JDAnalysis,
+    "feedback": AnswerFeedback,
+    "segment": SegmentNote,
+    "questions": InterviewQuestions,
+}
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def legacy_parse(kind: str, text: str):
+    """The strategies the wrappers used before llm_json."""
+    if kind == "resume":
+        return json.loads(text.strip("```json\n").strip("```"))
+    if kind == "jd":
+        return json.loads(re.sub(r"^```json\s*|\s*```$", "", text.strip(), flags=re.DOTALL).strip())
+    if kind in ("feedback", "segment"):
+        text = text.strip()
+        if text.startswith("```"):
+            text = text.strip("```").replace("json", "", 1).strip()
+        return json.loads(text)
+    match = re.search(r"```json\s*(\{.*\})\s*```", text, re.DOTALL)
+    if not match:
+        raise ValueError("no fenced object")
+    return json.loads(match.group(1))
+
+
+def parses(kind: str, text: str) -> bool:
+    try:
+        parse_llm_output(text, SCHEMAS[kind])
+        return True
+    except LLMOutputError:
+        return False
+
+
+def check_corpus(corpus) -> int:
+    failures, new_ok, legacy_ok = 0, 0, 0
+    for case in corpus:
+        ok = parses(case["schema"], case["text"])
+        new_ok += ok
+        try:
+            legacy_parse(case["schema"], case["text"])
+            legacy_ok += 1
+        except Exception:
+            pass
+        if ok != case["parses"]:
+            failures += 1
+            print(f"  MISMATCH {case['name']}: parsed={ok}, expected={case['parses']}")
+    print(f"corpus: {len(corpus)} replies, llm_json parsed {new_ok}, legacy parsed {legacy_ok}")
+    return failures
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    op = rng.randrange(5)
+    pos = rng.randrange(len(text) + 1)
+    if op == 0:
+        return text[:pos]  # truncated stream
+    if op == 1:
+        return text[:pos] + rng.choice(['"', "'", ",", "}", "]", "{", "[", ":", "\\", "```"]) + text[pos:]
+    if op == 2:
+        return text[:pos] + text[pos + rng.randint(1, 5):]
+    if op == 3:
+        return "Here you go:\n" + text + "\nHope this helps!"
+    return text.replace('"', "'", rng.randint(1, 4))
+
+
+def fuzz(corpus, mutations: int, seed: int) -> int:
+    rng = random.Random(seed)
+    crashes, parsed, total = 0, 0, 0
+    for case in corpus:
+        if not case["text"]:
+            continue
+        for _ in range(mutations):
+            text = mutate(case["text"], rng)
+            total += 1
+            try:
+                parse_llm_output(text, SCHEMAS[case["schema"]])
+                parsed += 1
+            except LLMOutputError:
+                pass
+            except Exception as e:
+                crashes += 1
+                if crashes <= 5:
+                    print(f"  CRASH {case['name']}: {type(e).__name__}: {e!r} on {text!r}")
+    print(f"fuzz: {total} mutations, {parsed} still parsed, {crashes} crashes")
+    return crashes
+
+
+def bench(corpus, repeat: int):
+    good = [c for c in corpus if c["parses"]]
+    clean = [json.dumps({"strengths": ["a", "b"], "improvements": ["c"], "score": 70 + i}) for i in range(len(good))]
+
+    def timed(fn, items):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for item in items:
+                fn(item)
+        return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+    def streamed(case):
+        parser = IncrementalJSONParser()
+        text = case["text"]
+        for i in range(0, len(text), 16):
+            parser.feed(text[i:i + 16])
+            parser.partial()
+
+    print(f"json.loads, clean reply:          {timed(json.loads, clean):8.1f} µs")
+    print(f"parse_llm_output, clean reply:    {timed(lambda t: parse_llm_output(t, AnswerFeedback), clean):8.1f} µs")
+    print(f"parse_llm_output, corpus reply:   {timed(lambda c: parse_llm_output(c['text'], SCHEMAS[c['schema']]), good):8.1f} µs")
+    print(f"16-char streaming with partial(): {timed(streamed, good):8.1f} µs / reply")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--mutations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failures = check_corpus(corpus)
+    failures += fuzz(corpus, args.mutations, args.seed)
+    bench(corpus, args.repeat)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Run a burst of background LLM calls plus a trickle of interactive ones
+against the simulated Gemini quota (fake_providers.FakeQuota), with the
+provider scheduler off and on.
+
+    python -m backend.benchmarks.bench_scheduler [--quota 10] [--background 60]
+        [--interactive 20] [--interval 0.25] [--latency-ms 100]
+
+The fake allows --quota requests per one-second window. Unscheduled,
+every call fires at once, and the 429s turn into retries, backoff and
+failed requests. Scheduled, calls queue in priority order under a token
+bucket just below the quota, so interactive calls jump the background
+backlog and the provider rarely has to say no.
+"""
+import os
+import time
+import argparse
+import threading
+
+
+def configure_env(args):
+    os.environ["USE_FAKE_PROVIDERS"] = "1"
+    os.environ["FAKE_PROVIDER_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_GEMINI_QUOTA_REQUESTS"] = str(args.quota)
+    os.environ["FAKE_QUOTA_WINDOW_SECONDS"] = "1"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_mode(args, scheduled: bool) -> dict:
+    from backend.utils import fake_providers, provider_scheduler
+    from backend.utils.providers import gemini_generate
+    from backend.utils.provider_scheduler import priority, BACKGROUND, INTERACTIVE
+
+    fake_providers.reset_fake_quotas()
+    provider_scheduler.configure(
+        # 90% of the simulated quota, expressed per minute like a real one; the window is
+        # one second here, so bursts must be a small fraction of it
+        {"gemini": {"rpm": args.quota * 60 * 0.9, "tpm": 0, "burst": 0.1, "concurrency": args.concurrency}},
+        enabled=scheduled,
+    )
+    results = {"background": [], "interactive": []}
+    lock = threading.Lock()
+
+    def call(n: int, level: int, name: str):
+        started = time.perf_counter()
+        try:
+            with priority(level):
+                gemini_generate("gemini-1.5-flash", f"Rate this interview answer #{n}.", purpose="bench")
+            outcome = "ok"
+        except Exception as e:
+            outcome = type(e).__name__
+        with lock:
+            results[name].append((time.perf_counter() - started, outcome))
+
+    threads = [threading.Thread(target=call, args=(n, BACKGROUND, "background")) for n in range(args.background)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for n in range(args.interactive):
+        time.sleep(args.interval)
+        t = threading.Thread(target=call, args=(n, INTERACTIVE, "interactive"))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    quota = fake_providers.fake_quota("gemini")
+    summary = {"elapsed_s": elapsed, "accepted": quota.accepted, "rejected_429": quota.rejected}
+    for name, rows in results.items():
+        latencies = [t * 1000 for t, outcome in rows if outcome == "ok"]
+        failures = {}
+        for _, outcome in rows:
+            if outcome != "ok":
+                failures[outcome] = failures.get(outcome, 0) + 1
+        summary[name] = {"ok": len(latencies), "failed": failures,
+                         "p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quota", type=int, default=10, help="simulated requests per second")
+    parser.add_argument("--background", type=int, default=60)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between interactive arrivals")
+    parser.add_argument("--latency-ms", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    configure_env(args)
+
+    for scheduled in (False, True):
+        r = run_mode(args, scheduled)
+        print(f"{'scheduled' if scheduled else 'unscheduled'}: {r['elapsed_s']:.1f}s, "
+              f"provider accepted {r['accepted']}, rejected {r['rejected_429']} with 429")
+        for name in ("interactive", "background"):
+            c = r[name]
+            print(f"  {name:<12} ok {c['ok']:>3}  p50 {c['p50_ms']:7.0f} ms  p95 {c['p95_ms']:7.0f} ms  "
+                  f"failed {c['failed'] or 0}")
+
+
+if __name__ == "__main__":
+    main()
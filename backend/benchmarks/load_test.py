@@ -0,0 +1,152 @@
+"""
+Load-test the serving modes in backend/serve.py against fake providers.
+
+    python -m backend.benchmarks.load_test [--modes single threaded gunicorn]
+        [--requests 200] [--concurrency 32] [--latency-ms 300]
+    python -m backend.benchmarks.load_test --url http://localhost:5000
+
+For each mode a server is started on a free port with USE_FAKE_PROVIDERS=1,
+so every Gemini/Cohere/Speech call just sleeps for --latency-ms, then
+--requests POSTs to /submit-answer are sent --concurrency at a time. With
+--url the already-running server at that address is tested instead.
+Requests still write to MongoDB, so MONGO_URI must point at a reachable
+(throwaway) database.
+"""
+import io
+import os
+import sys
+import math
+import time
+import uuid
+import wave
+import socket
+import struct
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_wav(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"".join(struct.pack("<h", int(9000 * math.sin(2 * math.pi * 220 * i / rate)))
+                               for i in range(int(seconds * rate))))
+    return buf.getvalue()
+
+
+def multipart(fields: dict, filename: str, data: bytes):
+    boundary = uuid.uuid4().hex
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+             for k, v in fields.items()]
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f"Content-Type: audio/wav\r\n\r\n".encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_healthy(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/healthz", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not become healthy")
+
+
+def start_server(mode: str, port: int, latency_ms: int, workers: int, threads: int):
+    env = {
+        **os.environ,
+        "USE_FAKE_PROVIDERS": "1",
+        "FAKE_PROVIDER_LATENCY_MS": str(latency_ms),
+        "DB_MIGRATE_ON_STARTUP": "0",
+        "WEB_WORKERS": str(workers),
+        "WEB_THREADS": str(threads),
+        "WEB_ACCESS_LOG": "",
+        "LOG_LEVEL": "WARNING",
+    }
+    return subprocess.Popen([sys.executable, "-m", "backend.serve", "--mode", mode, "--port", str(port)],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_load(url: str, total: int, concurrency: int) -> dict:
+    audio = make_wav()
+    run_id = uuid.uuid4().hex[:8]
+
+    def one(i):
+        # distinct question ids so the feedback cache never answers for the provider
+        body, content_type = multipart({"session_id": f"load-{run_id}", "question_id": f"q{i}"}, "a.wav", audio)
+        req = urllib.request.Request(f"{url}/submit-answer", data=body, headers={"Content-Type": content_type})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                resp.read()
+                ok = resp.status == 200
+        except OSError:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    latencies = [t for t, _ in results]
+    return {
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "errors": sum(not ok for _, ok in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["single", "threaded", "gunicorn"],
+                        choices=["single", "threaded", "gunicorn"])
+    parser.add_argument("--url", help="test this running server instead of starting one per mode")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=int, default=300, help="fake provider latency per call")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=32, help="gunicorn threads per worker")
+    args = parser.parse_args()
+
+    targets = [("url", args.url)] if args.url else [(mode, None) for mode in args.modes]
+    print(f"{'mode':>10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for mode, url in targets:
+        server = None
+        if url is None:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = start_server(mode, port, args.latency_ms, args.workers, args.threads)
+        try:
+            wait_healthy(url)
+            run_load(url, min(args.concurrency, args.requests), args.concurrency)  # warm-up
+            r = run_load(url, args.requests, args.concurrency)
+            print(f"{mode:>10} {r['rps']:8.1f} {r['p50_ms']:8.0f} {r['p95_ms']:8.0f} {r['errors']:7d}")
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=90)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Gunicorn settings for the API. Every route spends its time waiting on
+Gemini, Cohere, Speech-to-Text or MongoDB, so each worker process runs a
+pool of threads (gthread): a request blocked on a provider only holds a
+thread, not a process. All values can be overridden through env vars.
+"""
+import os
+import signal
+import multiprocessing
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_WORKERS", str(min(multiprocessing.cpu_count(), 4))))
+# concurrent requests per worker; SSE streams and LLM calls each hold one
+threads = int(os.getenv("WEB_THREADS", "32"))
+# longest single request we allow: provider timeout x retries, with headroom
+timeout = int(os.getenv("WEB_TIMEOUT", "240"))
+# on SIGTERM a worker stops accepting and gets this long, counted from the signal, to
+# finish requests, jobs and writes before the arbiter SIGKILLs it (see post_worker_init)
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", os.getenv("DRAIN_TIMEOUT_SECONDS", "60")))
+# stop draining this long before the SIGKILL, so worker_exit can log and the process exit cleanly
+drain_margin = int(os.getenv("WEB_DRAIN_MARGIN_SECONDS", "5"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+# recycle workers now and then so slow leaks in SDK clients cannot accumulate
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "200"))
+# each worker opens its own MongoDB and provider clients after the fork
+preload_app = False
+accesslog = os.getenv("WEB_ACCESS_LOG", "-") or None
+
+
+def _drain_budget() -> int:
+    return max(1, min(graceful_timeout, timeout) - drain_margin)
+
+
+def post_worker_init(worker):
+    """
+    On SIGTERM, fail /readyz and start draining at once. The arbiter's
+    SIGKILL comes graceful_timeout after the signal, not after the last
+    request, so jobs and writes drain alongside the requests gunicorn is
+    still finishing.
+    """
+    from backend.utils.lifecycle import begin_drain
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def on_sigterm(signum, frame):
+        begin_drain(_drain_budget())
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+
+def worker_exit(server, worker):
+    """Wait out whatever the drain started at SIGTERM has left, or drain now when the worker is recycled."""
+    from backend.utils.lifecycle import finish_drain
+
+    report = finish_drain(_drain_budget())
+    server.log.info("worker %s drained: %s", worker.pid, report)
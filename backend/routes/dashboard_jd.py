@@ -1,11 +1,10 @@
 import uuid
 from flask import Blueprint, request, jsonify
-from backend.utils.db import get_collection
 from backend.utils.gemini_jd import analyze_job_description_gemini
+from backend.utils.jobs import submit_job, wants_async
+from backend.utils.sessions import record_jd, record_jd_analysis
 
 dashboard_jd_api = Blueprint("dashboard_jd_api", __name__)
-jd_col = get_collection("jds")
-jd_outputs_col = get_collection("jd_outputs")
 
 @dashboard_jd_api.route("/dashboard-upload-jd", methods=["POST"])
 def upload_and_analyze_jd():
@@ -15,8 +14,14 @@ def upload_and_analyze_jd():
     if not session_id or not jd_text:
         return jsonify(error="Missing session_id or jd_text"), 400
 
-    jd_col.insert_one({"session_id": session_id, "jd_text": jd_text})
-    analysis = analyze_job_description_gemini(jd_text)
-    jd_outputs_col.insert_one({"session_id": session_id, "analysis": analysis})
+    record_jd(session_id, jd_text, "dashboard")
+    if wants_async(payload):
+        job_id = submit_job("dashboard-analyze-jd", "gemini", run_dashboard_jd_analysis, session_id, jd_text)
+        return jsonify(status="queued", job_id=job_id, session_id=session_id), 202
+
+    return jsonify(run_dashboard_jd_analysis(session_id, jd_text))
 
-    return jsonify(status="ok", session_id=session_id)
+def run_dashboard_jd_analysis(session_id, jd_text):
+    analysis = analyze_job_description_gemini(jd_text)
+    record_jd_analysis(session_id, analysis)
+    return {"status": "ok", "session_id": session_id}
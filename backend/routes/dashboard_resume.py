@@ -1,12 +1,12 @@
 import uuid
 from flask import Blueprint, request, jsonify
-import fitz
-from backend.utils.db import get_collection
+from backend.utils.pdf_extract import extract_pdf_text, ExtractionError
 from backend.utils.gemini_resume import analyze_resume
+from backend.utils.jobs import submit_job, wants_async
+from backend.utils.sessions import record_resume, record_resume_analysis
+from backend.utils.document_store import store_original
 
 dashboard_resume_api = Blueprint("dashboard_resume_api", __name__)
-resumes_col = get_collection("resumes")
-resume_outputs_col = get_collection("resume_outputs")
 
 @dashboard_resume_api.route("/dashboard-upload-resume", methods=["POST"])
 def upload_and_analyze_resume():
@@ -15,24 +15,22 @@ def upload_and_analyze_resume():
     if not file or not file.filename.lower().endswith(".pdf"):
         return jsonify(error="Please upload a PDF"), 400
 
-    text = extract_text(file)
+    try:
+        text = extract_pdf_text(file)
+    except ExtractionError as e:
+        return jsonify(error=str(e)), e.status_code
     session_id = str(uuid.uuid4())
 
-    resumes_col.insert_one({
-        "session_id": session_id,
-        "filename": file.filename,
-        "resume_text": text
-    })
+    record_resume(session_id, file.filename, text, store_original(file, "resume"))
 
-    # 2️⃣ analyze immediately
-    analysis = analyze_resume(text)
-    resume_outputs_col.insert_one({
-        "session_id": session_id,
-        "analysis": analysis
-    })
+    # 2️⃣ analyze immediately (or in the background when async was requested)
+    if wants_async():
+        job_id = submit_job("dashboard-analyze-resume", "gemini", run_dashboard_resume_analysis, session_id, text)
+        return jsonify(status="queued", job_id=job_id, session_id=session_id), 202
 
-    return jsonify(status="ok", session_id=session_id)
+    return jsonify(run_dashboard_resume_analysis(session_id, text))
 
-def extract_text(file):
-    doc = fitz.open(stream=file.read(), filetype="pdf")
-    return "".join([page.get_text() for page in doc])
\ No newline at end of file
+def run_dashboard_resume_analysis(session_id, text):
+    analysis = analyze_resume(text)
+    record_resume_analysis(session_id, analysis)
+    return {"status": "ok", "session_id": session_id}
@@ -1,24 +1,176 @@
-from flask import Blueprint, request, jsonify
+import json
+import base64
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Blueprint, Response, request, jsonify
 from backend.utils.db import get_collection
+from backend.utils.write_behind import await_pending
 
 history_api = Blueprint("history_api", __name__)
 match_scores_col = get_collection("match_scores")
 
-@history_api.route("/history", methods=["POST"])
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+HISTORY_PROJECTION = {"company": 1, "role_title": 1, "match_score": 1, "created_at": 1}
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def _history_params():
+    """History options from the query string, falling back to the JSON body."""
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    elif not isinstance(data, dict):
+        raise ValueError("JSON body must be an object")
+    def param(name, default=None):
+        return request.args.get(name, data.get(name, default))
+    return param
+
+
+def encode_cursor(doc) -> str:
+    # rows from before created_at existed sort last; their cursor carries t=None
+    created_at = doc.get("created_at")
+    raw = json.dumps({"t": created_at.isoformat() if created_at else None, "id": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(raw["t"]) if raw["t"] is not None else None, ObjectId(raw["id"])
+    except (ValueError, KeyError, TypeError, AttributeError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+
+def _serialize(doc) -> dict:
+    return {
+        "company":     doc.get("company"),
+        "role_title":  doc.get("role_title"),
+        "match_score": doc.get("match_score"),
+        "created_at":  doc["created_at"].isoformat() if doc.get("created_at") else None,
+    }
+
+
+def _history_query(user_id, cursor=None) -> dict:
+    query = {"user_id": user_id}
+    if cursor:
+        created_at, oid = decode_cursor(cursor)
+        # keyset: strictly after the last row of the previous page in (created_at, _id) order,
+        # where rows without created_at (not yet backfilled by `migrate`) come last
+        if created_at is None:
+            query.update({"created_at": None, "_id": {"$lt": oid}})
+        else:
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": oid}},
+                {"created_at": None},
+            ]
+    return query
+
+
+@history_api.route("/history", methods=["GET", "POST"])
 def get_history():
-    data = request.get_json()
     user_id = "spartan@sjsu.com"
     if not user_id:
         return jsonify({"error": "Missing user_id"}), 400
 
-    # find all match‐score records for this user
-    cursor = match_scores_col.find({"user_id": user_id})
-    history = []
-    for doc in cursor:
-        history.append({
-            "company":    doc.get("company"),
-            "role_title": doc.get("role_title"),
-            "match_score": doc.get("match_score")
-        })
-
-    return jsonify(history), 200
+    try:
+        param = _history_params()
+        query = _history_query(user_id, param("cursor"))
+        limit = min(max(int(param("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e) if isinstance(e, ValueError) else "limit must be an integer"}), 400
+
+    # scores are written behind the response; include any this worker still holds
+    await_pending("match_scores")
+    cursor = match_scores_col.find(query, HISTORY_PROJECTION).sort(HISTORY_SORT)
+
+    if param("format") == "ndjson" or "application/x-ndjson" in request.headers.get("Accept", ""):
+        # stream every remaining record without materializing the list
+        def rows():
+            for doc in cursor.batch_size(MAX_PAGE_SIZE):
+                yield json.dumps(_serialize(doc)) + "\n"
+        return Response(rows(), mimetype="application/x-ndjson")
+
+    if param("cursor") is None and param("limit") is None:
+        # unpaged callers keep the original bare-list response, streamed rather than built in memory
+        def array():
+            yield "["
+            for i, doc in enumerate(cursor.batch_size(MAX_PAGE_SIZE)):
+                yield ("," if i else "") + json.dumps(_serialize(doc))
+            yield "]"
+        return Response(array(), mimetype="application/json")
+
+    # fetch one extra row to know whether another page exists
+    docs = list(cursor.limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor(docs[-1]) if has_more else None
+
+    return jsonify({"items": [_serialize(d) for d in docs], "next_cursor": next_cursor}), 200
+
+
+@history_api.route("/history/summary", methods=["GET", "POST"])
+def get_history_summary():
+    user_id = "spartan@sjsu.com"
+
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "best_by_company": [
+                {"$group": {
+                    "_id": "$company",
+                    "best_score": {"$max": "$match_score"},
+                    "attempts": {"$sum": 1},
+                    "last_scored_at": {"$max": "$created_at"},
+                }},
+                {"$sort": {"best_score": -1, "_id": 1}},
+            ],
+            "trend": [
+                {"$match": {"created_at": {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "average_score": {"$avg": "$match_score"},
+                    "best_score": {"$max": "$match_score"},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+            "overall": [
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "average_score": {"$avg": "$match_score"},
+                    "best_score": {"$max": "$match_score"},
+                }},
+            ],
+        }},
+    ]
+    await_pending("match_scores")
+    result = next(match_scores_col.aggregate(pipeline), {})
+    overall = (result.get("overall") or [{}])[0]
+
+    return jsonify({
+        "count": overall.get("count", 0),
+        "average_score": round(overall["average_score"], 1) if overall.get("average_score") is not None else None,
+        "best_score": overall.get("best_score"),
+        "best_by_company": [
+            {
+                "company": row["_id"],
+                "best_score": row["best_score"],
+                "attempts": row["attempts"],
+                "last_scored_at": row["last_scored_at"].isoformat() if row.get("last_scored_at") else None,
+            }
+            for row in result.get("best_by_company", [])
+        ],
+        "trend": [
+            {
+                "date": row["_id"],
+                "average_score": round(row["average_score"], 1) if row["average_score"] is not None else None,
+                "best_score": row["best_score"],
+                "count": row["count"],
+            }
+            for row in result.get("trend", [])
+        ],
+    }), 200
@@ -1,6 +1,13 @@
-from flask import Blueprint, request, jsonify
-from backend.utils.speech_to_text import transcribe_audio_bytes
-from backend.utils.audio_feedback import analyze_answer  # your LLM wrapper
+import json
+import time
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from backend.utils.speech_to_text import transcribe_audio_bytes, ENCODINGS, STREAM_CHUNK_BYTES
+from backend.utils.audio_feedback import analyze_answer, stream_answer_feedback  # your LLM wrapper
+from backend.utils.audio_preprocess import preprocess_audio, EmptyAudioError, UnreadableAudioError
+from backend.utils.answer_pipeline import process_answer_stream, persist_answer_async, log_answer_latency
+from backend.utils.jobs import submit_job, wants_async
+from backend.utils.sse import wants_event_stream, sse_response
+from backend.utils.provider_scheduler import ProviderBusyError, busy_body
 
 interview_api = Blueprint("interview_api", __name__)
 
@@ -16,18 +23,140 @@ def submit_answer():
     # 1️⃣ Read raw audio
     audio_bytes = file.read()
 
-    # 2️⃣ Transcribe
+    if wants_async():
+        job_id = submit_job("submit-answer", "speech", run_answer_feedback, session_id, question_id, audio_bytes)
+        return jsonify({"status": "queued", "job_id": job_id}), 202
+
+    if wants_event_stream():
+        return sse_response(answer_feedback_events(session_id, question_id, audio_bytes))
+
+    body, status = run_answer_feedback(session_id, question_id, audio_bytes)
+    return jsonify(body), status
+
+def run_answer_feedback(session_id, question_id, audio_bytes):
+    started = time.perf_counter()
+
+    # 2️⃣ Downmix, resample to 16 kHz and trim silence; empty takes never reach the API
+    try:
+        pcm, sample_rate = preprocess_audio(audio_bytes)
+    except (EmptyAudioError, UnreadableAudioError) as e:
+        return {"error": str(e)}, 400
+    preprocess_ms = int((time.perf_counter() - started) * 1000)
+
+    # 3️⃣ Transcribe
     try:
-        transcript = transcribe_audio_bytes(audio_bytes)
+        transcript = transcribe_audio_bytes(pcm, sample_rate)
+    except ProviderBusyError:
+        raise
     except Exception as e:
-        return jsonify({"error": f"Transcription failed: {e}"}), 500
+        return {"error": f"Transcription failed: {e}"}, 500
+    transcribe_ms = int((time.perf_counter() - started) * 1000) - preprocess_ms
 
-    # 3️⃣ Run your LLM feedback on the transcript + question
+    # 4️⃣ Run your LLM feedback on the transcript + question
     feedback = analyze_answer(question_id, transcript, session_id)
 
-    # 4️⃣ (Optional) save transcript and feedback to MongoDB here...
+    # 5️⃣ Save transcript and feedback to MongoDB off the response path
+    persist_answer_async(session_id, question_id, transcript, feedback)
+    log_answer_latency(
+        session_id, question_id,
+        mode="sync",
+        audio_bytes=len(audio_bytes),
+        upload_bytes=len(pcm),
+        preprocess_ms=preprocess_ms,
+        transcribe_ms=transcribe_ms,
+        total_ms=int((time.perf_counter() - started) * 1000),
+    )
+
+    return {"feedback": feedback}, 200
+
+def answer_feedback_events(session_id, question_id, audio_bytes):
+    """
+    SSE variant of run_answer_feedback: a "transcript" event as soon as
+    transcription is done, then "strength"/"improvement"/"score" events as
+    the LLM writes them, then "feedback" with the same body as /submit-answer.
+    """
+    started = time.perf_counter()
+    try:
+        pcm, sample_rate = preprocess_audio(audio_bytes)
+    except (EmptyAudioError, UnreadableAudioError) as e:
+        yield "error", {"error": str(e)}
+        return
+    preprocess_ms = int((time.perf_counter() - started) * 1000)
+
+    try:
+        transcript = transcribe_audio_bytes(pcm, sample_rate)
+    except ProviderBusyError as e:
+        yield "error", busy_body(e)
+        return
+    except Exception as e:
+        yield "error", {"error": f"Transcription failed: {e}"}
+        return
+    transcribe_ms = int((time.perf_counter() - started) * 1000) - preprocess_ms
+    yield "transcript", {"transcript": transcript}
+
+    feedback, first_item_ms = None, None
+    for event in stream_answer_feedback(question_id, transcript, session_id):
+        if event["type"] == "feedback":
+            feedback = event["feedback"]
+            continue
+        if first_item_ms is None:
+            first_item_ms = int((time.perf_counter() - started) * 1000)
+        yield event["type"], event
+
+    persist_answer_async(session_id, question_id, transcript, feedback)
+    log_answer_latency(
+        session_id, question_id,
+        mode="sse",
+        audio_bytes=len(audio_bytes),
+        upload_bytes=len(pcm),
+        preprocess_ms=preprocess_ms,
+        transcribe_ms=transcribe_ms,
+        first_item_ms=first_item_ms,
+        total_ms=int((time.perf_counter() - started) * 1000),
+    )
+    yield "feedback", {"feedback": feedback}
+
+@interview_api.route("/submit-answer/stream", methods=["POST"])
+def submit_answer_stream():
+    """
+    Chunked-upload variant of /submit-answer. The request body is the raw
+    audio stream (Transfer-Encoding: chunked is fine); ids and audio format
+    go in the query string. The response is NDJSON: "partial"/"final"
+    transcript events while audio is still arriving, "segment_feedback" as
+    each finished stretch is reviewed, then one overall "feedback".
+    """
+    session_id = request.args.get("session_id")
+    question_id = request.args.get("question_id")
+    encoding = request.args.get("encoding", "LINEAR16").upper()
+    try:
+        sample_rate = int(request.args.get("sample_rate", "16000"))
+    except ValueError:
+        return jsonify({"error": "sample_rate must be an integer"}), 400
 
-    return jsonify({"feedback": feedback})
+    if not (session_id and question_id):
+        return jsonify({"error": "Missing fields"}), 400
+    if encoding not in ENCODINGS:
+        return jsonify({"error": f"Unsupported encoding; use one of {', '.join(ENCODINGS)}"}), 400
+
+    def audio_chunks():
+        while True:
+            chunk = request.stream.read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+    def events():
+        try:
+            for event in process_answer_stream(session_id, question_id, audio_chunks(), sample_rate, encoding):
+                yield json.dumps(event) + "\n"
+        except EmptyAudioError as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+        except ProviderBusyError as e:
+            yield json.dumps({"type": "error", **busy_body(e)}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": f"Answer processing failed: {e}"}) + "\n"
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson")
 
 # # backend/routes/interview.py
 # from flask import Blueprint, request, jsonify
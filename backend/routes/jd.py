@@ -1,17 +1,19 @@
 from flask import Blueprint, request, jsonify
-from backend.utils.db import get_collection
 from backend.utils.gemini_jd import analyze_job_description_gemini
-import fitz  # PyMuPDF library for handling PDF files
+from backend.utils.jobs import submit_job, wants_async
+from backend.utils.single_flight import single_flight
+from backend.utils.text_extract import extract_upload_text, supported_extensions
+from backend.utils.pdf_extract import ExtractionError
+from backend.utils.provider_scheduler import route_error
+from backend.utils.sessions import get_session, record_jd, record_jd_analysis
+from backend.utils.document_store import session_text, store_original
 
 jd_api = Blueprint("jd_api", __name__)
-jd_col = get_collection("job_descriptions")
-jd_outputs_col = get_collection("jd_outputs")
 
 @jd_api.route("/upload-jd", methods=["POST"])
 def upload_jd():
-    data = request.get_json()
-    #jd_text = data["jd_text"]
-    session_id = data.get("session_id")
+    # multipart upload: session_id arrives as a form field next to the file
+    session_id = request.form.get("session_id")
 
     try:
         if 'file' not in request.files:
@@ -21,23 +23,21 @@ def upload_jd():
         if file.filename == '':
             return jsonify({"error": "No selected file"}), 400
 
-        if not file.filename.lower().endswith('.txt'):
-            return jsonify({"error": "Only text files are supported"}), 400
+        if not file.filename.lower().endswith(tuple(supported_extensions())):
+            return jsonify({"error": f"Supported file types: {', '.join(supported_extensions())}"}), 400
 
-        jd_text = extract_text(file)
+        jd_text = extract_upload_text(file).strip()
         if not jd_text or not session_id:
             return jsonify({"error": "Missing job description text or session_id"}), 400
     
-        jd_col.insert_one({
-            "session_id": session_id,
-            "jd_text": jd_text
-        })
+        record_jd(session_id, jd_text, "upload", file.filename, store_original(file, "jd"))
 
         return jsonify({"status": "uploaded", "filename": file.filename,"session_id": session_id})
 
+    except ExtractionError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
-        print(f"🔥 Upload Resume Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return route_error("upload_jd_failed", e)
 
 @jd_api.route("/analyze-jd", methods=["POST"])
 def analyze_jd_api():
@@ -50,21 +50,28 @@ def analyze_jd_api():
         # if not jd_text or not session_id:
         #     return jsonify({"error": "Missing JD text or session ID"}), 400
 
-        jd_doc = jd_col.find_one({"session_id": session_id})
-        if not jd_doc:
-            return jsonify({"error": "JD not found"}), 404
-
-        result = analyze_job_description_gemini(jd_doc["jd_text"])
-        jd_outputs_col.insert_one({
-            "user_id": user_id,
-            "session_id": session_id,
-            "analysis": result
-        })
-        return jsonify({"status": "analyzed", "session_id": session_id, "analysis": result})
+        if wants_async(data):
+            job_id = submit_job("analyze-jd", "gemini", run_jd_analysis, session_id, user_id)
+            return jsonify({"status": "queued", "job_id": job_id, "session_id": session_id}), 202
+
+        body, status = run_jd_analysis(session_id, user_id)
+        return jsonify(body), status
     except Exception as e:
-        print(f"🔥 Error in analyze_jd_api: {e}")
-        return jsonify({"error": str(e)}), 500
+        return route_error("analyze_jd_failed", e)
+
+def run_jd_analysis(session_id, user_id):
+    return single_flight(f"analyze-jd:{session_id}", lambda: _analyze_session_jd(session_id, user_id))
+
+def _analyze_session_jd(session_id, user_id):
+    session_doc = get_session(session_id, "jd")
+    if not (session_doc and session_doc.get("jd")):
+        return {"error": "JD not found"}, 404
+
+    jd_text = session_text(session_doc["jd"])
+    if jd_text is None:
+        # the session points at a text whose write never landed
+        return {"error": "JD text is missing; please upload the job description again"}, 409
 
-def extract_text(file):
-    doc = fitz.open(stream=file.read(), filetype="txt")
-    return "".join([page.get_text() for page in doc])
\ No newline at end of file
+    result = analyze_job_description_gemini(jd_text)
+    record_jd_analysis(session_id, result, user_id)
+    return {"status": "analyzed", "session_id": session_id, "analysis": result}, 200
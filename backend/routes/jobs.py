@@ -0,0 +1,47 @@
+import time
+from flask import Blueprint, Response, jsonify
+from backend.utils.jobs import get_job, wait_for_job, serialize_job
+from backend.utils.sse import sse_event
+
+jobs_api = Blueprint("jobs_api", __name__)
+
+SSE_MAX_SECONDS = 600
+SSE_POLL_SECONDS = 1.0
+
+@jobs_api.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    doc = get_job(job_id)
+    if not doc:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(serialize_job(doc)), 200
+
+@jobs_api.route("/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    doc = get_job(job_id)
+    if not doc:
+        return jsonify({"error": "Job not found"}), 404
+
+    def events():
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        current = doc
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                event = "done" if last_status in ("done", "failed") else "status"
+                yield sse_event(event, serialize_job(current))
+                if event == "done":
+                    return
+            if time.monotonic() > deadline:
+                yield sse_event("timeout", {})
+                return
+            # wakes instantly for jobs owned by this process, otherwise polls MongoDB
+            if not wait_for_job(job_id, SSE_POLL_SECONDS):
+                yield ": keep-alive\n\n"
+            current = get_job(job_id) or current
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,12 +1,16 @@
-import re
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
-from backend.utils.db import get_collection
-from backend.utils.cohere_utils import generate_questions, calculate_match_score
+from backend.utils.cohere_utils import explain_match_score
+from backend.utils.match_engine import score_match, score_matches, render_match_report
+from backend.utils.jobs import submit_job, wants_async
+from backend.utils.single_flight import single_flight
+from backend.utils.question_bank import build_question_set, stream_question_set
+from backend.utils.sse import wants_event_stream, sse_response
+from backend.utils.provider_scheduler import route_error
+from backend.utils.write_behind import insert_later
+from backend.utils.sessions import get_session, get_sessions, record_questions, record_match
 
 questions_api = Blueprint("questions_api", __name__)
-resume_outputs_col = get_collection("resume_outputs")
-jd_outputs_col = get_collection("jd_outputs")
-match_scores_col = get_collection("match_scores")
 
 @questions_api.route("/generate-questions", methods=["POST"])
 def generate_interview_questions():
@@ -19,21 +23,57 @@ def generate_interview_questions():
         if not session_id:
             return jsonify({"error": "Missing session ID"}), 400
 
-        resume_doc = resume_outputs_col.find_one({"session_id": session_id})
-        jd_doc = jd_outputs_col.find_one({"session_id": session_id})
+        if wants_async(data):
+            job_id = submit_job("generate-questions", "cohere", run_generate_questions, session_id, role, company)
+            return jsonify({"status": "queued", "job_id": job_id, "session_id": session_id}), 202
 
-        if not (resume_doc and jd_doc):
-            return jsonify({"error": "Documents missing"}), 404
+        if wants_event_stream(data):
+            return stream_generate_questions(session_id, role, company)
 
-        resume_analysis = resume_doc["analysis"]
-        jd_analysis = jd_doc["analysis"]
-
-        questions = generate_questions(resume_analysis, jd_analysis,role, company)
-
-        return jsonify({"session_id": session_id, "questions": questions})
+        body, status = run_generate_questions(session_id, role, company)
+        return jsonify(body), status
     except Exception as e:
-        print(f"🔥 Error in /generate-questions: {e}")
-        return jsonify({"error": str(e)}), 500
+        return route_error("generate_questions_failed", e)
+
+def run_generate_questions(session_id, role, company):
+    key = f"generate-questions:{session_id}:{role}:{company}"
+    return single_flight(key, lambda: _generate_session_questions(session_id, role, company))
+
+def _session_analyses(session_id):
+    """(resume analysis, JD analysis) for a session, or None if either is missing."""
+    session_doc = get_session(session_id, "resume_analysis", "jd_analysis")
+    if not (session_doc and session_doc.get("resume_analysis") and session_doc.get("jd_analysis")):
+        return None
+    return session_doc["resume_analysis"], session_doc["jd_analysis"]
+
+def _generate_session_questions(session_id, role, company):
+    analyses = _session_analyses(session_id)
+    if analyses is None:
+        return {"error": "Documents missing"}, 404
+
+    questions = build_question_set(*analyses, role, company)
+    record_questions(session_id, role, company, questions)
+
+    return {"session_id": session_id, "questions": questions}, 200
+
+def stream_generate_questions(session_id, role, company):
+    """
+    SSE variant of /generate-questions: one "question" event per question as
+    soon as it is ready, then "done" with the same body the JSON route returns.
+    """
+    analyses = _session_analyses(session_id)
+    if analyses is None:
+        return jsonify({"error": "Documents missing"}), 404
+
+    def events():
+        for event in stream_question_set(*analyses, role, company):
+            if event["type"] == "done":
+                record_questions(session_id, role, company, event["questions"])
+                yield "done", {"session_id": session_id, "questions": event["questions"]}
+            else:
+                yield "question", event
+
+    return sse_response(events())
 
 @questions_api.route("/match-score", methods=["POST"])
 def match_score():
@@ -44,41 +84,114 @@ def match_score():
 
         if not session_id:
             return jsonify({"error": "Missing session ID"}), 400
-        
-        resume_doc = resume_outputs_col.find_one({"session_id": session_id})
-        jd_doc = jd_outputs_col.find_one({"session_id": session_id})
-
-        if not resume_doc or not jd_doc:
-            return jsonify({"error": "Missing resume or JD analysis for this session ID"}), 404
-
-        resume_analysis = resume_doc["analysis"]
-        jd_analysis = jd_doc["analysis"]
-
-        # this returns a dict like {"error":..., "raw":"Match Score: 75% …"}
-        raw_score = calculate_match_score(resume_analysis, jd_analysis)
-
-        # extract integer percentage
-        # get the text to scan
-        text = ""
-        if isinstance(raw_score, dict):
-            text = raw_score.get("raw", "")
-        else:
-            text = str(raw_score)
-
-        # extract the first integer percentage
-        m = re.search(r"(\d+)%", text)
-        percent = int(m.group(1)) if m else 0
-
-        # insert the integer percentage
-        match_scores_col.insert_one({
-            "user_id":     user_id,
-            "session_id":  session_id,
-            "company":     jd_doc["analysis"].get("company"),
-            "role_title":  jd_doc["analysis"].get("role_title"),
-            "match_score": percent
-        })
-
-        return jsonify({"session_id": session_id, "match_score": raw_score})
+
+        explain = bool(data.get("explain"))
+
+        if wants_async(data):
+            job_id = submit_job("match-score", "cohere", run_match_score, session_id, user_id, explain)
+            return jsonify({"status": "queued", "job_id": job_id, "session_id": session_id}), 202
+
+        body, status = run_match_score(session_id, user_id, explain)
+        return jsonify(body), status
+    except Exception as e:
+        return route_error("match_score_failed", e)
+
+def run_match_score(session_id, user_id, explain=False):
+    key = f"match-score:{session_id}:{int(explain)}"
+    return single_flight(key, lambda: _score_session(session_id, user_id, explain))
+
+def _score_session(session_id, user_id, explain):
+    analyses = _session_analyses(session_id)
+    if analyses is None:
+        return {"error": "Missing resume or JD analysis for this session ID"}, 404
+
+    resume_analysis, jd_analysis = analyses
+
+    # deterministic local score; "raw" keeps the "Match Score: NN%" text the dashboard parses
+    match = score_match(resume_analysis, jd_analysis)
+    match_score = {
+        "raw": render_match_report(match),
+        "score": match["score"],
+        "breakdown": match["breakdown"],
+    }
+    if explain:
+        explanation = explain_match_score(resume_analysis, jd_analysis, match)
+        match_score["explanation"] = explanation.get("raw", explanation) if isinstance(explanation, dict) else explanation
+
+    record_match(session_id, {
+        "score":       match["score"],
+        "breakdown":   match["breakdown"],
+        "company":     jd_analysis.get("company"),
+        "role_title":  jd_analysis.get("role_title"),
+        "explanation": match_score.get("explanation"),
+    }, user_id)
+    # append-only log behind /history
+    insert_later("match_scores", {
+        "user_id":     user_id,
+        "session_id":  session_id,
+        "company":     jd_analysis.get("company"),
+        "role_title":  jd_analysis.get("role_title"),
+        "match_score": match["score"],
+        "created_at":  datetime.now(timezone.utc)
+    })
+
+    return {"session_id": session_id, "match_score": match_score}, 200
+
+@questions_api.route("/match-score/batch", methods=["POST"])
+def match_score_batch():
+    try:
+        data = request.get_json() or {}
+        user_id = "spartan@sjsu.com"
+        resume_session_id = data.get("resume_session_id")
+        jd_session_ids = data.get("jd_session_ids") or []
+
+        if not resume_session_id or not isinstance(jd_session_ids, list) or not jd_session_ids:
+            return jsonify({"error": "Missing resume_session_id or jd_session_ids"}), 400
+
+        # the resume and every JD in one round trip
+        sessions = get_sessions([resume_session_id, *jd_session_ids], "resume_analysis", "jd_analysis")
+        resume_analysis = sessions.get(resume_session_id, {}).get("resume_analysis")
+        if not resume_analysis:
+            return jsonify({"error": "Missing resume analysis for this session ID"}), 404
+
+        jd_docs = {sid: sessions[sid]["jd_analysis"] for sid in dict.fromkeys(jd_session_ids)
+                   if sessions.get(sid, {}).get("jd_analysis")}
+
+        found_ids = list(jd_docs)
+        matches = score_matches(resume_analysis, [jd_docs[sid] for sid in found_ids])
+
+        ranked = sorted(
+            (
+                {
+                    "session_id":  sid,
+                    "company":     jd_docs[sid].get("company"),
+                    "role_title":  jd_docs[sid].get("role_title"),
+                    "match_score": match["score"],
+                    "matched":     match["matched"],
+                    "missing":     match["missing"],
+                }
+                for sid, match in zip(found_ids, matches)
+            ),
+            key=lambda r: r["match_score"],
+            reverse=True,
+        )
+
+        if ranked:
+            now = datetime.now(timezone.utc)
+            for r in ranked:
+                insert_later("match_scores", {
+                    "user_id":     user_id,
+                    "session_id":  r["session_id"],
+                    "company":     r["company"],
+                    "role_title":  r["role_title"],
+                    "match_score": r["match_score"],
+                    "created_at":  now,
+                })
+
+        return jsonify({
+            "resume_session_id": resume_session_id,
+            "results": ranked,
+            "not_found": [sid for sid in jd_session_ids if sid not in jd_docs],
+        }), 200
     except Exception as e:
-        print(f"🔥 Error in /match-score: {e}")
-        return jsonify({"error": str(e)}), 500
+        return route_error("match_score_batch_failed", e)
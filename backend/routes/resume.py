@@ -1,13 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask import session  # ✅ enables server-side session storage
-from backend.utils.db import get_collection
 from backend.utils.gemini_resume import analyze_resume
-import fitz
+from backend.utils.jobs import submit_job, wants_async
+from backend.utils.single_flight import single_flight
+from backend.utils.pdf_extract import extract_pdf_text, ExtractionError
+from backend.utils.provider_scheduler import route_error
+from backend.utils.sessions import get_session, record_resume, record_resume_analysis
+from backend.utils.document_store import session_text, store_original
 import uuid
 
 resume_api = Blueprint("resume_api", __name__)
-resumes_col = get_collection("resumes")
-resume_outputs_col = get_collection("resume_outputs")
 
 @resume_api.route("/upload-resume", methods=["POST"])
 def upload_resume():
@@ -22,16 +24,17 @@ def upload_resume():
         if not file.filename.lower().endswith('.pdf'):
             return jsonify({"error": "Only PDF files are supported"}), 400
 
-        resume_text = extract_text(file)
-        session_id = save_resume_to_mongodb(file.filename, resume_text)
+        resume_text = extract_pdf_text(file)
+        session_id = save_resume_to_mongodb(file.filename, resume_text, store_original(file, "resume"))
 
         session["resume_session_id"] = session_id  # ✅ store in Flask session
 
         return jsonify({"status": "uploaded", "filename": file.filename,"session_id": session_id})
 
+    except ExtractionError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
-        print(f"🔥 Upload Resume Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return route_error("upload_resume_failed", e)
 
 @resume_api.route("/analyze-resume", methods=["POST"])
 def analyze_resume_api():
@@ -42,35 +45,39 @@ def analyze_resume_api():
         if not session_id:
             return jsonify({"error": "No resume session ID in session"}), 400
 
-        resume_doc = resumes_col.find_one({"session_id": session_id})
-        if not resume_doc:
-            return jsonify({"error": "Resume not found"}), 404
-
-        result = analyze_resume(resume_doc["resume_text"])
-        resume_outputs_col.insert_one({
-            "session_id": session_id,
-            "user_id": user_id,
-            "analysis": result
-        })
-        return jsonify({
-            "status": "analyzed",
-            "session_id": session_id,
-            "analysis": result
-        })
+        if wants_async(request.get_json(silent=True)):
+            job_id = submit_job("analyze-resume", "gemini", run_resume_analysis, session_id, user_id)
+            return jsonify({"status": "queued", "job_id": job_id, "session_id": session_id}), 202
+
+        body, status = run_resume_analysis(session_id, user_id)
+        return jsonify(body), status
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return route_error("analyze_resume_failed", e)
 
-def extract_text(file):
-    doc = fitz.open(stream=file.read(), filetype="pdf")
-    return "".join([page.get_text() for page in doc])
+def run_resume_analysis(session_id, user_id):
+    # double-clicks and retries for the same session share one Gemini call and one insert
+    return single_flight(f"analyze-resume:{session_id}", lambda: _analyze_session_resume(session_id, user_id))
 
-def save_resume_to_mongodb(filename, resume_text):
-    session_id = str(uuid.uuid4())
-    record = {
+def _analyze_session_resume(session_id, user_id):
+    session_doc = get_session(session_id, "resume")
+    if not (session_doc and session_doc.get("resume")):
+        return {"error": "Resume not found"}, 404
+
+    resume_text = session_text(session_doc["resume"])
+    if resume_text is None:
+        # the session points at a text whose write never landed
+        return {"error": "Resume text is missing; please upload the resume again"}, 409
+
+    result = analyze_resume(resume_text)
+    record_resume_analysis(session_id, result, user_id)
+    return {
+        "status": "analyzed",
         "session_id": session_id,
-        "filename": filename,
-        "resume_text": resume_text
-    }
-    resumes_col.insert_one(record)
+        "analysis": result
+    }, 200
+
+def save_resume_to_mongodb(filename, resume_text, file_hash=None):
+    session_id = str(uuid.uuid4())
+    record_resume(session_id, filename, resume_text, file_hash)
     return session_id  # ✅ return session_id
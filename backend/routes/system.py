@@ -0,0 +1,31 @@
+from flask import Blueprint, Response, jsonify
+from backend.utils.cache import cache_stats
+from backend.utils.providers import provider_status
+from backend.utils.question_bank import question_bank_stats
+from backend.utils.lifecycle import liveness, readiness
+from backend.utils.tracing import render_metrics
+from backend.utils.write_behind import write_behind_stats
+
+system_api = Blueprint("system_api", __name__)
+
+@system_api.route("/cache-stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify({**cache_stats(), "question_bank": question_bank_stats(),
+                    "write_behind": write_behind_stats()}), 200
+
+@system_api.route("/providers", methods=["GET"])
+def get_provider_status():
+    return jsonify(provider_status()), 200
+
+@system_api.route("/healthz", methods=["GET"])
+def get_liveness():
+    return jsonify(liveness()), 200
+
+@system_api.route("/readyz", methods=["GET"])
+def get_readiness():
+    ready, details = readiness()
+    return jsonify(details), 200 if ready else 503
+
+@system_api.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,71 @@
+"""
+Run the API outside the Flask dev server.
+
+    python -m backend.serve                       # gunicorn, settings from gunicorn.conf.py
+    python -m backend.serve --mode threaded       # one process, one thread per request
+    python -m backend.serve --mode single         # one process, one request at a time
+
+gunicorn is the production mode (POSIX only). "threaded" is the fallback
+where gunicorn is not available, and "single" is the old dev-server model,
+kept as the baseline for backend/benchmarks/load_test.py. Every mode drains
+in-flight requests, async LLM jobs and answer writes on SIGTERM/SIGINT.
+"""
+import os
+import signal
+import argparse
+import threading
+
+CONF_PATH = os.path.join(os.path.dirname(__file__), "gunicorn.conf.py")
+
+
+def run_gunicorn(port: int):
+    from gunicorn.app.base import Application
+
+    class CareerPilotServer(Application):
+        def init(self, parser, opts, args):
+            pass
+
+        def load_config(self):
+            self.load_config_from_file(CONF_PATH)
+            self.cfg.set("bind", f"{os.getenv('HOST', '0.0.0.0')}:{port}")
+
+        def load(self):
+            from backend.wsgi import app
+            return app
+
+    CareerPilotServer().run()
+
+
+def run_werkzeug(port: int, threaded: bool):
+    from werkzeug.serving import make_server
+    from backend.app import create_app
+    from backend.utils import lifecycle
+
+    server = make_server(os.getenv("HOST", "0.0.0.0"), port, create_app(), threaded=threaded)
+
+    def stop(signum, frame):
+        lifecycle.start_draining()
+        # shutdown() blocks until serve_forever returns, so it can't run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Serving on port {port} ({'threaded' if threaded else 'single'})", flush=True)
+    server.serve_forever()
+    print(f"Drained: {lifecycle.drain()}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["gunicorn", "threaded", "single"], default=os.getenv("WEB_MODE", "gunicorn"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5000")))
+    args = parser.parse_args()
+
+    if args.mode == "gunicorn":
+        run_gunicorn(args.port)
+    else:
+        run_werkzeug(args.port, threaded=args.mode == "threaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+Tests run offline: an in-memory MongoDB and the fake providers.
+
+    python -m pytest backend/tests
+"""
+import os
+
+# must be set before backend.utils.db is imported
+os.environ.setdefault("MONGO_URI", "mongomock://")
+os.environ.setdefault("USE_FAKE_PROVIDERS", "1")
+os.environ.setdefault("DB_MIGRATE_ON_STARTUP", "0")
+os.environ.setdefault("TRACING_ENABLED", "0")
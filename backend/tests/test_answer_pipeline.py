@@ -0,0 +1,45 @@
+import pytest
+
+from backend.utils import answer_pipeline
+from backend.utils.answer_pipeline import process_answer_stream
+from backend.utils.audio_preprocess import EmptyAudioError
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(answer_pipeline, "analyze_segment",
+                        lambda question_id, text, session_id: calls.append(text) or {"note": "ok"})
+    monkeypatch.setattr(answer_pipeline, "analyze_answer",
+                        lambda question_id, text, session_id: calls.append(text) or {"score": 80})
+    monkeypatch.setattr(answer_pipeline, "persist_answer_async", lambda *args: None)
+    return calls
+
+
+def _transcribe(*finals):
+    def transcribe_stream(chunks, sample_rate, encoding):
+        for text in finals:
+            yield {"is_final": False, "transcript": text[:3]}
+            yield {"is_final": True, "transcript": text}
+    return transcribe_stream
+
+
+def test_silence_makes_no_llm_call(monkeypatch, llm_calls):
+    monkeypatch.setattr(answer_pipeline, "transcribe_stream", _transcribe())
+    with pytest.raises(EmptyAudioError):
+        list(process_answer_stream("s1", "q1", iter([]), 16000, "LINEAR16"))
+    assert llm_calls == []
+
+
+def test_short_segments_are_reviewed_in_capped_stretches(monkeypatch, llm_calls):
+    monkeypatch.setattr(answer_pipeline, "SEGMENT_FEEDBACK_MIN_CHARS", 20)
+    monkeypatch.setattr(answer_pipeline, "SEGMENT_FEEDBACK_MAX_CALLS", 2)
+    monkeypatch.setattr(answer_pipeline, "transcribe_stream", _transcribe(*[f"segment {n:02d}" for n in range(10)]))
+    events = list(process_answer_stream("s1", "q1", iter([]), 16000, "LINEAR16"))
+
+    reviewed = [e["segment"] for e in events if e["type"] == "segment_feedback"]
+    assert reviewed == [1, 3]
+    # two stretches and the overall review, which may finish in any order
+    assert sorted(llm_calls, key=len) == ["segment 00 segment 01", "segment 02 segment 03",
+                                          " ".join(f"segment {n:02d}" for n in range(10))]
+    assert events[-1]["type"] == "feedback"
@@ -0,0 +1,57 @@
+import struct
+
+import numpy as np
+import pytest
+
+from backend.utils.audio_preprocess import (
+    TARGET_SAMPLE_RATE, EmptyAudioError, UnreadableAudioError, decode_wav, preprocess_audio,
+)
+
+RATE = 16000
+
+
+def _wav(samples: np.ndarray, tag: int = 1, width: int = 2, extensible: bool = False) -> bytes:
+    if tag == 3:
+        data = samples.astype("<f4").tobytes()
+    else:
+        data = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+    fmt = struct.pack("<HHIIHH", 0xFFFE if extensible else tag, 1, RATE, RATE * width, width, width * 8)
+    if extensible:
+        fmt += struct.pack("<HHI", 22, width * 8, 4) + struct.pack("<H", tag) + bytes(14)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def _speech(peak: float, seconds: float = 2.0) -> np.ndarray:
+    """One second of tone at `peak` amplitude between stretches of near-silence."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(RATE * seconds)) / RATE
+    signal = peak * np.sin(2 * np.pi * 220 * t) * ((t > 0.5) & (t < 1.5))
+    return (signal + rng.normal(0, peak / 100, t.size)).astype(np.float32)
+
+
+@pytest.mark.parametrize("extensible", [False, True])
+def test_float_wav_is_decoded(extensible):
+    samples, rate = decode_wav(_wav(_speech(0.5), tag=3, width=4, extensible=extensible))
+    assert rate == RATE
+    assert samples.shape == (RATE * 2, 1)
+    assert abs(samples.max() - 0.5) < 0.05
+
+
+def test_compressed_wav_is_rejected():
+    mulaw = _wav(_speech(0.5), tag=7, width=2)
+    with pytest.raises(UnreadableAudioError):
+        preprocess_audio(mulaw)
+
+
+def test_quiet_recording_is_kept():
+    # about -34 dBFS, which the old fixed 0.01 RMS floor rejected outright
+    pcm, rate = preprocess_audio(_wav(_speech(0.02)))
+    assert rate == TARGET_SAMPLE_RATE
+    assert 0.9 * RATE * 2 < len(pcm) < 1.5 * RATE * 2
+
+
+def test_steady_hiss_is_not_speech():
+    hiss = np.random.default_rng(1).normal(0, 0.05, RATE * 2).astype(np.float32)
+    with pytest.raises(EmptyAudioError):
+        preprocess_audio(_wav(hiss))
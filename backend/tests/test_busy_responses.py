@@ -0,0 +1,52 @@
+import io
+import uuid
+
+import pytest
+
+from backend.app import create_app
+from backend.routes import interview, jd
+from backend.utils.provider_scheduler import ProviderBusyError
+from backend.utils.providers import CircuitOpenError
+
+
+class _SdkError(Exception):
+    status_code = 401
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(jd, "get_session", lambda session_id, *parts: {"jd": {"text": "Python developer"}})
+    return create_app().test_client()
+
+
+def test_busy_provider_is_503_with_retry_after(client, monkeypatch):
+    def busy(text):
+        raise ProviderBusyError("gemini is at capacity", retry_after=2.2)
+
+    monkeypatch.setattr(jd, "analyze_job_description_gemini", busy)
+    response = client.post("/analyze-jd", json={"session_id": uuid.uuid4().hex})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.get_json()["retry_after"] == 3
+
+
+def test_sdk_status_does_not_reach_the_browser(client, monkeypatch):
+    def unauthorized(text):
+        raise _SdkError("API key not valid")
+
+    monkeypatch.setattr(jd, "analyze_job_description_gemini", unauthorized)
+    response = client.post("/analyze-jd", json={"session_id": uuid.uuid4().hex})
+    assert response.status_code == 500
+    assert "Retry-After" not in response.headers
+
+
+def test_busy_speech_is_503_not_transcription_failed(client, monkeypatch):
+    def open_circuit(pcm, sample_rate):
+        raise CircuitOpenError("speech is temporarily unavailable; try again shortly", 9.5)
+
+    monkeypatch.setattr(interview, "preprocess_audio", lambda audio: (b"\0\0" * 1600, 16000))
+    monkeypatch.setattr(interview, "transcribe_audio_bytes", open_circuit)
+    response = client.post("/submit-answer", data={"session_id": "s1", "question_id": "q1",
+                                                   "file": (io.BytesIO(b"RIFF"), "a.wav")})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"
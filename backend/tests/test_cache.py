@@ -0,0 +1,32 @@
+import uuid
+
+from backend.utils import cache
+from backend.utils.cache import cached_analyses
+
+
+def test_batch_writes_reach_the_mongo_tier():
+    kind = f"test-{uuid.uuid4().hex}"
+    texts = ["first section", "second section", "third section"]
+    errors = cache.cache_stats()["errors"]
+    computed = cached_analyses(kind, texts, "model", "v1", lambda missing: [{"text": t} for t in missing])
+    assert computed == [{"text": t} for t in texts]
+
+    cache._memory.clear()
+    before = cache.cache_stats()["mongo_hits"]
+    again = cached_analyses(kind, texts, "model", "v1", lambda missing: [None] * len(missing))
+    assert again == computed
+    assert cache.cache_stats()["mongo_hits"] - before == 3
+    assert cache.cache_stats()["errors"] == errors
+
+
+def test_annotating_a_cached_analysis_does_not_change_the_cache():
+    kind = f"test-{uuid.uuid4().hex}"
+    first = cached_analyses(kind, ["python developer"], "model", "v1",
+                            lambda missing: [{"skills": ["python"]} for _ in missing])[0]
+    first["session_id"] = "s1"
+    first["skills"].append("added by a route")
+
+    again = cached_analyses(kind, ["python developer"], "model", "v1", lambda missing: [None] * len(missing))[0]
+    assert again == {"skills": ["python"]}
+    again["skills"].clear()
+    assert cache._memory.get(cache.cache_key(kind, "python developer", "model", "v1")) == {"skills": ["python"]}
@@ -0,0 +1,32 @@
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from backend.utils import db_indexes
+from backend.utils.db import get_collection
+
+
+class _Failing:
+    def __init__(self, error):
+        self.error = error
+
+    def create_index(self, keys, **options):
+        raise self.error
+
+
+def test_a_failing_index_does_not_stop_the_others(monkeypatch):
+    monkeypatch.setattr(db_indexes, "get_collection",
+                        lambda name: _Failing(OperationFailure("conflict")) if name == "jobs" else get_collection(name))
+    assert db_indexes.ensure_indexes(timeout=1) == 1
+    assert "user_created_at" in get_collection("match_scores").index_information()
+
+
+def test_no_server_skips_the_remaining_indexes(monkeypatch):
+    calls = []
+
+    def unreachable(name):
+        calls.append(name)
+        return _Failing(ServerSelectionTimeoutError("no servers"))
+
+    monkeypatch.setattr(db_indexes, "get_collection", unreachable)
+    total = sum(len(specs) for specs in db_indexes.INDEXES.values())
+    assert db_indexes.ensure_indexes(timeout=1) == total
+    assert len(calls) == 1
@@ -0,0 +1,83 @@
+import io
+import uuid
+
+from backend.app import create_app
+from backend.routes import jd
+from backend.utils import document_store, write_behind
+from backend.utils.document_store import flush_uploads, get_text, put_text, store_original, text_hash
+from backend.utils.write_behind import await_pending
+
+
+class _BrokenCollection:
+    def with_options(self, **kwargs):
+        return self
+
+    def bulk_write(self, requests, ordered=True):
+        raise ValueError("not a MongoDB error")
+
+
+def test_text_is_cached_only_once_its_write_lands(monkeypatch):
+    text = f"Senior Python developer {uuid.uuid4()}"
+    real = write_behind.get_collection
+    monkeypatch.setattr(write_behind, "get_collection",
+                        lambda name: _BrokenCollection() if name == "documents" else real(name))
+    digest = put_text(text, "jd")
+    await_pending("documents", [digest])
+    assert document_store._texts.get(digest) is None
+    monkeypatch.setattr(write_behind, "get_collection", real)
+    assert get_text(digest) is None
+
+    # the next upload of the same text writes it again
+    assert put_text(text, "jd") == digest
+    await_pending("documents", [digest])
+    assert document_store._texts.get(digest) == text
+    assert get_text(digest) == text
+
+
+def test_analyzing_a_session_whose_text_is_missing_is_a_409(monkeypatch):
+    missing = text_hash(f"never stored {uuid.uuid4()}")
+    monkeypatch.setattr(jd, "get_session", lambda session_id, *parts: {"jd": {"text_hash": missing}})
+    response = create_app().test_client().post("/analyze-jd", json={"session_id": uuid.uuid4().hex})
+    assert response.status_code == 409
+
+
+class _FakeFile:
+    filename = "resume.pdf"
+    mimetype = "application/pdf"
+
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+
+
+class _FakeBucket:
+    def __init__(self, fail: bool):
+        self.fail, self.files = fail, {}
+
+    def find(self, filter_):
+        return _FakeCursor([filter_["_id"]] if filter_["_id"] in self.files else [])
+
+    def upload_from_stream_with_id(self, file_id, filename, source, metadata=None):
+        if self.fail:
+            raise ConnectionError("GridFS is unreachable")
+        self.files[file_id] = source.read()
+
+
+class _FakeCursor(list):
+    def limit(self, n):
+        return self
+
+
+def test_a_failed_original_upload_is_retried_by_the_next_one(monkeypatch):
+    data = f"%PDF-1.7 {uuid.uuid4()}".encode()
+    monkeypatch.setattr(document_store, "STORE_ORIGINAL_UPLOADS", True)
+    monkeypatch.setattr(document_store, "_uploads", lambda: _FakeBucket(fail=True))
+    digest = store_original(_FakeFile(data), "resume")
+    assert flush_uploads(5) == 0
+    assert document_store._known_files.get(digest) is None
+
+    bucket = _FakeBucket(fail=False)
+    monkeypatch.setattr(document_store, "_uploads", lambda: bucket)
+    assert store_original(_FakeFile(data), "resume") == digest
+    assert flush_uploads(5) == 0
+    assert bucket.files == {digest: data}
+    assert document_store._known_files.get(digest) is True
@@ -0,0 +1,44 @@
+import uuid
+
+from backend.utils import cache, gemini_resume, prompt_builder
+from backend.utils.cache import cache_key
+from backend.utils.prompt_builder import clean_document, split_sections
+
+
+def _resume(tag: str) -> str:
+    skills = "\n".join(f"- Python and MongoDB tuning {tag} item {n}" for n in range(200))
+    return f"Jane Doe\njane@example.com\nSkills\nPython, Flask\nInterests\n{skills}"
+
+
+def _cached(name: str, text: str) -> bool:
+    key = cache_key("resume_section", f"{name}\n{text}", gemini_resume.MODEL_NAME, gemini_resume.PROMPT_VERSION)
+    return cache._lookup(key) is not None
+
+
+def test_a_shortened_section_is_cached_under_the_text_sent(monkeypatch):
+    resume = _resume(uuid.uuid4().hex)
+    sections = dict(split_sections(clean_document(resume)))
+    monkeypatch.setitem(prompt_builder.MODEL_TOKEN_BUDGETS, gemini_resume.MODEL_NAME, 1600)
+    sent = []
+    real = gemini_resume._analyze_sections
+    monkeypatch.setattr(gemini_resume, "_analyze_sections",
+                        lambda secs, attrs: sent.extend(secs) or real(secs, attrs))
+
+    assert "error" not in gemini_resume.analyze_resume(resume)
+    interests = dict(sent)["interests"]
+    assert len(interests) < len(sections["interests"])
+    assert _cached("interests", interests)
+    assert not _cached("interests", sections["interests"])
+    assert _cached("skills", sections["skills"])
+
+
+def test_identical_text_under_two_headings_keeps_both_names(monkeypatch):
+    text = f"Python, Flask, MongoDB {uuid.uuid4().hex}"
+    monkeypatch.setattr(gemini_resume, "split_sections", lambda cleaned: [("skills", text), ("projects", text)])
+    sent = []
+    real = gemini_resume._analyze_sections
+    monkeypatch.setattr(gemini_resume, "_analyze_sections",
+                        lambda secs, attrs: sent.extend(secs) or real(secs, attrs))
+
+    assert "error" not in gemini_resume.analyze_resume(text)
+    assert sent == [("skills", text), ("projects", text)]
@@ -0,0 +1,51 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from backend.app import create_app
+from backend.routes import history
+from backend.utils.db import get_collection
+
+USER = "spartan@sjsu.com"
+
+
+@pytest.fixture
+def scores(monkeypatch):
+    col = get_collection(f"match_scores_{uuid.uuid4().hex}")
+    monkeypatch.setattr(history, "match_scores_col", col)
+    start = datetime(2026, 1, 1)
+    col.insert_many([{"user_id": USER, "company": f"dated-{n}", "match_score": n,
+                      "created_at": start + timedelta(days=n)} for n in range(5)])
+    # written before created_at existed and not yet backfilled
+    col.insert_many([{"_id": ObjectId(), "user_id": USER, "company": f"legacy-{n}", "match_score": n}
+                     for n in range(3)])
+    return col
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+def test_pages_walk_every_row_including_legacy_ones(scores, client):
+    seen, cursor = [], None
+    while True:
+        body = client.get("/history", query_string={"limit": 2, **({"cursor": cursor} if cursor else {})}).get_json()
+        seen += [item["company"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"dated-{n}" for n in range(4, -1, -1)] + [f"legacy-{n}" for n in range(2, -1, -1)]
+
+
+def test_unpaged_request_keeps_the_bare_list(scores, client):
+    response = client.get("/history")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 8
+
+
+@pytest.mark.parametrize("body", [{"limit": None}, {"limit": [5]}, [1, 2], "limit", {"cursor": "not-a-cursor"}])
+def test_malformed_options_are_a_400(scores, client, body):
+    assert client.post("/history", json=body).status_code == 400
@@ -0,0 +1,55 @@
+import pytest
+
+from backend.utils import jobs
+from backend.utils.jobs import get_job, submit_job, wait_for_job
+from backend.utils.provider_scheduler import ProviderBusyError
+
+
+class _FlakyJobs:
+    """jobs_col whose "running" update fails once."""
+
+    def __init__(self, real):
+        self.real = real
+
+    def __getattr__(self, name):
+        return getattr(self.real, name)
+
+    def update_one(self, filter_, update):
+        if update["$set"].get("status") == "running":
+            raise RuntimeError("primary stepped down")
+        return self.real.update_one(filter_, update)
+
+
+def _finished(job_id: str) -> dict:
+    if job_id in jobs._events:
+        wait_for_job(job_id, 5)
+    doc = get_job(job_id)
+    assert doc["status"] not in ("queued", "running")
+    return doc
+
+
+def test_job_result_and_status_are_recorded():
+    job_id = submit_job("test", "gemini", lambda x: ({"doubled": x * 2}, 201), 21)
+    doc = _finished(job_id)
+    assert doc["status"] == "done"
+    assert doc["result"] == {"doubled": 42}
+    assert doc["http_status"] == 201
+
+
+def test_busy_provider_fails_the_job_with_retry_after():
+    def busy():
+        raise ProviderBusyError("gemini is at capacity", retry_after=1.5)
+
+    job_id = submit_job("test", "gemini", busy)
+    doc = _finished(job_id)
+    assert doc["status"] == "failed"
+    assert doc["http_status"] == 503
+    assert doc["retry_after"] == 2
+
+
+def test_a_failed_running_update_still_finishes_the_job(monkeypatch):
+    monkeypatch.setattr(jobs, "jobs_col", _FlakyJobs(jobs.jobs_col))
+    job_id = submit_job("test", "gemini", lambda: pytest.fail("must not run"))
+    doc = _finished(job_id)
+    assert doc["status"] == "failed"
+    assert doc["http_status"] == 500
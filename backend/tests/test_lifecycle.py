@@ -0,0 +1,29 @@
+import threading
+
+from backend.utils import lifecycle
+
+
+def test_concurrent_finish_drain_waits_for_one_drain(monkeypatch):
+    monkeypatch.setattr(lifecycle, "_drain_thread", None)
+    monkeypatch.setattr(lifecycle, "_drain_report", {})
+    monkeypatch.setattr(lifecycle, "_draining", threading.Event())
+    runs = []
+    monkeypatch.setattr(lifecycle, "drain", lambda timeout: runs.append(timeout) or {"requests_left": 0})
+
+    reports, errors = [], []
+
+    def finish():
+        try:
+            reports.append(lifecycle.finish_drain(5))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=finish) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert runs == [5]
+    assert reports == [{"requests_left": 0}] * 16
@@ -0,0 +1,64 @@
+import pytest
+
+from backend.utils.llm_json import (
+    IncrementalJSONParser, LLMOutputError, extract_json, parse_llm_output, parse_structured, repair_json,
+    stream_json_events,
+)
+from backend.utils.schemas import AnswerFeedback, InterviewQuestions
+
+
+def test_code_fenced_reply_with_prose():
+    reply = 'Sure! Here is the analysis:\n```json\n{"strengths": ["clear"], "score": 80}\n```\nHope it helps.'
+    assert extract_json(reply) == {"strengths": ["clear"], "score": 80}
+
+
+@pytest.mark.parametrize("broken, expected", [
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ("{'a': True, b: None}", {"a": True, "b": None}),
+    ('{"a": "x" "b": "y"}', {"a": "x", "b": "y"}),
+    ('{"a": 1, // note\n "b": 2}', {"a": 1, "b": 2}),
+])
+def test_repair_common_damage(broken, expected):
+    assert extract_json(broken) == expected
+
+
+def test_truncated_object_is_closed():
+    truncated = '{"strengths": ["clear structure", "good exam'
+    assert extract_json(truncated) == {"strengths": ["clear structure", "good exam"]}
+    assert repair_json('{"score": 80, "improvements":') == '{"score": 80, "improvements":null}'
+
+
+def test_incremental_parser_matches_a_single_feed():
+    reply = 'Here you go: {"questions": ["Why {Python}?", "Tell me about \\"scale\\""]} trailing'
+    parser = IncrementalJSONParser()
+    for i in range(0, len(reply), 3):
+        parser.feed(reply[i:i + 3])
+    assert parser.complete
+    assert extract_json(reply) == parser.result() == {"questions": ["Why {Python}?", 'Tell me about "scale"']}
+
+
+def test_partial_value_only_holds_finished_items():
+    parser = IncrementalJSONParser()
+    parser.feed('{"score": 70, "strengths": ["concise", "spec')
+    assert parser.partial(complete_only=True) == {"score": 70, "strengths": ["concise"]}
+    assert parser.partial() == {"score": 70, "strengths": ["concise", "spec"]}
+
+
+def test_schema_rejection():
+    with pytest.raises(LLMOutputError):
+        parse_llm_output('{"strengths": ["clear"]}', AnswerFeedback)  # score is required
+    assert parse_structured('{"score": "abc"}', AnswerFeedback, "Failed to parse JSON") == {
+        "error": "Failed to parse JSON", "raw": '{"score": "abc"}'}
+
+
+def test_schema_normalizes_lenient_values():
+    assert parse_llm_output('{"strengths": "clear, concise", "score": "7/10"}', AnswerFeedback)["score"] == 70
+    assert parse_llm_output('[{"question": "Why Flask?"}]', InterviewQuestions)["questions"] == ["Why Flask?"]
+
+
+def test_stream_events_emit_items_as_they_complete():
+    chunks = ['{"strengths": ["cle', 'ar", "brief"], "improvements": [', '"depth"], "score": 6', '5}']
+    events = list(stream_json_events(chunks, AnswerFeedback))
+    assert [e for e in events if e[0] == "item"] == [
+        ("item", "strengths", "clear"), ("item", "strengths", "brief"), ("item", "improvements", "depth")]
+    assert events[-1] == ("result", None, {"strengths": ["clear", "brief"], "improvements": ["depth"], "score": 65})
@@ -0,0 +1,42 @@
+import pytest
+
+from backend.utils.match_engine import score_match, score_matches
+
+RESUME = {"technical_skills": ["Python", "Go", "Amazon Web Services (AWS)", "REST APIs", "AI", "TypeScript"],
+          "tools": ["Docker", "Git"]}
+
+
+def _matched_by(requirement: str, resume: dict = RESUME):
+    (row,) = score_match(resume, {"required_skills": [requirement]})["breakdown"]
+    return row["matched_by"]
+
+
+@pytest.mark.parametrize("requirement, skill", [
+    ("3+ years with Python and AWS", "aws"),
+    ("Proficiency in Go", "go"),
+    ("Go", "go"),
+    ("Designing RESTful APIs", "rest api"),
+    ("Experience applying AI to search", "artificial intelligence"),
+    ("TS or JavaScript", "typescript"),
+    ("Docker/Kubernetes", "docker"),
+])
+def test_skills_inside_requirement_phrases_match(requirement, skill):
+    assert _matched_by(requirement) == skill
+
+
+@pytest.mark.parametrize("requirement", [
+    "Willing to go above and beyond",
+    "Collaborate with the rest of the team",
+    "Tailor your cv to the role",
+    "Comfortable with ts and other acronyms",
+])
+def test_everyday_words_do_not_match_skills(requirement):
+    assert _matched_by(requirement) is None
+
+
+def test_batch_scores_match_single_scores():
+    jds = [{"required_skills": ["Python", "Kubernetes"], "preferred_skills": ["Go"]},
+           {"required_skills": ["go above and beyond"]},
+           {}]
+    assert score_matches(RESUME, jds) == [score_match(RESUME, jd) for jd in jds]
+    assert [r["score"] for r in score_matches(RESUME, jds)] == [60, 0, 0]
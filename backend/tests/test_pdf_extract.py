@@ -0,0 +1,52 @@
+import io
+
+import fitz
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from backend.utils import pdf_extract
+from backend.utils.pdf_extract import ExtractionError, extract_pdf_text
+
+
+def _pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for n in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {n + 1} of the resume")
+    return doc.tobytes()
+
+
+def _upload(data: bytes) -> FileStorage:
+    return FileStorage(io.BytesIO(data), filename="resume.pdf", content_type="application/pdf")
+
+
+def test_pages_are_joined_with_form_feeds():
+    text = extract_pdf_text(_upload(_pdf(3)))
+    assert [page.strip() for page in text.split("\f")] == [f"Page {n} of the resume" for n in (1, 2, 3)]
+
+
+def test_large_documents_split_across_the_pool_keep_page_order(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "PDF_PARALLEL_MIN_PAGES", 4)
+    monkeypatch.setattr(pdf_extract, "PDF_WORKERS", 2)
+    text = extract_pdf_text(_upload(_pdf(5)))
+    assert [page.strip() for page in text.split("\f")] == [f"Page {n} of the resume" for n in range(1, 6)]
+
+
+def test_too_many_pages_is_a_413(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "PDF_MAX_PAGES", 2)
+    with pytest.raises(ExtractionError) as err:
+        extract_pdf_text(_upload(_pdf(3)))
+    assert err.value.status_code == 413
+
+
+def test_oversized_upload_is_a_413_before_parsing(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "extract_pdf_path", lambda path: pytest.fail("must not parse"))
+    with pytest.raises(ExtractionError) as err:
+        extract_pdf_text(_upload(b"%PDF" + bytes(pdf_extract.PDF_MAX_BYTES)))
+    assert err.value.status_code == 413
+
+
+@pytest.mark.parametrize("data", [b"", b"not a pdf at all"])
+def test_empty_or_broken_upload_is_a_400(data):
+    with pytest.raises(ExtractionError) as err:
+        extract_pdf_text(_upload(data))
+    assert err.value.status_code == 400
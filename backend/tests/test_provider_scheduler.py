@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+
+from backend.utils import fake_providers, provider_scheduler, providers
+from backend.utils.provider_scheduler import BACKGROUND, INTERACTIVE, ProviderBusyError, priority
+from backend.utils.providers import CircuitOpenError, gemini_generate, gemini_generate_stream
+
+MODEL = "gemini-1.5-flash"
+
+
+@pytest.fixture(autouse=True)
+def scheduler():
+    provider_scheduler.configure({"gemini": {"rpm": 0, "tpm": 0, "concurrency": 4}}, enabled=True)
+    yield provider_scheduler
+    provider_scheduler.configure(enabled=True)
+    fake_providers.reset_fake_quotas()
+
+
+def _quota(monkeypatch, requests: int, window: float) -> fake_providers.FakeQuota:
+    monkeypatch.setenv("FAKE_GEMINI_QUOTA_REQUESTS", str(requests))
+    monkeypatch.setenv("FAKE_QUOTA_WINDOW_SECONDS", str(window))
+    fake_providers.reset_fake_quotas()
+    return fake_providers.fake_quota("gemini")
+
+
+def _wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _inflight() -> int:
+    return provider_scheduler._lane("gemini", MODEL).inflight
+
+
+def test_stream_holds_its_permit_until_exhausted():
+    stream = gemini_generate_stream(MODEL, "Rate this interview answer.", purpose="test")
+    next(stream)
+    assert _inflight() == 1
+    list(stream)
+    assert _inflight() == 0
+
+
+def test_closing_a_stream_early_releases_its_permit():
+    stream = gemini_generate_stream(MODEL, "Rate this interview answer.", purpose="test")
+    next(stream)
+    stream.close()
+    assert _inflight() == 0
+
+
+def test_permits_go_to_interactive_calls_first(scheduler):
+    scheduler.configure({"gemini": {"rpm": 0, "tpm": 0, "concurrency": 1}}, enabled=True)
+    lane = scheduler._lane("gemini", MODEL)
+    held = scheduler.acquire("gemini", MODEL)
+    order = []
+
+    def call(level, name):
+        with priority(level):
+            permit = scheduler.acquire("gemini", MODEL)
+        order.append(name)
+        permit.release()
+
+    threads = [threading.Thread(target=call, args=(BACKGROUND, f"background-{n}")) for n in range(3)]
+    threads.append(threading.Thread(target=call, args=(INTERACTIVE, "interactive")))
+    for t in threads:
+        t.start()
+        _wait_until(lambda: len(lane.queue) == len([t for t in threads if t.is_alive()]))
+    held.release()
+    for t in threads:
+        t.join()
+    assert order[0] == "interactive"
+    assert order[1:] == ["background-0", "background-1", "background-2"]
+
+
+def test_no_429s_while_calls_stay_under_the_quota(scheduler, monkeypatch):
+    quota = _quota(monkeypatch, requests=10, window=1)
+    # 90% of the quota, and a bucket holding a tenth of a second of it
+    scheduler.configure({"gemini": {"rpm": 10 * 60 * 0.9, "tpm": 0, "burst": 0.1, "concurrency": 8}}, enabled=True)
+    errors = []
+
+    def call(n):
+        try:
+            gemini_generate(MODEL, f"Rate this interview answer #{n}.", purpose="test")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert quota.rejected == 0
+    assert quota.accepted == 12
+
+
+def test_a_429_halves_the_concurrency_limit(scheduler, monkeypatch):
+    _quota(monkeypatch, requests=1, window=60)
+    monkeypatch.setattr(providers, "PROVIDER_MAX_RETRIES", 0)
+    lane = scheduler._lane("gemini", MODEL)
+    gemini_generate(MODEL, "Rate this interview answer.", purpose="test")
+    assert lane.stats()["concurrency_limit"] == 4
+
+    with pytest.raises(ProviderBusyError):
+        gemini_generate(MODEL, "Rate this interview answer.", purpose="test")
+    assert lane.stats()["concurrency_limit"] == 2
+    assert lane.throttles == 1
+
+    # additive increase: +1/limit per success, so about one step per limit's worth
+    for _ in range(3):
+        scheduler.acquire("gemini", MODEL).release()
+    assert lane.stats()["concurrency_limit"] == 3
+
+
+def test_a_call_that_cannot_get_a_permit_in_time_is_a_503(scheduler, monkeypatch):
+    scheduler.configure({"gemini": {"rpm": 0, "tpm": 0, "concurrency": 1}}, enabled=True)
+    monkeypatch.setitem(scheduler.MAX_WAIT_SECONDS, INTERACTIVE, 0.05)
+    held = scheduler.acquire("gemini", MODEL)
+    try:
+        with priority(INTERACTIVE), pytest.raises(ProviderBusyError) as busy:
+            gemini_generate(MODEL, "Rate this interview answer.", purpose="test")
+    finally:
+        held.release()
+    assert busy.value.status_code == 503
+    assert busy.value.retry_after >= 1
+    assert scheduler._lane("gemini", MODEL).timeouts == 1
+
+
+def test_a_half_open_circuit_lets_exactly_one_probe_through():
+    breaker = providers.CircuitBreaker(threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("gemini")
+    time.sleep(0.02)
+
+    assert breaker.before_call("gemini") is True
+    assert breaker.state == "half-open"
+    for _ in range(3):
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call("gemini")
+
+    breaker.record_failure()  # the probe failed: a fresh reset window
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("gemini")
+    time.sleep(0.02)
+    assert breaker.before_call("gemini") is True
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call("gemini") is False
+
+
+def test_a_probe_that_proves_nothing_hands_over_to_the_next_call():
+    breaker = providers.CircuitBreaker(threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.before_call("gemini") is True
+    breaker.end_probe()
+    assert breaker.before_call("gemini") is True
@@ -0,0 +1,35 @@
+import uuid
+
+import numpy as np
+
+from backend.utils import question_bank
+from backend.utils.question_bank import QuestionBank, embed, question_id
+
+
+def _doc(text, skills):
+    return {"_id": question_id(text), "text": text, "skills": skills}
+
+
+def test_new_tags_on_a_known_question_update_its_row():
+    bank = QuestionBank()
+    text = f"How would you shard a write-heavy collection? {uuid.uuid4()}"
+    bank._append([_doc(text, ["mongodb"])])
+    bank._append([_doc(text, ["mongodb", "system design"])])
+
+    assert len(bank) == 1
+    assert bank._docs[0]["skills"] == ["mongodb", "system design"]
+    assert bank._by_tag["system design"] == [0]
+    assert np.allclose(bank._matrix[0], embed([text], [["mongodb", "system design"]])[0])
+    assert np.isfinite(bank.rank(["system design"])[0, 0])
+
+
+def test_matrix_grows_geometrically(monkeypatch):
+    monkeypatch.setattr(question_bank, "MIN_MATRIX_ROWS", 4)
+    bank = QuestionBank()
+    capacities = set()
+    for n in range(20):
+        bank._append([_doc(f"Question {n} about Python", ["python"])])
+        capacities.add(len(bank._matrix))
+    assert capacities == {4, 8, 16, 32}
+    assert bank.rank(["python"]).shape == (1, 20)
+    assert np.allclose(bank._matrix[19], embed(["Question 19 about Python"], [["python"]])[0])
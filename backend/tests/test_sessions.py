@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+
+from bson import ObjectId
+
+from backend.utils.db import get_collection
+from backend.utils.sessions import backfill_sessions, sessions_col
+
+
+def test_backfill_takes_the_newest_jd_across_both_collections():
+    upload_first, dashboard_first = uuid.uuid4().hex, uuid.uuid4().hex
+    older = ObjectId.from_datetime(datetime(2020, 1, 1))
+    get_collection("job_descriptions").insert_many([
+        {"_id": older, "session_id": upload_first, "jd_text": "old upload"},
+        {"session_id": dashboard_first, "jd_text": "new upload"},
+    ])
+    get_collection("jds").insert_many([
+        {"session_id": upload_first, "jd_text": "new dashboard"},
+        {"_id": older, "session_id": dashboard_first, "jd_text": "old dashboard"},
+    ])
+
+    report = backfill_sessions()
+
+    assert report["job_descriptions + jds"] >= 2
+    assert sessions_col.find_one({"_id": upload_first})["jd"]["text"] == "new dashboard"
+    assert sessions_col.find_one({"_id": upload_first})["jd"]["source"] == "dashboard"
+    assert sessions_col.find_one({"_id": dashboard_first})["jd"]["text"] == "new upload"
@@ -0,0 +1,45 @@
+import time
+import uuid
+
+from backend.utils import single_flight as sf
+
+
+def test_follower_in_another_process_gets_body_and_status_back():
+    key = f"test:{uuid.uuid4()}"
+    flight = "other-worker:1"
+    sf.locks_col.insert_one({"_id": key, "flight": flight, "expires_at": sf._now()})
+    sf.results_col.insert_one({"_id": key, "flight": flight, "result": {"error": "Resume not found"}, "status": 404})
+    sf.locks_col.delete_one({"_id": key})
+    assert sf._follow(key, flight, time.monotonic() + 1) == ({"error": "Resume not found"}, 404)
+
+
+def test_leader_result_round_trips_as_tuple():
+    key = f"test:{uuid.uuid4()}"
+    assert sf._lead(key, "me:1", lambda: ({"status": "analyzed"}, 200)) == ({"status": "analyzed"}, 200)
+    assert sf._follow(key, "me:1", time.monotonic() + 1) == ({"status": "analyzed"}, 200)
+
+
+def test_plain_results_stay_plain():
+    key = f"test:{uuid.uuid4()}"
+    sf._lead(key, "me:2", lambda: {"status": "ok"})
+    assert sf._follow(key, "me:2", time.monotonic() + 1) == {"status": "ok"}
+
+
+def test_leader_renews_its_lock_while_computing(monkeypatch):
+    monkeypatch.setattr(sf, "FLIGHT_LOCK_SECONDS", 0.3)
+    key = f"test:{uuid.uuid4()}"
+    acquired, flight = sf._acquire(key, "me:3")
+    assert acquired
+    expiries = []
+
+    def slow():
+        for _ in range(4):
+            time.sleep(0.15)
+            expiries.append(sf.locks_col.find_one({"_id": key})["expires_at"])
+        # the lock never lapsed, so nobody else can take over
+        assert not sf._acquire(key, "rival:1")[0]
+        return "done"
+
+    assert sf._lead(key, flight, slow) == "done"
+    assert expiries[-1] > expiries[0]
+    assert sf.locks_col.find_one({"_id": key}) is None
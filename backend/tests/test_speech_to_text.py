@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from backend.utils import provider_scheduler, providers
+from backend.utils.speech_to_text import _stream_window, transcribe_stream
+
+
+def test_pcm_window_rolls_over_on_audio_bytes():
+    chunks = iter([b"x" * 10] * 9)
+    window = {"full": False}
+    sent = list(_stream_window(chunks, b"x" * 10, time.monotonic() + 60, budget_bytes=30, window=window))
+    assert len(sent) == 3 and window["full"]
+    assert len(list(chunks)) == 7  # left for the next session
+
+
+def test_compressed_window_ends_on_wall_clock_not_bytes():
+    window = {"full": False}
+    sent = list(_stream_window(iter([b"x"] * 100), b"x", time.monotonic() + 60, window=window))
+    assert len(sent) == 101 and not window["full"]
+
+    window = {"full": False}
+    sent = list(_stream_window(iter([b"x"] * 100), b"x", time.monotonic() - 1, window=window))
+    assert len(sent) == 1 and window["full"]
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+def _speech_lane():
+    return provider_scheduler._lane("speech", None)
+
+
+def test_a_streaming_session_holds_a_speech_permit():
+    provider_scheduler.configure(enabled=True)
+    results = transcribe_stream(iter([b"\0" * 320] * 8), 16000)
+    next(results)
+    assert _speech_lane().inflight == 1
+    list(results)
+    assert _speech_lane().inflight == 0
+
+
+def test_a_stream_failing_midway_counts_against_the_breaker(monkeypatch):
+    breaker = providers._breakers["speech"]
+    monkeypatch.setattr(breaker, "failures", 0)
+
+    def broken(chunks, sample_rate, encoding):
+        yield {"transcript": "so the", "is_final": False}
+        raise ServiceUnavailable("stream reset")
+
+    monkeypatch.setattr(providers.get_speech_client(), "stream", broken)
+    with pytest.raises(ServiceUnavailable):
+        list(transcribe_stream(iter([b"\0" * 320]), 16000))
+    assert breaker.failures == 1
+    assert _speech_lane().inflight == 0
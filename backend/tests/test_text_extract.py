@@ -0,0 +1,43 @@
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from backend.utils import text_extract
+from backend.utils.pdf_extract import ExtractionError
+from backend.utils.text_extract import extract_upload_text
+
+JD = "Senior Python developer — Zürich, 5+ years’ experience"
+
+
+def _upload(data: bytes, filename: str = "jd.txt") -> FileStorage:
+    return FileStorage(io.BytesIO(data), filename=filename)
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "cp1252"])
+def test_text_is_decoded_in_its_own_charset(encoding):
+    assert extract_upload_text(_upload(JD.encode(encoding))) == JD
+
+
+def test_multibyte_characters_split_across_chunks(monkeypatch):
+    monkeypatch.setattr(text_extract, "TEXT_CHUNK_BYTES", 7)
+    assert extract_upload_text(_upload(JD.encode("utf-8"))) == JD
+
+
+def test_oversized_text_is_a_413(monkeypatch):
+    monkeypatch.setattr(text_extract, "TEXT_CHUNK_BYTES", 1024)
+    with pytest.raises(ExtractionError) as err:
+        extract_upload_text(_upload(b"a" * (text_extract.TEXT_MAX_BYTES + 1)))
+    assert err.value.status_code == 413
+
+
+def test_html_keeps_text_and_drops_markup():
+    html = b"<html><head><title>x</title><style>p{}</style></head><body><h1>Backend Engineer</h1>" \
+           b"<ul><li>Python &amp; Flask</li><li>MongoDB</li></ul><script>track()</script></body></html>"
+    assert extract_upload_text(_upload(html, "jd.html")) == "Backend Engineer\n- Python & Flask\n- MongoDB"
+
+
+def test_unknown_extension_is_a_415():
+    with pytest.raises(ExtractionError) as err:
+        extract_upload_text(_upload(b"{}", "jd.json"))
+    assert err.value.status_code == 415
@@ -0,0 +1,71 @@
+import json
+import logging
+
+import pytest
+from flask import Flask
+
+from backend.utils import tracing
+from backend.utils.tracing import Histogram, log_error, render_metrics, span
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    app = Flask(__name__)
+    tracing.install(app)
+
+    @app.route("/work")
+    def work():
+        with span("db", "find"):
+            pass
+        with span("llm", "gemini:test", model="test-model") as attrs:
+            attrs.update(input_tokens=120, output_tokens=30)
+        log_error("step_failed", ValueError("bad reply"), step=2)
+        return "ok"
+
+    @app.route("/boom")
+    def boom():
+        with span("parse", "reply"):
+            raise KeyError("score")
+
+    return app
+
+
+def test_request_gets_server_timing_and_one_log_line(app, caplog):
+    with caplog.at_level(logging.INFO, logger="backend.requests"):
+        response = app.test_client().get("/work")
+    timing = response.headers["Server-Timing"]
+    assert 'db;dur=' in timing and 'llm;dur=' in timing and "total;dur=" in timing
+
+    entry = json.loads([r.message for r in caplog.records if '"event": "request"' in r.message][-1])
+    assert entry["route"] == "/work" and entry["status"] == 200
+    assert entry["spans"]["llm"]["input_tokens"] == 120
+    assert entry["errors"] == [{"event": "step_failed", "error": "bad reply", "error_type": "ValueError"}]
+
+
+def test_failed_spans_and_tokens_reach_the_metrics(app):
+    app.test_client().get("/work")
+    app.test_client().get("/boom")
+    metrics = render_metrics()
+    assert 'careerpilot_span_errors_total{kind="parse",name="reply",error="KeyError"}' in metrics
+    assert 'careerpilot_llm_tokens_total{model="test-model",direction="output"}' in metrics
+    assert 'careerpilot_request_duration_seconds_count{route="/boom",method="GET",status="500"}' in metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", ("name",))
+    for seconds in (0.001, 0.02, 0.02, 100):
+        histogram.observe(("x",), seconds)
+    lines = histogram.render()
+    assert 'test_seconds_bucket{name="x",le="0.005"} 1' in lines
+    assert 'test_seconds_bucket{name="x",le="0.025"} 3' in lines
+    assert 'test_seconds_bucket{name="x",le="60"} 3' in lines
+    assert 'test_seconds_bucket{name="x",le="+Inf"} 4' in lines
+
+
+def test_a_runaway_request_drops_spans_past_the_cap(monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_SPANS_PER_REQUEST", 3)
+    trace = tracing.Trace()
+    for _ in range(5):
+        trace.add("db", 0.001, {})
+    assert len(trace.spans) == 3 and trace.dropped == 2
@@ -0,0 +1,74 @@
+import uuid
+
+import pytest
+from bson.errors import InvalidDocument
+from flask import Flask, jsonify
+
+from backend.utils import write_behind
+from backend.utils.db import get_collection
+from backend.utils.write_behind import insert_later, upsert_later, await_pending, write_behind_stats
+
+
+class _BrokenCollection:
+    def with_options(self, **kwargs):
+        return self
+
+    def bulk_write(self, requests, ordered=True):
+        raise ValueError("not a MongoDB error")
+
+
+def _app():
+    app = Flask(__name__)
+    write_behind.install(app)
+
+    @app.route("/save/<session_id>", methods=["POST"])
+    def save(session_id):
+        upsert_later("sessions", session_id, {"resume": {"filename": "cv.pdf"}}, session_id=session_id)
+        return jsonify(ok=True)
+
+    return app
+
+
+def test_unencodable_document_raises_in_caller():
+    with pytest.raises(InvalidDocument):
+        insert_later("wb_test", {"session_id": "s1", "bad": object()})
+    assert "wb_test" not in write_behind_stats()["pending"]
+
+
+def test_flusher_survives_non_mongo_errors(monkeypatch):
+    real = write_behind.get_collection
+    monkeypatch.setattr(write_behind, "get_collection",
+                        lambda name: _BrokenCollection() if name == "wb_broken" else real(name))
+    insert_later("wb_broken", {"session_id": "s1"})
+    assert await_pending("wb_broken", ["s1"])
+    assert write_behind._buffer.thread.is_alive()
+
+    doc = insert_later("wb_ok", {"session_id": "s2"})
+    assert await_pending("wb_ok", ["s2"])
+    assert get_collection("wb_ok").find_one({"_id": doc["_id"]}) is not None
+
+
+def test_response_waits_for_session_writes(monkeypatch):
+    # without the response hook the document would sit in the buffer for 10 s
+    monkeypatch.setattr(write_behind, "WRITE_FLUSH_INTERVAL_MS", 10_000)
+    session_id = str(uuid.uuid4())
+    response = _app().test_client().post(f"/save/{session_id}")
+    assert response.status_code == 200
+    assert get_collection("sessions").find_one({"_id": session_id})["resume"] == {"filename": "cv.pdf"}
+
+
+def test_failed_session_write_fails_the_response(monkeypatch):
+    real = write_behind.get_collection
+    monkeypatch.setattr(write_behind, "get_collection",
+                        lambda name: _BrokenCollection() if name == "sessions" else real(name))
+    response = _app().test_client().post(f"/save/{uuid.uuid4()}")
+    assert response.status_code == 503
+    assert "error" in response.json
+
+
+def test_durable_writes_settles_job_writes(monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_FLUSH_INTERVAL_MS", 10_000)
+    session_id = str(uuid.uuid4())
+    with write_behind.durable_writes():
+        upsert_later("sessions", session_id, {"jd_analysis": {}}, session_id=session_id)
+    assert get_collection("sessions").find_one({"_id": session_id}) is not None
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from backend.utils.write_behind import insert_later
+from backend.utils.sessions import record_answer
+from backend.utils.tracing import log_error
+from backend.utils.speech_to_text import transcribe_stream
+from backend.utils.audio_feedback import analyze_answer, analyze_segment
+from backend.utils.audio_preprocess import EmptyAudioError
+
+logger = logging.getLogger(__name__)
+
+# segment feedback runs while the rest of the answer is still being transcribed
+_feedback_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEGMENT_FEEDBACK_WORKERS", "4")),
+    thread_name_prefix="segment-feedback",
+)
+# finalized segments are reviewed in stretches of at least this many characters,
+# and at most this many stretches per answer; the overall review covers the rest
+SEGMENT_FEEDBACK_MIN_CHARS = int(os.getenv("SEGMENT_FEEDBACK_MIN_CHARS", "200"))
+SEGMENT_FEEDBACK_MAX_CALLS = int(os.getenv("SEGMENT_FEEDBACK_MAX_CALLS", "3"))
+
+def _ms(since: float) -> int:
+    return int((time.perf_counter() - since) * 1000)
+
+
+def persist_answer_async(session_id, question_id, transcript, feedback, segments=None):
+    """
+    Log the answer and make it the session's latest for this question,
+    through the write-behind buffer; persistence never blocks the response.
+    """
+    try:
+        record_answer(session_id, question_id, transcript, feedback)
+        return insert_later("answers", {
+            "session_id": session_id,
+            "question_id": question_id,
+            "transcript": transcript,
+            "feedback": feedback,
+            "segments": segments or [],
+            "created_at": datetime.now(timezone.utc),
+        })
+    except Exception as e:
+        # only reached when backpressure forced a synchronous write and that failed too
+        log_error("answer_persist_failed", e, session_id=session_id, question_id=question_id)
+
+
+def log_answer_latency(session_id, question_id, **timings):
+    logger.info(json.dumps({"event": "answer_processed", "session_id": session_id,
+                            "question_id": question_id, **timings}))
+
+
+def process_answer_stream(session_id, question_id, chunks, sample_rate, encoding):
+    """
+    Pipelined interview-answer processing. Finalized transcript segments
+    are handed to analyze_segment as soon as they add up to a stretch of
+    SEGMENT_FEEDBACK_MIN_CHARS, overlapping LLM feedback with the remaining
+    transcription. Yields event dicts in arrival order: "partial"/"final"
+    transcripts, "segment_feedback" (on a stretch's last segment) as soon as
+    each one completes, then the overall "feedback". The result is persisted
+    in the background and per-stage latency is logged as one JSON line.
+    Raises EmptyAudioError, before any LLM call, when nothing was transcribed.
+    """
+    started = time.perf_counter()
+    first_feedback_ms, segment_calls = None, 0
+    segments, pending, stretch = [], [], []
+
+    def completed(block=False):
+        nonlocal first_feedback_ms
+        while pending and (block or pending[0][1].done()):
+            index, future = pending.pop(0)
+            try:
+                note = future.result()
+            except Exception as e:
+                note = {"error": str(e)}
+            segments[index]["feedback"] = note
+            if first_feedback_ms is None:
+                first_feedback_ms = _ms(started)
+            yield {"type": "segment_feedback", "segment": index, "feedback": note}
+
+    for result in transcribe_stream(chunks, sample_rate, encoding):
+        if result["is_final"] and result["transcript"]:
+            segments.append({"text": result["transcript"]})
+            stretch.append(result["transcript"])
+            if segment_calls < SEGMENT_FEEDBACK_MAX_CALLS and sum(map(len, stretch)) >= SEGMENT_FEEDBACK_MIN_CHARS:
+                # copy_context carries the request's scheduler priority and trace into the pool
+                future = _feedback_pool.submit(contextvars.copy_context().run, analyze_segment,
+                                               question_id, " ".join(stretch), session_id)
+                pending.append((len(segments) - 1, future))
+                segment_calls += 1
+                stretch.clear()
+        yield {"type": "final" if result["is_final"] else "partial", "transcript": result["transcript"]}
+        yield from completed()
+    transcribe_ms = _ms(started)
+    if not segments:
+        raise EmptyAudioError("No speech detected in the recording")
+
+    # overall review overlaps with any segment feedback still in flight
+    transcript = " ".join(s["text"] for s in segments)
+    overall = _feedback_pool.submit(contextvars.copy_context().run, analyze_answer, question_id, transcript, session_id)
+    yield from completed(block=True)
+    feedback = overall.result()
+    if first_feedback_ms is None:
+        first_feedback_ms = _ms(started)
+    yield {"type": "feedback", "transcript": transcript, "feedback": feedback}
+
+    persist_answer_async(session_id, question_id, transcript, feedback, segments)
+    log_answer_latency(
+        session_id, question_id,
+        mode="stream",
+        segments=len(segments),
+        segment_calls=segment_calls,
+        transcribe_ms=transcribe_ms,
+        first_feedback_ms=first_feedback_ms,
+        total_ms=_ms(started),
+    )
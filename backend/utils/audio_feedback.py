@@ -1,13 +1,10 @@
-import os
-import json
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from backend.utils.providers import gemini_generate, gemini_generate_stream
+from backend.utils.llm_json import parse_structured, stream_json_events
+from backend.utils.schemas import AnswerFeedback, SegmentNote
+from backend.utils.tracing import log_error
 
 # choose the same “flash” model you used elsewhere
-model = genai.GenerativeModel("gemini-1.5-flash")
+MODEL_NAME = "gemini-1.5-flash"
 
 def analyze_answer(question_id: str, transcript: str, session_id: str) -> dict:
     """
@@ -17,7 +14,30 @@ def analyze_answer(question_id: str, transcript: str, session_id: str) -> dict:
       - improvements: list of suggestions
       - score: integer percent
     """
-    prompt = f"""
+    text = gemini_generate(MODEL_NAME, _answer_prompt(question_id, transcript, session_id), purpose="answer_feedback")
+    return parse_structured(text, AnswerFeedback, "Failed to parse JSON")
+
+def stream_answer_feedback(question_id: str, transcript: str, session_id: str):
+    """
+    analyze_answer() as it is generated: yields {"type": "strength" |
+    "improvement", "text"} for each finished item and {"type": "score"}
+    once the score is in, then {"type": "feedback", "feedback": dict}
+    with the same shape analyze_answer() returns.
+    """
+    chunks = gemini_generate_stream(MODEL_NAME, _answer_prompt(question_id, transcript, session_id), purpose="answer_feedback")
+    for kind, field, value in stream_json_events(chunks, AnswerFeedback):
+        if kind == "item" and field in ("strengths", "improvements"):
+            yield {"type": field[:-1], "text": value}
+        elif kind == "field" and field == "score":
+            yield {"type": "score", "score": value}
+        elif kind == "result":
+            yield {"type": "feedback", "feedback": value}
+        elif kind == "error":
+            log_error("llm_parse_failed", value["error"], schema="AnswerFeedback", mode="stream")
+            yield {"type": "feedback", "feedback": {"error": "Failed to parse JSON", "raw": value["raw"]}}
+
+def _answer_prompt(question_id: str, transcript: str, session_id: str) -> str:
+    return f"""
 You are an expert interview coach.  A user in interview session "{session_id}" just answered question "{question_id}".  
 Here is their transcript:
 
@@ -35,20 +55,24 @@ Example output:
   "score": 78
 }}
 """
-    response = model.generate_content(prompt)
-    text = response.text.strip()
-
-    # strip code fences if present
-    if text.startswith("```"):
-        text = text.strip("```").replace("json", "", 1).strip()
-
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        return {
-            "error": "Failed to parse JSON",
-            "raw": text
-        }
+
+def analyze_segment(question_id: str, segment: str, session_id: str) -> dict:
+    """
+    Quick feedback on one finalized stretch of a still-running answer, so
+    the candidate sees something before the full-answer review is ready.
+    Returns {"note": one-sentence observation}.
+    """
+    prompt = f"""
+You are an expert interview coach listening live to a candidate in session "{session_id}" answering question "{question_id}".
+Here is the part of the answer they just finished:
+
+\"\"\"{segment}\"\"\"
+
+Please return ONLY valid JSON with one key:
+- note: a single sentence of feedback on this part (what worked or what to tighten)
+"""
+    text = gemini_generate(MODEL_NAME, prompt, purpose="segment_feedback")
+    return parse_structured(text, SegmentNote, "Failed to parse JSON")
 
 # import os
 # import cohere
@@ -0,0 +1,160 @@
+import os
+import struct
+import numpy as np
+
+from backend.utils.tracing import traced
+
+TARGET_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+# keep this much audio around the detected speech so word edges are not clipped
+VAD_PAD_MS = 200
+# a frame is voiced when its RMS exceeds noise floor * ratio (capped at half the
+# loudest frame, for recordings with no pauses) and an absolute floor. The floor
+# (~-60 dBFS) only rules out digital silence, so quiet microphones still pass;
+# steady hiss is ruled out by requiring the loudest frame to stand out from the
+# noise floor, as speech does and stationary noise does not
+VAD_NOISE_RATIO = float(os.getenv("VAD_NOISE_RATIO", "3.0"))
+VAD_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "0.001"))
+VAD_MIN_DYNAMIC_RANGE = float(os.getenv("VAD_MIN_DYNAMIC_RANGE", "2.0"))
+MIN_SPEECH_MS = 250
+# WAV format tags
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class EmptyAudioError(ValueError):
+    """Recording contains no detectable speech; nothing worth transcribing."""
+
+
+class UnreadableAudioError(ValueError):
+    """Recording is a WAV this module cannot decode (compressed or malformed)."""
+
+
+def _wav_chunks(audio_bytes: bytes):
+    """(fmt chunk, data chunk) of a RIFF/WAVE file. A data chunk cut short, as live recorders leave it, is kept."""
+    fmt = data = None
+    pos = 12
+    while pos + 8 <= len(audio_bytes) and data is None:
+        chunk_id = audio_bytes[pos:pos + 4]
+        size = int.from_bytes(audio_bytes[pos + 4:pos + 8], "little")
+        body = audio_bytes[pos + 8:pos + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = body
+        elif chunk_id == b"data":
+            data = body
+        pos += 8 + size + (size & 1)
+    if fmt is None or len(fmt) < 16 or data is None:
+        raise UnreadableAudioError("Recording is not a complete WAV file")
+    return fmt, data
+
+
+def decode_wav(audio_bytes: bytes):
+    """
+    Decode an integer-PCM or float WAV, plain or WAVE_FORMAT_EXTENSIBLE,
+    into (float32 samples shaped [frames, channels], rate). Anything else
+    raises UnreadableAudioError.
+    """
+    fmt, raw = _wav_chunks(audio_bytes)
+    tag, channels, rate, _, block_align, _ = struct.unpack("<HHIIHH", fmt[:16])
+    if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # the sub-format GUID starts with the real format tag
+        tag = struct.unpack("<H", fmt[24:26])[0]
+    if not (channels and rate and block_align) or block_align % channels:
+        raise UnreadableAudioError("Recording has an invalid WAV header")
+    width = block_align // channels
+    raw = raw[: len(raw) // block_align * block_align]
+
+    if tag == WAVE_FORMAT_IEEE_FLOAT and width in (4, 8):
+        samples = np.frombuffer(raw, dtype="<f4" if width == 4 else "<f8").astype(np.float32)
+    elif tag != WAVE_FORMAT_PCM:
+        raise UnreadableAudioError(f"Unsupported WAV encoding (format tag {tag:#06x}); record PCM or float WAV")
+    elif width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise UnreadableAudioError(f"Unsupported WAV sample width: {width} bytes")
+    return samples.reshape(-1, channels), rate
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(signal: np.ndarray, rate: int, target: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Linear-interpolation resampler. When downsampling, a moving average over
+    the decimation span (via cumsum, so O(n)) suppresses aliasing first.
+    """
+    if rate == target or signal.size == 0:
+        return signal
+    if rate > target:
+        span = int(round(rate / target))
+        if span > 1:
+            csum = np.cumsum(np.concatenate(([0.0], signal.astype(np.float64))))
+            signal = ((csum[span:] - csum[:-span]) / span).astype(np.float32)
+    duration = signal.size / rate
+    n_out = int(duration * target)
+    positions = np.arange(n_out, dtype=np.float64) * (rate / target)
+    return np.interp(positions, np.arange(signal.size), signal).astype(np.float32)
+
+
+def trim_silence(signal: np.ndarray, rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Energy-based VAD: frame RMS is compared against a threshold derived from
+    the quietest frames, and leading/trailing unvoiced frames are dropped.
+    Raises EmptyAudioError when too little speech is left, or when nothing
+    rises above the noise floor.
+    """
+    frame = rate * VAD_FRAME_MS // 1000
+    n_frames = signal.size // frame
+    if n_frames == 0:
+        raise EmptyAudioError("Recording is too short")
+
+    frames = signal[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    noise_floor = np.percentile(rms, 10)
+    if rms.max() < noise_floor * VAD_MIN_DYNAMIC_RANGE:
+        raise EmptyAudioError("No speech detected in the recording")
+    threshold = max(min(noise_floor * VAD_NOISE_RATIO, 0.5 * rms.max()), VAD_MIN_RMS)
+    voiced = np.flatnonzero(rms > threshold)
+    if voiced.size * VAD_FRAME_MS < MIN_SPEECH_MS:
+        raise EmptyAudioError("No speech detected in the recording")
+
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    start = max(voiced[0] - pad, 0) * frame
+    end = min((voiced[-1] + 1 + pad) * frame, signal.size)
+    return signal[start:end]
+
+
+def to_linear16(signal: np.ndarray) -> bytes:
+    return (np.clip(signal, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+@traced("audio", "preprocess")
+def preprocess_audio(audio_bytes: bytes):
+    """
+    Prepare a browser recording for Speech-to-Text: downmix to mono,
+    resample to 16 kHz and trim leading/trailing silence. Returns
+    (LINEAR16 PCM bytes, sample rate). Non-WAV input (e.g. WebM/Opus) cannot
+    be decoded here and is returned untouched with rate None; a WAV that
+    cannot be decoded raises UnreadableAudioError, since sending it on as
+    LINEAR16 would transcribe noise.
+    """
+    if not audio_bytes:
+        raise EmptyAudioError("Recording is empty")
+    if audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+        return audio_bytes, None
+
+    samples, rate = decode_wav(audio_bytes)
+    mono = resample(downmix(samples), rate)
+    speech = trim_silence(mono)
+    return to_linear16(speech), TARGET_SAMPLE_RATE
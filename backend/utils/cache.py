@@ -0,0 +1,192 @@
+import os
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from pymongo import ReplaceOne
+
+from backend.utils.db import get_collection
+from backend.utils.tracing import log_error
+
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+cache_col = get_collection("analysis_cache")
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU map with a per-entry time-to-live.
+    Oldest entries are evicted once max_entries is exceeded. Values are
+    deep-copied in and out, so a caller annotating what it got back never
+    changes the entry the next request reads.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_memory = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+_stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _bump(counter: str):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-extracted copies of a document hash the same."""
+    return " ".join((text or "").split())
+
+
+def cache_key(kind: str, text: str, model_name: str, prompt_version: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{kind}:{model_name}:{prompt_version}:{digest}"
+
+
+def _lookup(key: str):
+    """Cached analysis for `key` from memory, then MongoDB; None on a miss."""
+    value = _memory.get(key)
+    if value is not None:
+        _bump("memory_hits")
+        return value
+
+    try:
+        doc = cache_col.find_one({"_id": key}, {"analysis": 1})
+    except Exception as e:
+        log_error("analysis_cache_read_failed", e, key=key)
+        _bump("errors")
+        doc = None
+    if doc:
+        _bump("mongo_hits")
+        _memory.set(key, doc["analysis"])
+        return doc["analysis"]
+    _bump("misses")
+    return None
+
+
+def _cache_doc(key: str, kind: str, model_name: str, prompt_version: str, value) -> dict:
+    return {
+        "_id": key,
+        "kind": kind,
+        "model": model_name,
+        "prompt_version": prompt_version,
+        "analysis": value,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _store(docs: list):
+    """Cache analyses in memory and MongoDB; expiry is handled by the TTL index declared in db_indexes."""
+    for doc in docs:
+        _memory.set(doc["_id"], doc["analysis"])
+    try:
+        if len(docs) == 1:
+            cache_col.replace_one({"_id": docs[0]["_id"]}, docs[0], upsert=True)
+        elif docs:
+            cache_col.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False)
+    except Exception as e:
+        log_error("analysis_cache_write_failed", e, documents=len(docs))
+        _bump("errors")
+
+
+def _cacheable(value) -> bool:
+    return value is not None and not (isinstance(value, dict) and "error" in value)
+
+
+def cached_analysis(kind: str, text: str, model_name: str, prompt_version: str, compute):
+    """
+    Return the analysis for `text`, calling `compute(text)` only on a miss.
+    Lookups go memory -> MongoDB -> compute. Results carrying an "error"
+    key are returned but never cached, so a bad LLM reply is retried next time.
+    """
+    key = cache_key(kind, text, model_name, prompt_version)
+    value = _lookup(key)
+    if value is not None:
+        return value
+
+    value = compute(text)
+    if _cacheable(value):
+        _store([_cache_doc(key, kind, model_name, prompt_version, value)])
+    return value
+
+
+def cached_analyses(kind: str, texts: list, model_name: str, prompt_version: str, compute_many) -> list:
+    """
+    cached_analysis() for several texts at once: one MongoDB query for the
+    memory misses, then a single `compute_many(missing texts)` call that
+    returns their analyses in the same order. Results that are None or
+    carry an "error" key are returned but not cached.
+    """
+    keys = [cache_key(kind, text, model_name, prompt_version) for text in texts]
+    found = {}
+    for key in dict.fromkeys(keys):
+        value = _memory.get(key)
+        if value is not None:
+            _bump("memory_hits")
+            found[key] = value
+
+    remote = [key for key in dict.fromkeys(keys) if key not in found]
+    if remote:
+        try:
+            for doc in cache_col.find({"_id": {"$in": remote}}, {"analysis": 1}):
+                _bump("mongo_hits")
+                _memory.set(doc["_id"], doc["analysis"])
+                found[doc["_id"]] = doc["analysis"]
+        except Exception as e:
+            log_error("analysis_cache_read_failed", e, keys=len(remote))
+            _bump("errors")
+
+    missing = {key: text for key, text in zip(keys, texts) if key not in found}
+    if missing:
+        for _ in missing:
+            _bump("misses")
+        for key, value in zip(missing, compute_many(list(missing.values()))):
+            found[key] = value
+        _store([_cache_doc(key, kind, model_name, prompt_version, found[key])
+                for key in missing if _cacheable(found[key])])
+    return [found[key] for key in keys]
+
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["memory_hits"] + stats["mongo_hits"] + stats["misses"]
+    stats["memory_entries"] = len(_memory)
+    stats["hit_ratio"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+    return stats
@@ -1,15 +1,29 @@
-import re
-import cohere
-import os
-import json
-
-co = cohere.Client(os.getenv("COHERE_API_KEY"))
+from backend.utils.providers import cohere_chat, cohere_chat_stream
+from backend.utils.llm_json import (
+    LLMOutputError, extract_json, looks_like_json, parse_llm_output,
+    parse_numbered_list, render_numbered_list, stream_numbered_list,
+)
+from backend.utils.schemas import InterviewQuestions
+from backend.utils.prompt_builder import (
+    compact_analysis, token_budget, RESUME_ANALYSIS_PRIORITY, JD_ANALYSIS_PRIORITY,
+)
+
+QUESTIONS_MODEL = "command-xlarge-nightly"
+EXPLAIN_MODEL = "command-r-plus"
+
+
+def _compact_pair(resume_analysis, jd_analysis, model_name):
+    """Compact JSON for both analyses, each capped at ~40% of the model's budget."""
+    share = int(token_budget(model_name) * 0.4)
+    return (
+        compact_analysis(resume_analysis, share, RESUME_ANALYSIS_PRIORITY),
+        compact_analysis(jd_analysis, share, JD_ANALYSIS_PRIORITY),
+    )
 
-def generate_questions(resume_analysis, jd_analysis,role, company):
-    resume_json = json.dumps(resume_analysis, indent=2)
-    jd_json = json.dumps(jd_analysis, indent=2)
+def _questions_prompt(resume_analysis, jd_analysis, role, company):
+    resume_json, jd_json = _compact_pair(resume_analysis, jd_analysis, QUESTIONS_MODEL)
 
-    prompt = f"""
+    return f"""
 You are an AI assistant that helps candidates prepare for job interviews.
 
 Here is the structured Resume Analysis:
@@ -32,18 +46,92 @@ Make sure to cover:
 Return 8–10 interview questions.
 """
 
-    response = co.chat(
-        model='command-xlarge-nightly',
-        message=prompt,
-        # max_tokens=500,
-        temperature=0.7
+def generate_questions(resume_analysis, jd_analysis,role, company):
+    response_text = cohere_chat(
+        model=QUESTIONS_MODEL,
+        message=_questions_prompt(resume_analysis, jd_analysis, role, company),
+        temperature=0.7,
+        purpose="generate_questions"
     )
 
-    try:
-        return safe_extract_json(response.text)
-    except json.JSONDecodeError:
-        # fallback: wrap in array
-        return []
+    return parse_questions(response_text)
+
+def _gap_questions_prompt(resume_analysis, jd_analysis, role, company, skills, count):
+    resume_json, jd_json = _compact_pair(resume_analysis, jd_analysis, QUESTIONS_MODEL)
+    focus = (
+        f"Focus on these skills, one question each where possible: {', '.join(skills)}."
+        if skills else "Cover the most important requirements of the role."
+    )
+
+    return f"""
+You are an AI assistant that helps candidates prepare for job interviews.
+
+Here is the structured Resume Analysis:
+{resume_json}
+
+Here is the structured Job Description Analysis:
+{jd_json}
+
+Write {count} specific technical interview questions for the {role} role at {company}.
+{focus}
+Name the skill in each question. Return only the interview questions as a numbered list.
+"""
+
+def generate_gap_questions(resume_analysis, jd_analysis, role, company, skills, count):
+    """
+    Top up a set served from the question bank: `count` questions, aimed
+    at `skills` (the ones the bank had nothing for) when there are any.
+    """
+    response_text = cohere_chat(
+        model=QUESTIONS_MODEL,
+        message=_gap_questions_prompt(resume_analysis, jd_analysis, role, company, skills, count),
+        temperature=0.7,
+        purpose="generate_gap_questions"
+    )
+    return parse_questions(response_text)
+
+def stream_questions(resume_analysis, jd_analysis, role, company):
+    """generate_questions(), yielding each question as soon as it is complete."""
+    prompt = _questions_prompt(resume_analysis, jd_analysis, role, company)
+    return _stream_question_reply(prompt, "generate_questions")
+
+def stream_gap_questions(resume_analysis, jd_analysis, role, company, skills, count):
+    """generate_gap_questions(), yielding each question as soon as it is complete."""
+    prompt = _gap_questions_prompt(resume_analysis, jd_analysis, role, company, skills, count)
+    return _stream_question_reply(prompt, "generate_gap_questions")
+
+def _stream_question_reply(prompt, purpose):
+    chunks = []
+
+    def tee():
+        for chunk in cohere_chat_stream(model=QUESTIONS_MODEL, message=prompt, temperature=0.7, purpose=purpose):
+            chunks.append(chunk)
+            yield chunk
+
+    emitted = 0
+    for question in stream_numbered_list(tee()):
+        emitted += 1
+        yield question
+    if not emitted:
+        # the model answered in JSON instead of a numbered list
+        yield from parse_questions("".join(chunks))["questions"]
+
+def parse_questions(text):
+    """
+    {"raw": numbered list text, "questions": [...]} from either a JSON or a
+    plain numbered-list reply; "raw" is what the interview page splits on.
+    """
+    questions = []
+    if looks_like_json(text):
+        try:
+            questions = parse_llm_output(text, InterviewQuestions)["questions"]
+        except LLMOutputError:
+            pass
+    if not questions:
+        questions = parse_numbered_list(text)
+    if not questions:
+        return {"raw": text, "questions": []}
+    return {"raw": render_numbered_list(questions), "questions": questions}
 
 def analyze_answer(answer_text: str):
     prompt = f"""
@@ -53,25 +141,25 @@ Candidate answer: "{answer_text}"
 Point out strengths, weaknesses, and suggestions for improvement.
 Return as JSON: {{ "feedback": "…" }}
 """
-    response = co.chat(
-        model='command-xlarge-nightly',
+    response_text = cohere_chat(
+        model=QUESTIONS_MODEL,
         message=prompt,
-        # max_tokens=500,
-        temperature=0.7
+        temperature=0.7,
+        purpose="answer_feedback"
     )
-    try:
-        data = safe_extract_json(response.text)
-        return data.get("feedback", response.generations[0].text)
-    except:
-        return safe_extract_json(response.text)
+    data = safe_extract_json(response_text)
+    return data.get("feedback", response_text)
     
 
-def calculate_match_score(resume_analysis, jd_analysis):
-    resume_json = json.dumps(resume_analysis, indent=2)
-    jd_json = json.dumps(jd_analysis, indent=2)
+def explain_match_score(resume_analysis, jd_analysis, match):
+    """
+    Optional narrative on top of match_engine.score_match. The score itself
+    is computed locally; the LLM only explains it and never changes it.
+    """
+    resume_json, jd_json = _compact_pair(resume_analysis, jd_analysis, EXPLAIN_MODEL)
 
     prompt = f"""
-You are an expert hiring assistant. Analyze how well the candidate's resume aligns with the job description.
+You are an expert hiring assistant. A scoring engine has already rated how well the candidate's resume aligns with the job description.
 
 Resume Analysis:
 {resume_json}
@@ -79,30 +167,30 @@ Resume Analysis:
 Job Description Analysis:
 {jd_json}
 
-Give a final **resume-to-job match score percentage** (0–100%) based on:
-- Skill match
-- Tools/technologies overlap
+Computed match score: {match["score"]}%
+Matched skills: {", ".join(match["matched"]) or "none"}
+Missing skills: {", ".join(match["missing"]) or "none"}
+
+Do not change the score. In a few short paragraphs explain:
 - Past experience relevance
 - Culture fit
-- Gaps or missing elements
-
-Output format:
-Match Score: XX%
+- How the candidate could close the missing skills
 """
 
-    response = co.chat(
-        model='command-r-plus',
+    response_text = cohere_chat(
+        model=EXPLAIN_MODEL,
         message=prompt,
-        # max_tokens=100,
-        temperature=0.3
+        temperature=0.3,
+        purpose="explain_match_score"
     )
-    return safe_extract_json(response.text)
+    return safe_extract_json(response_text)
 
 def safe_extract_json(text):
-    match = re.search(r"```json\s*(\{.*\})\s*```", text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
-            return {"error": "Invalid JSON in response", "raw": match.group(1)}
-    return {"raw": text}
\ No newline at end of file
+    """The JSON object in an LLM reply, or {"raw": text} when it holds none."""
+    if not looks_like_json(text):
+        return {"raw": text}
+    try:
+        value = extract_json(text)
+    except LLMOutputError:
+        return {"raw": text}
+    return value if isinstance(value, dict) else {"raw": text}
\ No newline at end of file
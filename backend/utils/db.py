@@ -2,10 +2,21 @@ import os
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
+from backend.utils.tracing import MongoCommandTimer
+
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
+# Atlas needs TLS; set MONGO_TLS=0 for a plain local mongod
+MONGO_TLS = os.getenv("MONGO_TLS", "1") == "1"
+
 
-client = MongoClient(MONGO_URI, tls=True, tlsAllowInvalidCertificates=True)
+if MONGO_URI and MONGO_URI.startswith("mongomock://"):
+    # offline benchmarks and tests only; mongomock is not a runtime dependency
+    from backend.utils.offline_mongo import client as offline_client
+    client = offline_client()
+else:
+    tls_options = {"tls": True, "tlsAllowInvalidCertificates": True} if MONGO_TLS else {"tls": False}
+    client = MongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()], **tls_options)
 db = client["careerpilot_db"]
 
 def get_collection(name):
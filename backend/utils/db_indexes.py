@@ -0,0 +1,194 @@
+"""
+Index bootstrap and query-plan audit for the collections the routes use.
+
+    python -m backend.utils.db_indexes migrate            # create indexes, backfill fields; run once per deploy
+    python -m backend.utils.db_indexes audit              # explain() every query shape, exit 1 on COLLSCAN
+    python -m backend.utils.db_indexes backfill-sessions  # build `sessions` from the per-step collections
+        [--dry-run] [--batch-size 500]
+    python -m backend.utils.db_indexes compact-sessions   # move inline session text into `documents`
+        [--dry-run] [--batch-size 500]
+    python -m backend.utils.db_indexes storage-report     # bytes saved by dedup and compression
+"""
+import os
+import sys
+import json
+import logging
+from datetime import datetime
+from bson import ObjectId
+import pymongo
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import ServerSelectionTimeoutError
+
+from backend.utils.db import get_collection
+from backend.utils.tracing import log_error
+from backend.utils.cache import CACHE_TTL_SECONDS
+from backend.utils.single_flight import FLIGHT_RESULT_SECONDS
+from backend.utils.sessions import backfill_sessions
+from backend.utils.document_store import compact_sessions, storage_report
+
+logger = logging.getLogger(__name__)
+
+# per-index budget (server selection included) when create_app builds indexes
+STARTUP_INDEX_TIMEOUT_SECONDS = float(os.getenv("STARTUP_INDEX_TIMEOUT_SECONDS", "2"))
+
+# collection -> list of (keys, options) passed straight to create_index;
+# `sessions` is only read by _id, and the per-step collections keep theirs for the backfill
+INDEXES = {
+    "resumes": [
+        ([("session_id", ASCENDING)], {"unique": True, "name": "session_id_unique"}),
+    ],
+    "resume_outputs": [
+        ([("session_id", ASCENDING), ("_id", DESCENDING)], {"name": "session_id_latest"}),
+    ],
+    "job_descriptions": [
+        ([("session_id", ASCENDING), ("_id", DESCENDING)], {"name": "session_id_latest"}),
+    ],
+    "jds": [
+        ([("session_id", ASCENDING), ("_id", DESCENDING)], {"name": "session_id_latest"}),
+    ],
+    "jd_outputs": [
+        ([("session_id", ASCENDING), ("_id", DESCENDING)], {"name": "session_id_latest"}),
+    ],
+    "match_scores": [
+        ([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {"name": "user_created_at"}),
+        ([("session_id", ASCENDING)], {"name": "session_id"}),
+    ],
+    "answers": [
+        ([("session_id", ASCENDING), ("question_id", ASCENDING)], {"name": "session_question"}),
+    ],
+    "jobs": [
+        ([("status", ASCENDING), ("updated_at", ASCENDING)], {"name": "status_updated_at"}),
+    ],
+    "question_bank": [
+        ([("updated_at", ASCENDING)], {"name": "updated_at"}),
+    ],
+    "flight_locks": [
+        ([("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ],
+    "flight_results": [
+        ([("created_at", ASCENDING)], {"name": "created_at_ttl", "expireAfterSeconds": FLIGHT_RESULT_SECONDS}),
+    ],
+    "analysis_cache": [
+        ([("created_at", ASCENDING)], {"expireAfterSeconds": CACHE_TTL_SECONDS}),
+    ],
+}
+
+# every find()/find_one() shape issued by backend/routes, as (collection, filter, sort)
+QUERY_SHAPES = [
+    ("sessions", {"_id": "x"}, None),
+    ("sessions", {"_id": {"$in": ["x", "y"]}}, None),
+    ("documents", {"_id": "x"}, None),
+    ("match_scores", {"user_id": "x"}, None),
+    ("match_scores", {"user_id": "x"}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("match_scores", {"user_id": "x", "$or": [{"created_at": {"$lt": datetime(2030, 1, 1)}},
+                                              {"created_at": datetime(2030, 1, 1), "_id": {"$lt": ObjectId()}},
+                                              {"created_at": None}]},
+     [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("answers", {"session_id": "x", "question_id": "q1"}, None),
+    ("question_bank", {"updated_at": {"$gte": datetime(2030, 1, 1)}}, None),
+]
+
+
+def backfill_created_at():
+    """Give legacy match_scores a created_at taken from their ObjectId timestamp."""
+    result = get_collection("match_scores").update_many(
+        {"created_at": {"$exists": False}},
+        [{"$set": {"created_at": {"$toDate": "$_id"}}}],
+    )
+    return result.modified_count
+
+
+def ensure_indexes(verbose: bool = False, timeout: float = None) -> int:
+    """
+    Create every declared index; create_index is a no-op when it already
+    exists. A failing index is logged and skipped, and with `timeout` each
+    one gets that many seconds, server selection included. When no server
+    answers, the rest are not tried. Returns how many failed. Backfills are
+    left to `migrate`.
+    """
+    specs = [(collection, keys, options) for collection, indexes in INDEXES.items() for keys, options in indexes]
+    failed = 0
+    for i, (collection, keys, options) in enumerate(specs):
+        try:
+            with pymongo.timeout(timeout):
+                name = get_collection(collection).create_index(keys, **options)
+        except ServerSelectionTimeoutError as e:
+            log_error("index_create_failed", e, collection=collection, index=options.get("name"),
+                      skipped=len(specs) - i - 1)
+            return failed + len(specs) - i
+        except Exception as e:
+            failed += 1
+            log_error("index_create_failed", e, collection=collection, index=options.get("name"))
+            continue
+        if verbose:
+            logger.info("index ready: %s.%s", collection, name)
+    return failed
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def audit_query_plans() -> list:
+    """Explain every route query shape; returns [(collection, filter, sort, stages, ok)]."""
+    report = []
+    for collection, filter_, sort in QUERY_SHAPES:
+        cursor = get_collection(collection).find(filter_)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        # SBE plans nest the classic tree under queryPlan
+        stages = [s for s in _stages(plan.get("queryPlan", plan)) if s]
+        report.append((collection, filter_, sort, stages, "COLLSCAN" not in stages))
+    return report
+
+
+def main(argv=None) -> int:
+    argv = argv if argv is not None else sys.argv[1:]
+    command = argv[0] if argv else "audit"
+    if command == "migrate":
+        failed = ensure_indexes(verbose=True)
+        backfilled = backfill_created_at()
+        if backfilled:
+            logger.info("match_scores: backfilled created_at on %d documents", backfilled)
+        if failed:
+            logger.error("%d index(es) could not be created", failed)
+        return 1 if failed else 0
+    if command == "audit":
+        failed = 0
+        for collection, filter_, sort, stages, ok in audit_query_plans():
+            failed += not ok
+            logger.log(logging.INFO if ok else logging.ERROR, "%s %s %s sort=%s -> %s", "ok" if ok else "COLLSCAN",
+                       collection, json.dumps(filter_, default=str), sort, " <- ".join(stages))
+        if failed:
+            logger.error("%d query shape(s) fall back to COLLSCAN; run `migrate` or add an index", failed)
+        return 1 if failed else 0
+    if command == "backfill-sessions":
+        dry_run = "--dry-run" in argv
+        batch_size = int(argv[argv.index("--batch-size") + 1]) if "--batch-size" in argv else 500
+        report = backfill_sessions(batch_size=batch_size, dry_run=dry_run)
+        for collection, count in report.items():
+            logger.info("%s: %d session field(s) %s", collection, count, "to set" if dry_run else "set")
+        return 0
+    if command == "compact-sessions":
+        dry_run = "--dry-run" in argv
+        batch_size = int(argv[argv.index("--batch-size") + 1]) if "--batch-size" in argv else 500
+        report = compact_sessions(batch_size=batch_size, dry_run=dry_run)
+        logger.info("sessions: %d %s, %d distinct text(s)", report["sessions"],
+                    "to compact" if dry_run else "compacted", report["documents"])
+        return 0
+    if command == "storage-report":
+        print(json.dumps(storage_report(), indent=2))
+        return 0
+    print(__doc__, file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(levelname)s %(message)s")
+    sys.exit(main())
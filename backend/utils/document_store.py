@@ -0,0 +1,301 @@
+"""
+Content-addressed storage for uploaded resumes and job descriptions.
+
+- Extracted text is stored once per distinct text in the `documents`
+  collection. _id is the sha256 of the UTF-8 text and `data` holds the
+  compressed bytes; `codec` records how they were compressed (zstd when
+  the `zstandard` package is installed, zlib otherwise).
+- The original upload is stored once per distinct file in the GridFS
+  bucket "uploads", under its sha256, so text can be re-extracted without
+  asking the user again (STORE_ORIGINAL_UPLOADS=0 turns this off; it is
+  always off under mongomock, which has no GridFS).
+- Sessions keep only the two hashes (text_hash, file_hash).
+
+So a re-upload of the same resume writes nothing new, and session
+documents stay small enough for the working set. A text read moves its
+compressed size over the wire. Decompressed texts are cached in-process
+by hash, and a content-addressed cache can never go stale.
+
+    python -m backend.utils.db_indexes compact-sessions   # move inline session text into `documents`
+    python -m backend.utils.db_indexes storage-report     # bytes saved by dedup and compression
+"""
+import io
+import os
+import zlib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+import gridfs
+from bson import Binary
+from pymongo import UpdateOne
+
+from backend.utils.cache import TTLCache
+from backend.utils.db import MONGO_URI, db, get_collection
+from backend.utils.tracing import log_error, span
+from backend.utils.write_behind import upsert_later, find_one
+
+try:
+    import zstandard  # optional; zlib is used without it
+except ImportError:
+    zstandard = None
+
+DOCUMENT_CODEC = os.getenv("DOCUMENT_CODEC", "zstd" if zstandard else "zlib")
+ZSTD_LEVEL = int(os.getenv("DOCUMENT_ZSTD_LEVEL", "9"))
+ZLIB_LEVEL = int(os.getenv("DOCUMENT_ZLIB_LEVEL", "6"))
+# never on under mongomock, which has no GridFS
+STORE_ORIGINAL_UPLOADS = (os.getenv("STORE_ORIGINAL_UPLOADS", "1") == "1"
+                          and not (MONGO_URI or "").startswith("mongomock://"))
+ORIGINAL_MAX_BYTES = int(os.getenv("ORIGINAL_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOADS_BUCKET = "uploads"
+
+documents_col = get_collection("documents")
+sessions_col = get_collection("sessions")
+
+_texts = TTLCache(int(os.getenv("DOCUMENT_CACHE_ENTRIES", "256")), 24 * 3600)
+# file hashes GridFS has acknowledged; a failed upload is retried by the next one
+_known_files = TTLCache(4096, 24 * 3600)
+# originals are written off the response path, like answers used to be
+_upload_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="original-upload")
+_pending_uploads = {}
+_pending_lock = threading.Lock()
+_bucket = None
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _uploads() -> gridfs.GridFSBucket:
+    global _bucket
+    if _bucket is None:
+        _bucket = gridfs.GridFSBucket(db, bucket_name=UPLOADS_BUCKET)
+    return _bucket
+
+
+def compress(data: bytes, codec: str = DOCUMENT_CODEC) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown document codec {codec!r}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Document is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "none":
+        return bytes(data)
+    raise ValueError(f"Unknown document codec {codec!r}")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _document(text: str, kind: str) -> tuple:
+    """(sha256, fields for a new `documents` entry)."""
+    raw = text.encode("utf-8")
+    codec, data = DOCUMENT_CODEC, compress(raw)
+    if len(data) >= len(raw):
+        codec, data = "none", raw
+    return hashlib.sha256(raw).hexdigest(), {
+        "kind": kind,
+        "codec": codec,
+        "size": len(raw),
+        "stored_size": len(data),
+        "data": Binary(data),
+        "created_at": _now(),
+    }
+
+
+def put_text(text: str, kind: str) -> str:
+    """
+    Store `text` unless an identical one is stored already; returns its
+    hash. Written behind the response, and cached only once the write is
+    acknowledged, so a failed write is retried by the next upload.
+    """
+    digest = text_hash(text)
+    if _texts.get(digest) is None:
+        digest, fields = _document(text, kind)
+        with span("compress", kind, bytes=fields["size"], stored_bytes=fields["stored_size"]):
+            upsert_later("documents", digest, {}, on_insert=fields, session_id=digest,
+                         on_written=lambda: _texts.set(digest, text))
+    return digest
+
+
+def get_text(digest: str):
+    """The text stored under `digest`, or None."""
+    text = _texts.get(digest)
+    if text is None:
+        doc = find_one("documents", {"_id": digest}, {"codec": 1, "data": 1}, session_id=digest)
+        if doc is None:
+            return None
+        text = decompress(doc["data"], doc["codec"]).decode("utf-8")
+        _texts.set(digest, text)
+    return text
+
+
+def session_text(part: dict):
+    """Text of a session's "resume" or "jd" entry, by hash or (before compact-sessions) inline."""
+    if not part:
+        return None
+    if part.get("text_hash"):
+        return get_text(part["text_hash"])
+    return part.get("text")
+
+
+def store_original(file, kind: str):
+    """
+    Queue the uploaded file for GridFS, once per distinct content; returns
+    its sha256, or None when originals are off or the upload cannot be
+    re-read. Call after extraction, which has already validated the file.
+    The upload lands after the response, so open_original() can still miss
+    a hash returned here if that upload failed.
+    """
+    if not STORE_ORIGINAL_UPLOADS:
+        return None
+    try:
+        file.stream.seek(0)
+        data = file.stream.read(ORIGINAL_MAX_BYTES + 1)
+    except (AttributeError, OSError, ValueError):
+        return None
+    if not data or len(data) > ORIGINAL_MAX_BYTES:
+        return None
+    digest = hashlib.sha256(data).hexdigest()
+    if _known_files.get(digest) is not None:
+        return digest
+    with _pending_lock:
+        if digest not in _pending_uploads:
+            _pending_uploads[digest] = _upload_pool.submit(_upload_original, digest, file.filename or digest,
+                                                           file.mimetype, kind, data)
+    return digest
+
+
+def _upload_original(digest: str, filename: str, content_type: str, kind: str, data: bytes):
+    try:
+        bucket = _uploads()
+        with span("db", "gridfs_upload", bytes=len(data)):
+            if next(iter(bucket.find({"_id": digest}).limit(1)), None) is None:
+                bucket.upload_from_stream_with_id(digest, filename, io.BytesIO(data),
+                                                  metadata={"kind": kind, "content_type": content_type,
+                                                            "uploaded_at": _now()})
+        _known_files.set(digest, True)
+    except gridfs.errors.FileExists:
+        _known_files.set(digest, True)  # another worker stored the same file first
+    except Exception as e:
+        log_error("original_upload_failed", e, file_hash=digest, kind=kind)
+    finally:
+        with _pending_lock:
+            _pending_uploads.pop(digest, None)
+
+
+def flush_uploads(timeout: float) -> int:
+    """Wait up to `timeout` for queued GridFS uploads; returns how many are still pending."""
+    with _pending_lock:
+        pending = set(_pending_uploads.values())
+    _, not_done = wait(pending, timeout=timeout)
+    return len(not_done)
+
+
+def open_original(digest: str):
+    """A readable GridOut for the original upload stored under `digest`."""
+    return _uploads().open_download_stream(digest)
+
+
+def compact_sessions(batch_size: int = 500, dry_run: bool = False) -> dict:
+    """
+    Move text still stored inline in sessions (written before this store, or
+    by backfill-sessions) into `documents`, leaving text_hash behind.
+    Returns {"sessions": updated, "documents": distinct texts}.
+    """
+    report = {"sessions": 0, "documents": 0}
+    seen = set()
+    query = {"$or": [{"resume.text": {"$type": "string"}}, {"jd.text": {"$type": "string"}}]}
+    cursor = sessions_col.find(query, {"resume.text": 1, "jd.text": 1}).batch_size(batch_size)
+    documents, sessions = [], []
+
+    def write():
+        if not dry_run:
+            if documents:
+                documents_col.bulk_write(documents, ordered=False)
+            if sessions:
+                sessions_col.bulk_write(sessions, ordered=False)
+        documents.clear()
+        sessions.clear()
+
+    for session in cursor:
+        update = {"$set": {}, "$unset": {}}
+        for part in ("resume", "jd"):
+            text = (session.get(part) or {}).get("text")
+            if not isinstance(text, str):
+                continue
+            digest, fields = _document(text, part)
+            if digest not in seen:
+                seen.add(digest)
+                documents.append(UpdateOne({"_id": digest}, {"$setOnInsert": fields}, upsert=True))
+            update["$set"][f"{part}.text_hash"] = digest
+            update["$unset"][f"{part}.text"] = ""
+        # only touch sessions whose text is still the one hashed, in case the app rewrote it meanwhile
+        guard = {f"{part}.text": (session.get(part) or {}).get("text") for part in ("resume", "jd")
+                 if f"{part}.text" in update["$unset"]}
+        sessions.append(UpdateOne({"_id": session["_id"], **guard}, update))
+        report["sessions"] += 1
+        if len(sessions) >= batch_size:
+            write()
+    write()
+    report["documents"] = len(seen)
+    return report
+
+
+def _count_refs(field: str) -> dict:
+    """{hash: number of sessions referencing it} for a session field such as "resume.text_hash"."""
+    pipeline = [{"$match": {field: {"$type": "string"}}}, {"$group": {"_id": f"${field}", "refs": {"$sum": 1}}}]
+    return {row["_id"]: row["refs"] for row in sessions_col.aggregate(pipeline, allowDiskUse=True)}
+
+
+def storage_report() -> dict:
+    """
+    What deduplication and compression save. "logical" bytes are what the
+    sessions would hold with every upload stored inline, "unique" bytes
+    after deduplication, "stored" bytes after compression as well.
+    """
+    text_refs, file_refs = {}, {}
+    for part in ("resume", "jd"):
+        for digest, refs in _count_refs(f"{part}.text_hash").items():
+            text_refs[digest] = text_refs.get(digest, 0) + refs
+        for digest, refs in _count_refs(f"{part}.file_hash").items():
+            file_refs[digest] = file_refs.get(digest, 0) + refs
+
+    texts = {"documents": 0, "references": sum(text_refs.values()), "logical_bytes": 0, "unique_bytes": 0,
+             "stored_bytes": 0, "codecs": {}}
+    for doc in documents_col.find({}, {"size": 1, "stored_size": 1, "codec": 1}):
+        texts["documents"] += 1
+        texts["unique_bytes"] += doc["size"]
+        texts["stored_bytes"] += doc["stored_size"]
+        texts["logical_bytes"] += doc["size"] * max(1, text_refs.get(doc["_id"], 0))
+        texts["codecs"][doc["codec"]] = texts["codecs"].get(doc["codec"], 0) + 1
+
+    originals = {"files": 0, "references": sum(file_refs.values()), "logical_bytes": 0, "stored_bytes": 0}
+    if STORE_ORIGINAL_UPLOADS:
+        for doc in get_collection(f"{UPLOADS_BUCKET}.files").find({}, {"length": 1}):
+            originals["files"] += 1
+            originals["stored_bytes"] += doc["length"]
+            originals["logical_bytes"] += doc["length"] * max(1, file_refs.get(doc["_id"], 0))
+
+    inline = {"sessions": 0, "bytes": 0}
+    query = {"$or": [{"resume.text": {"$type": "string"}}, {"jd.text": {"$type": "string"}}]}
+    for session in sessions_col.find(query, {"resume.text": 1, "jd.text": 1}):
+        inline["sessions"] += 1
+        inline["bytes"] += sum(len((session.get(p) or {}).get("text") or "") for p in ("resume", "jd"))
+
+    for section, logical, stored in ((texts, "logical_bytes", "stored_bytes"),
+                                     (originals, "logical_bytes", "stored_bytes")):
+        section["saved_bytes"] = section[logical] - section[stored]
+        section["saved_ratio"] = round(section["saved_bytes"] / section[logical], 3) if section[logical] else 0.0
+    return {"texts": texts, "originals": originals, "inline_text": inline}
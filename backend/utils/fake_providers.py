@@ -0,0 +1,243 @@
+"""
+Deterministic stand-ins for the paid upstream providers, so routes and
+pipelines can be exercised offline. Enabled per provider through env vars
+such as SPEECH_PROVIDER=fake.
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+
+DEFAULT_ANSWER_SCRIPT = (
+    "In my last internship I owned the data ingestion service. "
+    "We were missing our latency targets so I profiled the pipeline and found the database writes were serialized. "
+    "I batched the writes and moved parsing into a worker pool which cut p95 latency by about sixty percent. "
+    "The main lesson was to measure before optimizing and to share the results with the team early."
+)
+
+
+class FakeSpeechRecognizer:
+    """
+    Pretends to be Speech-to-Text. Every audio chunk "reveals" a few more
+    words of a fixed script as an interim result, and every `final_every`
+    chunks the revealed words are committed as a final segment, mimicking
+    the shape of streaming_recognize responses.
+    """
+
+    def __init__(self, script: str = DEFAULT_ANSWER_SCRIPT, words_per_chunk: int = 3, final_every: int = 4):
+        self.words = script.split()
+        self.words_per_chunk = words_per_chunk
+        self.final_every = final_every
+
+    def recognize(self, audio_bytes: bytes, sample_rate: int = 16000) -> str:
+        fake_latency()
+        if not audio_bytes:
+            return ""
+        return " ".join(self.words)
+
+    def stream(self, chunks, sample_rate: int = 16000, encoding: str = "LINEAR16"):
+        committed = 0
+        revealed = 0
+        for i, chunk in enumerate(chunks, start=1):
+            if not chunk:
+                continue
+            revealed = min(len(self.words), revealed + self.words_per_chunk)
+            if revealed == committed:
+                continue
+            if i % self.final_every == 0:
+                yield {"transcript": " ".join(self.words[committed:revealed]), "is_final": True}
+                committed = revealed
+            else:
+                yield {"transcript": " ".join(self.words[committed:revealed]), "is_final": False}
+        if revealed > committed:
+            yield {"transcript": " ".join(self.words[committed:revealed]), "is_final": True}
+
+
+# skills the fake analyzers "recognize" when they appear in a prompt
+FAKE_SKILLS = (
+    "python", "java", "javascript", "typescript", "go", "sql", "react", "node.js", "flask",
+    "django", "aws", "docker", "kubernetes", "mongodb", "postgresql", "git", "linux", "terraform",
+)
+
+
+# characters per chunk when a fake "streams" its reply
+FAKE_STREAM_CHUNK_CHARS = 16
+
+
+def fake_latency(fraction: float = 1.0):
+    """Sleep FAKE_PROVIDER_LATENCY_MS (read per call so benchmarks can vary it)."""
+    latency_ms = float(os.getenv("FAKE_PROVIDER_LATENCY_MS", "0")) * fraction
+    if latency_ms > 0:
+        time.sleep(latency_ms / 1000)
+
+
+class ResourceExhausted(Exception):
+    """Named like google.api_core's 429 error, so retries and the scheduler treat both alike."""
+
+    status_code = 429
+
+
+class FakeQuota:
+    """
+    A provider-side quota: at most `requests` calls and `tokens` prompt
+    tokens (4 characters each) per sliding window, else ResourceExhausted.
+    Configured per provider with FAKE_GEMINI_QUOTA_REQUESTS,
+    FAKE_GEMINI_QUOTA_TOKENS and FAKE_QUOTA_WINDOW_SECONDS (default 60);
+    0 or unset means unlimited.
+    """
+
+    def __init__(self, requests: int = 0, tokens: int = 0, window: float = 60):
+        self.requests = requests
+        self.tokens = tokens
+        self.window = window
+        self.accepted = 0
+        self.rejected = 0
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def charge(self, prompt: str):
+        cost = len(prompt) // 4 + 1
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0][0] >= self.window:
+                self._calls.popleft()
+            over_requests = self.requests and len(self._calls) >= self.requests
+            over_tokens = self.tokens and sum(c for _, c in self._calls) + cost > self.tokens
+            if over_requests or over_tokens:
+                self.rejected += 1
+                raise ResourceExhausted("429 Quota exceeded (simulated)")
+            self._calls.append((now, cost))
+            self.accepted += 1
+
+
+_quotas = {}
+_quotas_lock = threading.Lock()
+
+
+def fake_quota(provider: str) -> FakeQuota:
+    with _quotas_lock:
+        quota = _quotas.get(provider)
+        if quota is None:
+            quota = _quotas[provider] = FakeQuota(
+                int(os.getenv(f"FAKE_{provider.upper()}_QUOTA_REQUESTS", "0")),
+                int(os.getenv(f"FAKE_{provider.upper()}_QUOTA_TOKENS", "0")),
+                float(os.getenv("FAKE_QUOTA_WINDOW_SECONDS", "60")),
+            )
+        return quota
+
+
+def reset_fake_quotas():
+    """Forget quota state, re-reading the env on next use."""
+    with _quotas_lock:
+        _quotas.clear()
+
+
+def _stream_text(text: str):
+    """
+    Split a reply into small chunks, spreading the usual latency across
+    them, the way a real streaming API delivers tokens over the full
+    generation time.
+    """
+    pieces = [text[i:i + FAKE_STREAM_CHUNK_CHARS] for i in range(0, len(text), FAKE_STREAM_CHUNK_CHARS)] or [""]
+    for piece in pieces:
+        fake_latency(1 / len(pieces))
+        yield piece
+
+
+def _mentioned_skills(text: str) -> list:
+    lowered = text.lower()
+    return [s for s in FAKE_SKILLS if re.search(rf"(?<![\w.]){re.escape(s)}(?![\w])", lowered)]
+
+
+# "### s1: experience" headings the resume prompt puts before each section
+_RESUME_SECTION_RE = re.compile(r"^\s*### (s\d+): (\w+)\n(.*?)(?=^\s*### s\d+: |\Z)", re.MULTILINE | re.DOTALL)
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeStreamEvent:
+    def __init__(self, event_type: str, text: str = ""):
+        self.event_type = event_type
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Answers the resume, JD and feedback prompts with fixed-shape JSON."""
+
+    def __init__(self, model_name: str = "fake-gemini"):
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        fake_quota("gemini").charge(prompt)
+        if stream:
+            return (_FakeResponse(piece) for piece in _stream_text(self._reply(prompt)))
+        fake_latency()
+        return _FakeResponse(self._reply(prompt))
+
+    @staticmethod
+    def _resume_section(name: str, text: str) -> dict:
+        skills = _mentioned_skills(text)
+        return {
+            "summary": "Software engineer with backend and cloud experience." if name in ("summary", "header") else "",
+            "technical_skills": skills[: len(skills) // 2 + 1] if skills else [],
+            "soft_skills": ["communication", "teamwork"] if name in ("summary", "experience") else [],
+            "tools": skills[len(skills) // 2 + 1:],
+            "work_experience": ([{"company": "Acme", "role": "Software Engineer Intern", "duration": "6 months"}]
+                                if name == "experience" else []),
+            "gaps": ["Quantify impact in bullet points"] if name in ("experience", "projects") else [],
+        }
+
+    def _reply(self, prompt: str) -> str:
+        skills = _mentioned_skills(prompt)
+        if "resume analysis assistant" in prompt:
+            body = {"sections": {id_: self._resume_section(name, text)
+                                 for id_, name, text in _RESUME_SECTION_RE.findall(prompt)}}
+        elif "job description" in prompt and "role_title" in prompt:
+            body = {
+                "company": "Acme",
+                "role_title": "Backend Engineer",
+                "responsibilities": ["Build APIs", "Operate services in production"],
+                "required_skills": skills[::2],
+                "preferred_skills": skills[1::2],
+                "location": "Remote",
+                "compensation": "Not specified",
+            }
+        elif "listening live" in prompt:
+            body = {"note": "Clear point; add one concrete metric."}
+        else:
+            body = {
+                "strengths": ["Clear structure", "Relevant example"],
+                "improvements": ["Quantify the outcome", "Tighten the opening"],
+                "score": 78,
+            }
+        return "```json\n" + json.dumps(body, indent=2) + "\n```"
+
+
+class FakeCohereClient:
+    """Answers question-generation and explanation prompts with fixed text."""
+
+    def chat(self, model: str = None, message: str = "", **kwargs):
+        fake_quota("cohere").charge(message)
+        fake_latency()
+        return _FakeResponse(self._reply(message))
+
+    def chat_stream(self, model: str = None, message: str = "", **kwargs):
+        """Same replies as chat(), as text-generation events and a final stream-end."""
+        fake_quota("cohere").charge(message)
+        for piece in _stream_text(self._reply(message)):
+            yield _FakeStreamEvent("text-generation", piece)
+        yield _FakeStreamEvent("stream-end")
+
+    def _reply(self, message: str) -> str:
+        if "interview questions" in message:
+            skills = _mentioned_skills(message) or ["your main project"]
+            lines = [f"{i}. Walk me through how you have used {skill} in production." for i, skill in enumerate(skills[:6], 1)]
+            lines.append(f"{len(lines) + 1}. Tell me about a time you disagreed with a teammate.")
+            lines.append(f"{len(lines) + 1}. Why do you want to join this company?")
+            return "\n".join(lines)
+        return "The candidate's experience lines up with most core requirements."
@@ -1,17 +1,23 @@
 # backend/utils/gemini_jd.py
-import os
-import json
-import re
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from backend.utils.cache import cached_analysis
+from backend.utils.providers import gemini_generate
+from backend.utils.prompt_builder import prepare_document
+from backend.utils.llm_json import parse_structured
+from backend.utils.schemas import JDAnalysis
 
 # Use the same flash model you used for resumes
-model = genai.GenerativeModel("gemini-1.5-flash")
+MODEL_NAME = "gemini-1.5-flash"
+# bump whenever the prompt below changes so stale cached analyses are ignored
+PROMPT_VERSION = "v2"
 
 def analyze_job_description_gemini(jd_text: str) -> dict:
+    """
+    Cached front for _analyze_job_description_uncached; identical JD text
+    (modulo whitespace) is only sent to Gemini once per prompt version.
+    """
+    return cached_analysis("jd", jd_text, MODEL_NAME, PROMPT_VERSION, _analyze_job_description_uncached)
+
+def _analyze_job_description_uncached(jd_text: str) -> dict:
     """
     Parse a free-form job description into structured JSON:
       - company
@@ -22,6 +28,7 @@ def analyze_job_description_gemini(jd_text: str) -> dict:
       - location
       - compensation
     """
+    jd_text = prepare_document(jd_text, MODEL_NAME)
     prompt = f"""
 You are an assistant that extracts structured fields from a job description.
 Given the following text, return **only** valid JSON with keys:
@@ -36,15 +43,8 @@ Given the following text, return **only** valid JSON with keys:
 Job Description:
 {jd_text}
 """
-    response = model.generate_content(prompt)
-    raw = response.text.strip()
-    # strip out any markdown fences
-    cleaned = re.sub(r"^```json\s*|\s*```$", "", raw, flags=re.DOTALL).strip()
-
-    try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
-        return {"error": "Gemini response was not valid JSON", "raw": cleaned}
+    raw = gemini_generate(MODEL_NAME, prompt, purpose="analyze_jd")
+    return parse_structured(raw, JDAnalysis, "Gemini response was not valid JSON")
 
 
 # import vertexai
@@ -1,40 +1,111 @@
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-import json
+from backend.utils.cache import cached_analyses
+from backend.utils.providers import gemini_generate
+from backend.utils.provider_scheduler import ProviderBusyError
+from backend.utils.prompt_builder import clean_document, split_sections, fit_section_texts, estimate_tokens, token_budget
+from backend.utils.llm_json import parse_structured
+from backend.utils.schemas import ResumeAnalysis, ResumeSectionAnalyses
+from backend.utils.tracing import log_error, span
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel(model_name="gemini-1.5-flash")
+MODEL_NAME = "gemini-1.5-flash"
+# bump whenever the prompt below changes so stale cached analyses are ignored
+PROMPT_VERSION = "v4"
+# where the merged summary comes from, first non-empty wins
+SUMMARY_SOURCES = ("summary", "header", "experience")
+LIST_FIELDS = ("technical_skills", "soft_skills", "tools", "gaps")
 
 
 def analyze_resume(resume_text: str) -> dict:
-    prompt = f"""
-    You are a resume analysis assistant. Analyze the following resume content and return a JSON object with these fields:
+    """
+    Analyze the resume section by section. Each section's analysis is cached
+    under the fingerprint of its text, so a revision that only edits one
+    bullet re-sends just that section to Gemini, and the rest are merged
+    from earlier revisions. An unchanged resume is one cache query.
+    Sections are fitted into the prompt budget first and cached under the
+    name and text actually sent, so a shortened section never answers for
+    the full one and identical text under two headings keeps both.
+    """
+    # whitespace, page numbers and repeated headers cost tokens but carry nothing
+    sections = split_sections(clean_document(resume_text))
+    if not sections:
+        return {"error": "Resume has no text", "raw": ""}
+    with span("prompt", "fit_sections"):
+        headings = estimate_tokens("".join(_heading(f"s{i}", name) for i, (name, _) in enumerate(sections, 1)))
+        fitted = fit_section_texts(sections, token_budget(MODEL_NAME) - 600 - headings)
+    sections = [(name, text) for (name, _), text in zip(sections, fitted) if text]
+    keys = {f"{name}\n{text}": (name, text) for name, text in sections}
+    with span("cache", "resume_sections", sections=len(sections), analyzed=0) as attrs:
+        partials = cached_analyses("resume_section", [f"{name}\n{text}" for name, text in sections], MODEL_NAME,
+                                   PROMPT_VERSION, lambda missing: _analyze_sections([keys[k] for k in missing], attrs))
+    for partial in partials:
+        if isinstance(partial, dict) and "error" in partial:
+            return partial
+    return merge_section_analyses(list(zip((name for name, _ in sections), partials)))
 
-    Given this resume text, extract:
-    - summary
+
+def _analyze_sections(sections: list, attrs: dict) -> list:
+    """One Gemini call for every section in `sections`; their analyses in order, None where one is missing."""
+    attrs["analyzed"] = len(sections)
+    ids = [f"s{i}" for i in range(1, len(sections) + 1)]
+    # already fitted to the budget by analyze_resume
+    resume_text = "\n\n".join(_heading(id_, name) + text for id_, (name, text) in zip(ids, sections))
+    prompt = f"""
+    You are a resume analysis assistant. Below are sections of one resume, each starting with a line "### <id>: <section name>".
+    Analyze each section on its own and return a JSON object {{"sections": {{"<id>": {{...}}}}}} with, for every id, these fields
+    (empty when the section has nothing for a field):
+    - summary (one sentence about the candidate, from this section)
     - technical_skills (as a list)
     - soft_skills (as a list)
     - tools (as a list)
     - work_experience (as a list of dicts with company, role, duration)
-    - gaps (as a list of improvement suggestions)
+    - gaps (as a list of improvement suggestions for this section)
 
     Return only valid JSON.
 
-    Resume Text:
+    Resume Sections:
     {resume_text}
     """
     try:
-        response = model.generate_content(prompt)
-        cleaned = response.text.strip("```json\n").strip("```")
-        return json.loads(cleaned)
-
+        response_text = gemini_generate(MODEL_NAME, prompt, purpose="analyze_resume")
+        result = parse_structured(response_text, ResumeSectionAnalyses, "Gemini response was not valid JSON")
+    except ProviderBusyError:
+        raise  # the route answers 503, not a cached error
     except Exception as err:
-        print("🔥 Gemini JSON parsing error:", err)
+        log_error("resume_analysis_failed", err)
+        fallback_text = response_text if 'response_text' in locals() else "No Gemini response."
+        result = {"error": "Gemini response was not valid JSON", "raw": fallback_text}
+    if "error" in result:
+        return [result] * len(sections)
+    return [result["sections"].get(id_) for id_ in ids]
+
+
+def _heading(id_: str, name: str) -> str:
+    return f"### {id_}: {name}\n"
+
+
+def _dedupe(items: list) -> list:
+    seen, kept = set(), []
+    for item in items:
+        key = item.lower() if isinstance(item, str) else repr(sorted(item.items()) if isinstance(item, dict) else item)
+        if key not in seen:
+            seen.add(key)
+            kept.append(item)
+    return kept
+
 
-        fallback_text = response.text if 'response' in locals() else "No Gemini response."
-        return {
-            "error": "Gemini response was not valid JSON",
-            "raw": fallback_text
-        }
+def merge_section_analyses(partials: list) -> dict:
+    """Merge [(section name, section analysis)] into one ResumeAnalysis, in document order."""
+    merged = {"summary": "", **{field: [] for field in LIST_FIELDS}, "work_experience": []}
+    summaries = {}
+    for name, partial in partials:
+        if not partial:
+            continue
+        if partial.get("summary"):
+            summaries.setdefault(name, partial["summary"])
+        for field in LIST_FIELDS:
+            merged[field].extend(partial.get(field) or [])
+        merged["work_experience"].extend(partial.get("work_experience") or [])
+    for field in LIST_FIELDS + ("work_experience",):
+        merged[field] = _dedupe(merged[field])
+    ordered = [summaries.get(name) for name in SUMMARY_SOURCES] + list(summaries.values())
+    merged["summary"] = next((s for s in ordered if s), "")
+    return ResumeAnalysis.model_validate(merged).model_dump()
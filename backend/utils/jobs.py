@@ -0,0 +1,176 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+from flask import request
+
+from backend.utils.db import get_collection
+from backend.utils.tracing import span, log_error
+from backend.utils.provider_scheduler import ProviderBusyError, priority, job_priority, retry_after_seconds
+from backend.utils.write_behind import WriteNotDurable, durable_writes
+
+# max concurrent jobs per upstream provider, e.g. JOB_CONCURRENCY_GEMINI=8
+JOB_CONCURRENCY = {
+    "gemini": int(os.getenv("JOB_CONCURRENCY_GEMINI", "4")),
+    "cohere": int(os.getenv("JOB_CONCURRENCY_COHERE", "4")),
+    "speech": int(os.getenv("JOB_CONCURRENCY_SPEECH", "2")),
+}
+# queued/running jobs untouched for this long were lost in a restart
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "900"))
+
+jobs_col = get_collection("jobs")
+
+_executors = {}
+_events = {}
+_lock = threading.Lock()
+
+
+def _executor(provider: str) -> ThreadPoolExecutor:
+    with _lock:
+        pool = _executors.get(provider)
+        if pool is None:
+            pool = ThreadPoolExecutor(
+                max_workers=JOB_CONCURRENCY.get(provider, 2),
+                thread_name_prefix=f"jobs-{provider}",
+            )
+            _executors[provider] = pool
+        return pool
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def wants_async(payload=None) -> bool:
+    """True when the caller opted into job mode via ?async=1 or {"async": true}."""
+    if request.args.get("async", "").lower() in ("1", "true", "yes"):
+        return True
+    if request.form.get("async", "").lower() in ("1", "true", "yes"):
+        return True
+    return bool(payload and payload.get("async") is True)
+
+
+def submit_job(kind: str, provider: str, fn, *args, **kwargs) -> str:
+    """
+    Persist a queued job and run fn(*args, **kwargs) on the provider's pool.
+    fn may return a JSON-able body or a (body, http_status) tuple, exactly
+    like the synchronous route would respond.
+    """
+    job_id = str(uuid.uuid4())
+    now = _now()
+    jobs_col.insert_one({
+        "_id": job_id,
+        "kind": kind,
+        "provider": provider,
+        "status": "queued",
+        "created_at": now,
+        "updated_at": now,
+    })
+    with _lock:
+        _events[job_id] = threading.Event()
+    _executor(provider).submit(_run_job, job_id, kind, fn, args, kwargs)
+    return job_id
+
+
+def _run_job(job_id, kind, fn, args, kwargs):
+    try:
+        # inside the try so a MongoDB error still fails the job and wakes its waiters
+        jobs_col.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "running", "started_at": _now(), "updated_at": _now()}},
+        )
+        # the job's session writes are acknowledged before it is marked done
+        with span("job", kind), priority(job_priority(kind)), durable_writes():
+            result = fn(*args, **kwargs)
+        body, status = result if isinstance(result, tuple) else (result, 200)
+        update = {"status": "done", "result": body, "http_status": status}
+    except ProviderBusyError as e:
+        log_error("job_failed", e, job_id=job_id, kind=kind)
+        update = {"status": "failed", "error": str(e), "http_status": e.status_code,
+                  "retry_after": retry_after_seconds(e)}
+    except Exception as e:
+        log_error("job_failed", e, job_id=job_id, kind=kind)
+        status = e.status_code if isinstance(e, WriteNotDurable) else 500
+        update = {"status": "failed", "error": str(e), "http_status": status}
+    update["finished_at"] = update["updated_at"] = _now()
+    try:
+        jobs_col.update_one({"_id": job_id}, {"$set": update})
+    except Exception as e:
+        log_error("job_update_failed", e, job_id=job_id, kind=kind)
+    finally:
+        with _lock:
+            event = _events.pop(job_id, None)
+        if event:
+            event.set()
+
+
+def get_job(job_id: str):
+    doc = jobs_col.find_one({"_id": job_id})
+    if not doc:
+        return None
+    doc["job_id"] = doc.pop("_id")
+    if doc["status"] in ("queued", "running") and job_id not in _events:
+        updated_at = doc["updated_at"]
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        if _now() - updated_at > timedelta(seconds=JOB_STALE_SECONDS):
+            doc["status"] = "failed"
+            doc["error"] = "Job was interrupted before it finished"
+    return doc
+
+
+def wait_for_job(job_id: str, timeout: float) -> bool:
+    """
+    Block until a job owned by this process finishes or `timeout` passes.
+    Jobs running in another process cannot be awaited, so this just sleeps
+    for `timeout` and the caller re-reads MongoDB.
+    """
+    with _lock:
+        event = _events.get(job_id)
+    if event is None:
+        time.sleep(timeout)
+        return False
+    return event.wait(timeout)
+
+
+def serialize_job(doc: dict) -> dict:
+    return {
+        "job_id": doc["job_id"],
+        "kind": doc.get("kind"),
+        "status": doc["status"],
+        "result": doc.get("result"),
+        "http_status": doc.get("http_status"),
+        "error": doc.get("error"),
+        "retry_after": doc.get("retry_after"),
+        "created_at": doc["created_at"].isoformat(),
+        "finished_at": doc["finished_at"].isoformat() if doc.get("finished_at") else None,
+    }
+
+
+def drain_jobs(timeout: float) -> int:
+    """
+    Let this process's queued and running jobs finish, for up to `timeout`
+    seconds. Jobs still unfinished after that are cancelled and marked
+    failed so pollers are not left waiting. Returns how many were cut off.
+    """
+    deadline = time.monotonic() + timeout
+    with _lock:
+        pending = dict(_events)
+    for event in pending.values():
+        event.wait(max(0.0, deadline - time.monotonic()))
+
+    with _lock:
+        unfinished = list(_events)
+        pools = list(_executors.values())
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+    if unfinished:
+        jobs_col.update_many(
+            {"_id": {"$in": unfinished}, "status": {"$in": ["queued", "running"]}},
+            {"$set": {"status": "failed", "error": "Server shut down before the job finished",
+                      "http_status": 503, "updated_at": _now(), "finished_at": _now()}},
+        )
+    return len(unfinished)
@@ -0,0 +1,124 @@
+"""
+Worker lifecycle for the production server (see backend/serve.py):
+in-flight request counting, liveness/readiness checks, and a drain step
+that lets queued LLM jobs, write-behind buffered documents and original-file
+uploads finish before the worker exits.
+"""
+import os
+import time
+import threading
+
+from flask import request
+
+from backend.utils.db import client
+from backend.utils.jobs import drain_jobs
+from backend.utils.write_behind import flush as flush_writes
+from backend.utils.document_store import flush_uploads
+
+# how long a stopping worker waits for in-flight requests, jobs and writes
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "60"))
+# readiness pings MongoDB at most this often
+READY_CHECK_TTL_SECONDS = 5
+
+_draining = threading.Event()
+_drain_thread = None
+_drain_deadline = 0.0
+_drain_report = {}
+_inflight = 0
+_inflight_lock = threading.Lock()
+_ready_cache = {"checked_at": 0.0, "ok": False, "error": None}
+_started_at = time.time()
+
+
+def install(app):
+    """Count in-flight requests on `app` so drain() can wait for them."""
+
+    @app.before_request
+    def _request_started():
+        global _inflight
+        with _inflight_lock:
+            _inflight += 1
+        request.environ["careerpilot.counted"] = True
+
+    @app.teardown_request
+    def _request_finished(exc=None):
+        global _inflight
+        if request.environ.pop("careerpilot.counted", False):
+            with _inflight_lock:
+                _inflight -= 1
+
+
+def inflight_requests() -> int:
+    return _inflight
+
+
+def is_draining() -> bool:
+    return _draining.is_set()
+
+
+def start_draining():
+    """Fail readiness from now on so the load balancer stops sending traffic."""
+    _draining.set()
+
+
+def liveness() -> dict:
+    return {"status": "ok", "pid": os.getpid(), "uptime_seconds": int(time.time() - _started_at),
+            "inflight_requests": _inflight}
+
+
+def readiness():
+    """(ready, details): not draining and MongoDB answers a ping."""
+    if is_draining():
+        return False, {"status": "draining", "inflight_requests": _inflight}
+    now = time.monotonic()
+    if now - _ready_cache["checked_at"] > READY_CHECK_TTL_SECONDS:
+        try:
+            client.admin.command("ping")
+            _ready_cache.update(ok=True, error=None)
+        except Exception as e:
+            _ready_cache.update(ok=False, error=str(e))
+        _ready_cache["checked_at"] = now
+    if not _ready_cache["ok"]:
+        return False, {"status": "mongodb unavailable", "error": _ready_cache["error"]}
+    return True, {"status": "ready", "inflight_requests": _inflight}
+
+
+def drain(timeout: float = DRAIN_TIMEOUT_SECONDS) -> dict:
+    """
+    Stop taking traffic and wait, within one shared deadline, for in-flight
+    requests, then async LLM jobs, then buffered MongoDB writes and uploads.
+    """
+    start_draining()
+    deadline = time.monotonic() + timeout
+    while _inflight > 0 and time.monotonic() < deadline:
+        time.sleep(0.1)
+    requests_left = _inflight
+    jobs_cut = drain_jobs(max(0.0, deadline - time.monotonic()))
+    writes_left = flush_writes(max(0.0, deadline - time.monotonic()))
+    writes_left += flush_uploads(max(0.0, deadline - time.monotonic()))
+    return {"requests_left": requests_left, "jobs_cut_off": jobs_cut, "writes_left": writes_left}
+
+
+def begin_drain(timeout: float = DRAIN_TIMEOUT_SECONDS):
+    """
+    Start drain() in the background, so jobs and writes drain alongside the
+    last in-flight requests rather than after them. Later calls are no-ops.
+    """
+    global _drain_thread, _drain_deadline
+    with _inflight_lock:
+        if _drain_thread is not None:
+            return
+        _drain_deadline = time.monotonic() + timeout
+        _drain_thread = threading.Thread(target=lambda: _drain_report.update(drain(timeout)),
+                                         name="drain", daemon=True)
+        # started before the lock is released, so finish_drain never joins an unstarted thread
+        _drain_thread.start()
+
+
+def finish_drain(timeout: float = DRAIN_TIMEOUT_SECONDS) -> dict:
+    """Wait for the drain begin_drain() started (starting one if needed) until its deadline; returns its report."""
+    begin_drain(timeout)
+    _drain_thread.join(max(0.0, _drain_deadline - time.monotonic()))
+    if _drain_thread.is_alive():
+        return {"status": "cut off at the deadline", **_drain_report}
+    return dict(_drain_report)
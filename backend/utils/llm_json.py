@@ -0,0 +1,418 @@
+"""
+One parser for the structured output of every LLM wrapper. Replies are
+scanned for the first complete JSON value (prose and ``` fences around it
+are ignored), common damage is repaired (trailing commas, comments, single
+or smart quotes, Python literals, bare keys, truncation), and the result is
+validated against a pydantic model from backend.utils.schemas.
+
+    python -m backend.benchmarks.bench_llm_json   # speed + fuzz corpus
+"""
+import re
+import json
+
+from pydantic import ValidationError
+
+from backend.utils.tracing import span, log_error
+
+_CLOSERS = {"{": "}", "[": "]"}
+_STRUCTURAL_RE = re.compile(r'[{}\[\]",]')
+_STRING_RE = re.compile(r'["\\]')
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_\-]*")
+_BARE_END_RE = re.compile(r"[,\n}\]]")
+_NUMBER_RE = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?")
+_NUMBERED_RE = re.compile(r"^\s*\**(\d+)[.)]\**\s+(.*)$")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"})
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null", "NaN": "null", "undefined": "null",
+}
+# how many candidate spans extract_json tries before giving up
+MAX_SPAN_ATTEMPTS = 5
+
+
+class LLMOutputError(ValueError):
+    """The reply held no JSON we could repair, or it failed schema validation."""
+
+    def __init__(self, message: str, raw: str = ""):
+        super().__init__(message)
+        self.raw = raw
+
+
+class IncrementalJSONParser:
+    """
+    Finds the first complete top-level JSON object or array in text that
+    arrives in chunks. feed() only scans the new characters, so a streamed
+    reply costs O(n) overall; partial() gives a best-effort value for the
+    prefix seen so far, for showing output while the model is still typing.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.start = None
+        self.end = None
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        # (index, closers): places where the prefix can be cut and still closed validly
+        self._safe_points = []
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: str) -> bool:
+        """Add text; returns True once a complete top-level value has been seen."""
+        if self.end is not None:
+            return True
+        self.text += chunk
+        self._scan()
+        return self.end is not None
+
+    def _closers(self) -> str:
+        return "".join(reversed(self._stack))
+
+    def _scan(self):
+        text, i, n = self.text, self._pos, len(self.text)
+        stack = self._stack
+        while i < n:
+            if self.start is None:
+                brace, bracket = text.find("{", i), text.find("[", i)
+                found = [p for p in (brace, bracket) if p != -1]
+                if not found:
+                    i = n
+                    break
+                i = min(found)
+                self.start = i
+                stack.append(_CLOSERS[text[i]])
+                i += 1
+                self._safe_points.append((i, self._closers()))
+                continue
+
+            if self._in_string:
+                m = _STRING_RE.search(text, i)
+                if m is None:
+                    i = n
+                    break
+                if m.group() == "\\":
+                    # skip the escaped character, even if it arrives in the next chunk
+                    i = m.end() + 1
+                    continue
+                self._in_string = False
+                i = m.end()
+                continue
+
+            m = _STRUCTURAL_RE.search(text, i)
+            if m is None:
+                i = n
+                break
+            ch, i = m.group(), m.end()
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                # cut before a nested opener, so an empty {} never stands in for a half-typed object
+                self._safe_points.append((i - 1, self._closers()))
+                stack.append(_CLOSERS[ch])
+            elif ch in "}]":
+                if stack:
+                    stack.pop()
+                if not stack:
+                    self.end = i
+                    break
+                self._safe_points.append((i, self._closers()))
+            else:  # comma: cut just before it
+                self._safe_points.append((i - 1, self._closers()))
+        self._pos = i
+
+    def span(self) -> str:
+        if self.start is None:
+            return ""
+        return self.text[self.start:self.end]
+
+    def result(self):
+        """Parse (and if needed repair) the value; raises LLMOutputError."""
+        if self.start is None:
+            raise LLMOutputError("no JSON object in response", self.text)
+        return loads_lenient(self.span(), raw=self.text)
+
+    def partial(self, complete_only: bool = False):
+        """
+        Best-effort value for the text so far, or None if nothing parses yet.
+        With complete_only, the prefix is cut between two top-level fields or
+        two elements of a top-level list, so nothing half-typed is included.
+        """
+        if self.end is not None:
+            try:
+                return self.result()
+            except LLMOutputError:
+                return None
+        if self.start is None:
+            return None
+        candidates = [] if complete_only else [
+            self.text[self.start:] + ('"' if self._in_string else "") + self._closers()
+        ]
+        points = self._safe_points[-8:]
+        if complete_only:
+            points = [p for p in self._safe_points[-32:] if len(p[1]) <= 2]
+        candidates += [self.text[self.start:idx] + closers for idx, closers in reversed(points)]
+        for candidate in candidates:
+            try:
+                return json.loads(candidate, strict=False)
+            except ValueError:
+                continue
+        return None
+
+
+def _drop_trailing_comma(out: list):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrite almost-JSON into JSON: smart and single quotes, comments,
+    trailing and missing commas, Python/JS literals, bare keys and values,
+    raw newlines in strings, and unterminated strings/brackets.
+    """
+    s = text.translate(_SMART_QUOTES)
+    out, stack = [], []
+    last = ""  # last significant character emitted
+    i, n = 0, len(s)
+
+    def value_start():
+        # two values in a row means the model forgot a comma
+        if last in ('"', "}", "]") or last.isalnum():
+            out.append(",")
+
+    while i < n:
+        ch = s[i]
+        if ch in "\"'":
+            value_start()
+            j, buf = i + 1, []
+            while j < n and s[j] != ch:
+                c = s[j]
+                if c == "\\" and j + 1 < n:
+                    buf.append("'" if s[j + 1] == "'" else s[j:j + 2])
+                    j += 2
+                    continue
+                buf.append('\\"' if c == '"' else "\\n" if c == "\n" else c)
+                j += 1
+            out.append('"' + "".join(buf) + '"')
+            last, i = '"', j + 1
+        elif ch == "/" and s.startswith("//", i):
+            end = s.find("\n", i)
+            i = n if end == -1 else end
+        elif ch == "/" and s.startswith("/*", i):
+            end = s.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+        elif ch in "{[":
+            value_start()
+            stack.append(_CLOSERS[ch])
+            out.append(ch)
+            last, i = ch, i + 1
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                out.append(stack.pop())
+            last, i = out[-1] if out else ch, i + 1
+        elif ch == "-" or ch.isdigit():
+            m = _NUMBER_RE.match(s, i)
+            if m is None:
+                i += 1
+                continue
+            value_start()
+            out.append(m.group())
+            last, i = "0", m.end()
+        elif ch.isalpha() or ch == "_":
+            m = _WORD_RE.match(s, i)
+            word, end = m.group(), m.end()
+            value_start()
+            if word in _LITERALS:
+                out.append(_LITERALS[word])
+            elif s[end:end + 8].lstrip(" \t").startswith(":"):
+                out.append(json.dumps(word))
+            else:
+                # unquoted text value: runs to the next delimiter
+                stop = _BARE_END_RE.search(s, i)
+                end = stop.start() if stop else n
+                out.append(json.dumps(s[i:end].strip()))
+            last, i = '"', end
+        elif ch in ",:":
+            if ch == "," and last in ("", ",", "{", "["):
+                i += 1
+                continue
+            out.append(ch)
+            last, i = ch, i + 1
+        else:
+            if not ch.isspace():
+                i += 1
+                continue
+            out.append(ch)
+            i += 1
+
+    _drop_trailing_comma(out)
+    if out and out[-1] == ":":
+        out.append("null")
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def loads_lenient(text: str, raw: str = None):
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        pass
+    try:
+        return json.loads(repair_json(text), strict=False)
+    except ValueError as e:
+        raise LLMOutputError(f"unrepairable JSON: {e}", text if raw is None else raw)
+
+
+def looks_like_json(text: str) -> bool:
+    """Cheap check before trying to parse replies that are usually prose."""
+    stripped = (text or "").lstrip()
+    return stripped[:1] in ("{", "[") or "```" in stripped
+
+
+def iter_json_values(text: str):
+    """
+    Candidate JSON values in an LLM reply, most likely first: the whole
+    reply, then each bracketed span in turn (repaired if needed). Raises
+    LLMOutputError if there is none.
+    """
+    stripped = (text or "").strip()
+    if not stripped:
+        raise LLMOutputError("empty response", text or "")
+    # fast path: the whole reply is already JSON
+    if stripped[0] in "{[\"":
+        try:
+            yield json.loads(stripped, strict=False)
+        except ValueError:
+            pass
+
+    offset, error, found = 0, None, False
+    for _ in range(MAX_SPAN_ATTEMPTS):
+        parser = IncrementalJSONParser()
+        parser.feed(stripped[offset:])
+        if parser.start is None:
+            break
+        try:
+            value = parser.result()
+            found = True
+            yield value
+        except LLMOutputError as e:
+            error = e
+        # e.g. "[Note]" in prose ahead of the real object: move on to the next span
+        offset += parser.start + 1
+    if not found:
+        raise LLMOutputError(str(error) if error else "no JSON object in response", text)
+
+
+def extract_json(text: str):
+    """First JSON value in an LLM reply, repaired if needed; raises LLMOutputError."""
+    return next(iter_json_values(text))
+
+
+def parse_llm_output(text: str, schema=None):
+    """
+    extract_json() plus validation against a pydantic model; returns plain
+    data from the first candidate value that validates.
+    """
+    if schema is None:
+        return extract_json(text)
+    error = None
+    for value in iter_json_values(text):
+        try:
+            return schema.model_validate(value).model_dump()
+        except ValidationError as e:
+            error = e
+    count = error.error_count() if error else 0
+    raise LLMOutputError(f"{schema.__name__} validation failed: {count} error(s)", text)
+
+
+def parse_structured(text: str, schema, error: str) -> dict:
+    """
+    parse_llm_output() for the wrappers: on failure returns the
+    {"error": ..., "raw": ...} shape the routes already understand.
+    """
+    try:
+        with span("parse", schema.__name__):
+            return parse_llm_output(text, schema)
+    except LLMOutputError as e:
+        log_error("llm_parse_failed", e, schema=schema.__name__)
+        return {"error": error, "raw": text}
+
+
+def stream_json_events(chunks, schema=None):
+    """
+    Follow a streamed JSON reply and yield pieces as soon as they are
+    complete: ("item", field, value) for each new element of a list field
+    (field is None when the reply itself is a list), ("field", field, value)
+    for other top-level fields, then one ("result", None, data) with the
+    validated whole, or ("error", None, {"error", "raw"}) if it fails.
+    """
+    parser = IncrementalJSONParser()
+    parts, emitted = [], {}
+    for chunk in chunks:
+        parts.append(chunk)
+        if parser.complete:
+            continue
+        parser.feed(chunk)
+        value = parser.partial(complete_only=True)
+        pieces = value.items() if isinstance(value, dict) else [(None, value)] if isinstance(value, list) else []
+        for field, v in pieces:
+            if isinstance(v, list):
+                for item in v[emitted.get(field, 0):]:
+                    yield "item", field, item
+                emitted[field] = len(v)
+            elif field not in emitted:
+                emitted[field] = True
+                yield "field", field, v
+
+    text = "".join(parts)
+    try:
+        yield "result", None, parse_llm_output(text, schema)
+    except LLMOutputError as e:
+        yield "error", None, {"error": str(e), "raw": text}
+
+
+def stream_numbered_list(chunks):
+    """
+    Yield the items of a "1. ..." list as streamed text completes them. An
+    item is done when the next one starts or a blank line follows it (so a
+    closing remark is not glued to the last item); other lines continue it.
+    """
+    buffer, current = "", None
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            item, current = _numbered_line(line, current)
+            if item is not None:
+                yield item
+    item, current = _numbered_line(buffer, current)
+    for done in (item, current):
+        if done is not None:
+            yield done
+
+
+def _numbered_line(line: str, current):
+    """(finished item or None, item in progress) after one more line."""
+    m = _NUMBERED_RE.match(line)
+    if m:
+        return current, m.group(2).strip()
+    if not line.strip():
+        return current, None
+    if current is not None:
+        return None, current + "\n" + line.rstrip()
+    return None, None
+
+
+def parse_numbered_list(text: str) -> list:
+    """Items of a "1. ..." list; non-blank continuation lines stay with their item."""
+    return list(stream_numbered_list([text or ""]))
+
+
+def render_numbered_list(items) -> str:
+    return "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
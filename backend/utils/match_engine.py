@@ -0,0 +1,264 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from backend.utils.tracing import traced
+
+# JD requirement categories and how much each counts towards the score
+CATEGORY_WEIGHTS = {
+    "required_skills": 1.0,
+    "preferred_skills": 0.5,
+}
+# resume fields that describe what the candidate can do
+RESUME_SKILL_FIELDS = ("technical_skills", "tools")
+# longest skill name (in words) looked for inside a JD requirement phrase
+MAX_NGRAM = 3
+
+# alias -> canonical skill name; keys and values are already normalized
+SKILL_SYNONYMS = {
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "golang": "go",
+    "c sharp": "c#",
+    "csharp": "c#",
+    "cpp": "c++",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "node js": "node.js",
+    "react.js": "react",
+    "reactjs": "react",
+    "react js": "react",
+    "vue.js": "vue",
+    "vuejs": "vue",
+    "angularjs": "angular",
+    "next.js": "nextjs",
+    "express.js": "express",
+    "expressjs": "express",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "ms sql": "sql server",
+    "mssql": "sql server",
+    "k8s": "kubernetes",
+    "amazon web services": "aws",
+    "gcp": "google cloud",
+    "google cloud platform": "google cloud",
+    "azure cloud": "azure",
+    "microsoft azure": "azure",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "llm": "large language models",
+    "llms": "large language models",
+    "tf": "tensorflow",
+    "sklearn": "scikit-learn",
+    "scikit learn": "scikit-learn",
+    "ci cd": "ci/cd",
+    "cicd": "ci/cd",
+    "continuous integration": "ci/cd",
+    "rest": "rest api",
+    "restful": "rest api",
+    "restful api": "rest api",
+    "restful apis": "rest api",
+    "rest apis": "rest api",
+    "gql": "graphql",
+    "oop": "object-oriented programming",
+    "object oriented programming": "object-oriented programming",
+    "dsa": "data structures and algorithms",
+    "git hub": "github",
+    "unix": "linux",
+}
+
+# skills that are also everyday words or short abbreviations; inside a longer
+# JD phrase they only count when written as a name ("Go", "AI", "REST")
+AMBIGUOUS_SKILL_WORDS = frozenset({
+    "go", "rest", "ai", "ml", "dl", "cv", "ts", "tf", "js", "py", "r", "c", "swift", "spark", "rust", "dart",
+    "node", "express", "react", "flask", "spring", "unity", "ruby",
+})
+# word windows inside a JD phrase never start or end on one of these
+STOP_WORDS = frozenset({
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "with", "by", "from", "as", "into", "and", "or",
+    "is", "are", "be", "our", "your", "their", "this", "that", "using", "use", "strong", "good", "solid",
+    "experience", "knowledge", "familiarity", "proficiency", "understanding", "skills", "years", "year",
+    "above", "beyond", "team", "ability", "plus",
+})
+
+_PAREN_RE = re.compile(r"\(([^)]*)\)")
+_VERSION_RE = re.compile(r"\s+v?\d+(\.\d+)*\+?$")
+_SPLIT_RE = re.compile(r"\s*(?:/|,|;|\band\b|\bor\b)\s*", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"[a-z0-9#+.\-/]+", re.IGNORECASE)
+
+
+def normalize_skill(skill: str) -> str:
+    """Lower-case, trim punctuation and version suffixes, then map synonyms."""
+    s = " ".join(str(skill).lower().split())
+    s = s.strip(" .,:;-*•")
+    s = _VERSION_RE.sub("", s)
+    return SKILL_SYNONYMS.get(s, s)
+
+
+def _skill_aliases(skill: str) -> set:
+    """
+    Canonical names a resume entry vouches for. "Amazon Web Services (AWS)"
+    yields {"aws"}; "Docker/Kubernetes" yields both tools.
+    """
+    text = str(skill).lower()
+    parts = [_PAREN_RE.sub("", text)] + _PAREN_RE.findall(text)
+    aliases = set()
+    for part in parts:
+        aliases.add(normalize_skill(part))
+        for piece in _SPLIT_RE.split(part):
+            aliases.add(normalize_skill(piece))
+    aliases.discard("")
+    return aliases
+
+
+def _written_as_name(token: str, position: int) -> bool:
+    """"AI" anywhere, or "Go" past the first word; "go" or a sentence-initial "Go" is just a word."""
+    return token.isupper() and len(token) > 1 or (token[:1].isupper() and position > 0)
+
+
+@lru_cache(maxsize=8192)
+def _requirement_keys(requirement: str) -> tuple:
+    """
+    Candidate skill names inside a JD requirement, most specific first: the
+    full phrase, each piece between "/", ",", "and", "or" and parentheses,
+    then 1..MAX_NGRAM word windows of each piece, so "3+ years with Python
+    and AWS" can be satisfied by "python" or "aws". Windows never start or
+    end on a stop word, and an AMBIGUOUS_SKILL_WORDS window must be written
+    as a name: "Proficiency in Go" names Go, "go above and beyond" does not.
+    """
+    text = str(requirement)
+    pieces = [p for part in [_PAREN_RE.sub("", text)] + _PAREN_RE.findall(text) for p in _SPLIT_RE.split(part)]
+    keys = [normalize_skill(text)] + [normalize_skill(piece) for piece in pieces]
+    for piece in pieces:
+        tokens = _TOKEN_RE.findall(piece)
+        for n in range(min(MAX_NGRAM, len(tokens) - 1), 0, -1):
+            for i in range(len(tokens) - n + 1):
+                window = tokens[i:i + n]
+                if window[0].lower() in STOP_WORDS or window[-1].lower() in STOP_WORDS:
+                    continue
+                if n == 1 and window[0].lower() in AMBIGUOUS_SKILL_WORDS and not _written_as_name(window[0], i):
+                    continue
+                keys.append(normalize_skill(" ".join(window)))
+    return tuple(dict.fromkeys(key for key in keys if key))
+
+
+def resume_skill_set(resume_analysis: dict) -> set:
+    skills = set()
+    for field in RESUME_SKILL_FIELDS:
+        for skill in _as_list((resume_analysis or {}).get(field)):
+            skills |= _skill_aliases(skill)
+    return skills
+
+
+def _as_list(value) -> list:
+    if isinstance(value, list):
+        return [v for v in value if isinstance(v, str) and v.strip()]
+    if isinstance(value, str) and value.strip():
+        return [v for v in _SPLIT_RE.split(value) if v.strip()]
+    return []
+
+
+def _requirements(jd_analysis: dict) -> list:
+    """Flatten a JD analysis into (category, skill text, weight) rows, deduplicated."""
+    rows, seen = [], set()
+    for category, weight in CATEGORY_WEIGHTS.items():
+        for skill in _as_list((jd_analysis or {}).get(category)):
+            key = normalize_skill(skill)
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append((category, skill.strip(), weight))
+    return rows
+
+
+def _match_rows(rows: list, resume_skills: set) -> list:
+    """
+    For each requirement, the resume skill that satisfies it, or None. All
+    candidate keys are looked up in one np.isin; each row keeps its first hit.
+    """
+    hits = [None] * len(rows)
+    per_row = [_requirement_keys(skill) for _, skill, _ in rows]
+    keys = np.array([key for row_keys in per_row for key in row_keys], dtype=str)
+    if not (keys.size and resume_skills):
+        return hits
+    row_of_key = np.repeat(np.arange(len(rows)), [len(row_keys) for row_keys in per_row])
+    found = np.flatnonzero(np.isin(keys, np.array(sorted(resume_skills), dtype=str)))
+    # found is in key order, so the first entry per row is that row's most specific hit
+    matched_rows, first = np.unique(row_of_key[found], return_index=True)
+    for row, position in zip(matched_rows.tolist(), found[first].tolist()):
+        hits[row] = str(keys[position])
+    return hits
+
+
+@traced("score")
+def score_matches(resume_analysis: dict, jd_analyses: list) -> list:
+    """
+    Score one resume against many JD analyses in a single vectorized pass.
+    Every requirement of every JD becomes one row; the weighted share of
+    matched rows per JD is computed with np.bincount.
+    """
+    resume_skills = resume_skill_set(resume_analysis)
+
+    per_jd_rows = [_requirements(jd) for jd in jd_analyses]
+    rows = [row for jd_rows in per_jd_rows for row in jd_rows]
+    hits = _match_rows(rows, resume_skills)
+
+    jd_index = np.repeat(np.arange(len(jd_analyses)), [len(r) for r in per_jd_rows])
+    weights = np.fromiter((w for _, _, w in rows), dtype=np.float64, count=len(rows))
+    matched = np.fromiter((h is not None for h in hits), dtype=bool, count=len(rows))
+
+    total = np.bincount(jd_index, weights=weights, minlength=len(jd_analyses))
+    earned = np.bincount(jd_index, weights=weights * matched, minlength=len(jd_analyses))
+    scores = np.divide(earned, total, out=np.zeros(len(jd_analyses)), where=total > 0)
+
+    results, start = [], 0
+    for i, jd_rows in enumerate(per_jd_rows):
+        end = start + len(jd_rows)
+        breakdown = [
+            {
+                "skill": skill,
+                "category": category,
+                "weight": weight,
+                "matched": hit is not None,
+                "matched_by": hit,
+            }
+            for (category, skill, weight), hit in zip(jd_rows, hits[start:end])
+        ]
+        results.append({
+            "score": int(round(float(scores[i]) * 100)),
+            "matched": [b["skill"] for b in breakdown if b["matched"]],
+            "missing": [b["skill"] for b in breakdown if not b["matched"]],
+            "breakdown": breakdown,
+        })
+        start = end
+    return results
+
+
+def score_match(resume_analysis: dict, jd_analysis: dict) -> dict:
+    return score_matches(resume_analysis, [jd_analysis])[0]
+
+
+def render_match_report(match: dict) -> str:
+    """
+    Render a score in the "Match Score: NN%" / "### Section:" markdown the
+    dashboard already parses out of match_score.raw.
+    """
+    lines = [f"Match Score: {match['score']}%"]
+    lines.append("\n### Skill Match:")
+    lines += [f"- {s}" for s in match["matched"]] or ["- None of the listed skills were found"]
+    missing_required = [b["skill"] for b in match["breakdown"] if not b["matched"] and b["category"] == "required_skills"]
+    missing_preferred = [b["skill"] for b in match["breakdown"] if not b["matched"] and b["category"] == "preferred_skills"]
+    lines.append("\n### Gaps or Missing Elements:")
+    lines += [f"- {s} (required)" for s in missing_required]
+    lines += [f"- {s} (preferred)" for s in missing_preferred]
+    if not (missing_required or missing_preferred):
+        lines.append("- No missing skills")
+    return "\n".join(lines)
@@ -0,0 +1,40 @@
+"""
+In-memory MongoDB for offline benchmarks and tests: backend.utils.db uses
+client() when MONGO_URI=mongomock:// (needs `pip install mongomock`).
+
+mongomock 4.x predates parts of pymongo 4.9+, so a few of its methods are
+patched here rather than in the app.
+"""
+import mongomock
+from mongomock.collection import BulkOperationBuilder, Collection
+
+_patched = False
+
+
+def _drop_sort(method):
+    # pymongo>=4.9 passes sort= when UpdateOne/ReplaceOne add themselves to a bulk
+    def patched(self, *args, sort=None, **kwargs):
+        return method(self, *args, **kwargs)
+    return patched
+
+
+def _patch():
+    global _patched
+    if _patched:
+        return
+    BulkOperationBuilder.add_update = _drop_sort(BulkOperationBuilder.add_update)
+    BulkOperationBuilder.add_replace = _drop_sort(BulkOperationBuilder.add_replace)
+
+    find = Collection.find
+
+    def find_with_copied_projection(self, filter=None, projection=None, *args, **kwargs):
+        # mongomock edits the projection in place, which races on our shared module-level projections
+        return find(self, filter, dict(projection) if isinstance(projection, dict) else projection, *args, **kwargs)
+
+    Collection.find = find_with_copied_projection
+    _patched = True
+
+
+def client() -> mongomock.MongoClient:
+    _patch()
+    return mongomock.MongoClient()
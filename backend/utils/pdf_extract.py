@@ -0,0 +1,126 @@
+import os
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.utils.cache import TTLCache
+from backend.utils.tracing import traced
+
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "60"))
+# documents with at least this many pages are split across the process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "12"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+SPOOL_CHUNK_BYTES = 64 * 1024
+
+_text_cache = TTLCache(
+    int(os.getenv("PDF_TEXT_CACHE_ENTRIES", "256")),
+    int(os.getenv("PDF_TEXT_CACHE_TTL_SECONDS", "3600")),
+)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ExtractionError(ValueError):
+    """Upload rejected before or during text extraction; carries the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def spool_upload(file, max_bytes: int = PDF_MAX_BYTES, suffix: str = ".pdf"):
+    """
+    Copy an uploaded FileStorage to a temp file in fixed-size chunks while
+    hashing it, so the whole upload is never held in memory. Returns
+    (path, sha256 hex). The caller owns the file and must remove it.
+    """
+    declared = file.content_length or 0
+    if declared > max_bytes:
+        raise ExtractionError(f"File is larger than {max_bytes // (1024 * 1024)} MB", 413)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="careerpilot-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ExtractionError(f"File is larger than {max_bytes // (1024 * 1024)} MB", 413)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    if size == 0:
+        os.remove(path)
+        raise ExtractionError("Uploaded file is empty")
+    return path, digest.hexdigest()
+
+
+def _extract_page_range(path: str, start: int, end: int) -> str:
+    # runs in a worker process; each worker opens its own handle on the spooled file
+    import fitz
+    with fitz.open(path) as doc:
+        return "\f".join(doc[i].get_text() for i in range(start, end))
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the Flask process is multi-threaded and holds Mongo sockets
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def extract_pdf_path(path: str) -> str:
+    # PyMuPDF is imported on first use so plain-text uploads never pay for it
+    import fitz
+    try:
+        doc = fitz.open(path)
+    except Exception as e:
+        raise ExtractionError(f"Could not open PDF: {e}")
+
+    with doc:
+        if doc.needs_pass:
+            raise ExtractionError("Password-protected PDFs are not supported")
+        page_count = doc.page_count
+        if page_count > PDF_MAX_PAGES:
+            raise ExtractionError(f"PDF has {page_count} pages; the limit is {PDF_MAX_PAGES}", 413)
+        if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+            # form feeds keep page boundaries so prompt_builder can spot repeated headers
+            return "\f".join(page.get_text() for page in doc)
+
+    step = -(-page_count // PDF_WORKERS)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    pool = _process_pool()
+    futures = [pool.submit(_extract_page_range, path, start, end) for start, end in ranges]
+    return "\f".join(f.result() for f in futures)
+
+
+@traced("pdf", "extract")
+def extract_pdf_text(file) -> str:
+    """
+    Extract text from an uploaded PDF. The upload is spooled to disk, page
+    and size limits are checked before any text work, large documents are
+    split across a process pool, and results are cached by file hash.
+    """
+    path, digest = spool_upload(file)
+    try:
+        text = _text_cache.get(digest)
+        if text is None:
+            text = extract_pdf_path(path)
+            _text_cache.set(digest, text)
+        return text
+    finally:
+        os.remove(path)
@@ -0,0 +1,197 @@
+"""
+Prompt compaction shared by the Gemini and Cohere wrappers: whitespace
+normalization, page-furniture stripping, compact JSON for analyses,
+per-model token budgets with section-priority truncation, and a log line
+with the estimated input tokens of every call.
+"""
+import re
+import json
+import math
+import logging
+from collections import Counter
+
+from backend.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# input-token budget for the document part of a prompt, per model
+MODEL_TOKEN_BUDGETS = {
+    "gemini-1.5-flash": 24000,
+    "command-xlarge-nightly": 3000,
+    "command-r-plus": 6000,
+}
+DEFAULT_TOKEN_BUDGET = 4000
+# rough English average for the Gemini/Cohere tokenizers; no network round trip needed
+CHARS_PER_TOKEN = 4
+
+# resume headings, highest priority first; lower-priority sections are cut first
+RESUME_SECTION_PRIORITY = (
+    "skills", "experience", "projects", "summary", "education",
+    "certifications", "publications", "awards", "volunteer", "interests", "references",
+)
+SECTION_ALIASES = {
+    "summary": ("summary", "profile", "objective", "about me", "professional summary"),
+    "skills": ("skills", "technical skills", "core competencies", "technologies", "tools", "tech stack"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "work history", "internships"),
+    "projects": ("projects", "personal projects", "academic projects", "selected projects"),
+    "education": ("education", "academics"),
+    "certifications": ("certifications", "certificates", "licenses"),
+    "publications": ("publications", "research"),
+    "awards": ("awards", "honors", "achievements", "honors and awards"),
+    "volunteer": ("volunteer", "volunteering", "leadership", "activities", "extracurricular activities"),
+    "interests": ("interests", "hobbies"),
+    "references": ("references",),
+}
+_HEADING_TO_SECTION = {alias: name for name, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+# analysis fields, highest priority first, for trimming JSON that is over budget
+RESUME_ANALYSIS_PRIORITY = ("technical_skills", "tools", "work_experience", "summary", "soft_skills", "gaps")
+JD_ANALYSIS_PRIORITY = ("role_title", "company", "required_skills", "preferred_skills", "responsibilities", "location", "compensation")
+
+_PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?\s*$", re.IGNORECASE)
+_SPACES_RE = re.compile(r"[ \t ]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def token_budget(model_name: str) -> int:
+    return MODEL_TOKEN_BUDGETS.get(model_name, DEFAULT_TOKEN_BUDGET)
+
+
+def normalize_whitespace(text: str) -> str:
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def strip_page_furniture(text: str) -> str:
+    """
+    Drop page numbers, and headers/footers repeated across pages. Pages are
+    separated by form feeds (as pdf_extract joins them); lines near a page
+    edge that recur on at least half of the pages are treated as furniture.
+    """
+    pages = text.split("\f")
+    edge_lines = Counter()
+    if len(pages) > 1:
+        for page in pages:
+            lines = [l.strip() for l in page.strip().split("\n") if l.strip()]
+            edge_lines.update(set(lines[:3] + lines[-3:]))
+    repeated = {line for line, n in edge_lines.items() if n >= max(2, len(pages) / 2)}
+
+    kept = []
+    for page in pages:
+        for line in page.split("\n"):
+            stripped = line.strip()
+            if stripped in repeated or _PAGE_NUMBER_RE.match(stripped):
+                continue
+            kept.append(line)
+    return "\n".join(kept)
+
+
+def clean_document(text: str) -> str:
+    return normalize_whitespace(strip_page_furniture(text or ""))
+
+
+def split_sections(text: str) -> list:
+    """
+    Split resume text into [(section name, text)] on recognizable headings.
+    Text before the first heading is the "header" section (name, contacts).
+    """
+    sections = [["header", []]]
+    for line in text.split("\n"):
+        heading = line.strip().rstrip(":").lower()
+        if heading in _HEADING_TO_SECTION and len(line.strip()) < 40:
+            sections.append([_HEADING_TO_SECTION[heading], [line]])
+        else:
+            sections[-1][1].append(line)
+    return [(name, "\n".join(lines).strip()) for name, lines in sections if "\n".join(lines).strip()]
+
+
+def _truncate_chars(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[: cut if cut > max_chars // 2 else max_chars].rstrip() + "\n…"
+
+
+def fit_section_texts(sections: list, max_tokens: int, priority=RESUME_SECTION_PRIORITY) -> list:
+    """
+    The text of each section after fitting them all into `max_tokens`, in
+    document order: lowest-priority sections are shrunk first (unknown
+    sections rank last, header first), "" where one had to be dropped.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    rank = {name: i for i, name in enumerate(("header",) + tuple(priority))}
+    order = sorted(range(len(sections)), key=lambda i: rank.get(sections[i][0], len(rank)))
+    texts = [text for _, text in sections]
+
+    overflow = sum(len(t) + 2 for t in texts) - budget
+    for i in reversed(order):
+        if overflow <= 0:
+            break
+        keep = max(len(texts[i]) - overflow, 0)
+        shortened = _truncate_chars(texts[i], keep) if keep > 80 else ""
+        overflow -= len(texts[i]) - len(shortened)
+        texts[i] = shortened
+    return texts
+
+
+def fit_sections(sections: list, max_tokens: int, priority=RESUME_SECTION_PRIORITY) -> str:
+    """Keep sections in document order but, when over budget, shrink the lowest-priority ones first."""
+    return "\n\n".join(t for t in fit_section_texts(sections, max_tokens, priority) if t)
+
+
+@traced("prompt")
+def prepare_document(text: str, model_name: str, reserved_tokens: int = 500) -> str:
+    """Clean extracted document text and fit it into the model's budget by section priority."""
+    cleaned = clean_document(text)
+    max_tokens = token_budget(model_name) - reserved_tokens
+    if estimate_tokens(cleaned) <= max_tokens:
+        return cleaned
+    return fit_sections(split_sections(cleaned), max_tokens)
+
+
+def _prune(value):
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items() if k not in ("error", "raw")}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [v for v in (_prune(v) for v in value) if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def compact_json(value) -> str:
+    return json.dumps(_prune(value), separators=(",", ":"), ensure_ascii=False)
+
+
+@traced("prompt")
+def compact_analysis(analysis: dict, max_tokens: int, priority=()) -> str:
+    """
+    Serialize an analysis without indentation or empty fields. When still
+    over max_tokens, list fields are trimmed from the lowest priority up.
+    """
+    data = _prune(analysis or {})
+    text = compact_json(data)
+    if estimate_tokens(text) <= max_tokens or not isinstance(data, dict):
+        return text
+    ranked = [k for k in priority if k in data] + [k for k in data if k not in priority]
+    for key in reversed(ranked):
+        while isinstance(data.get(key), list) and len(data[key]) > 1 and estimate_tokens(text) > max_tokens:
+            data[key] = data[key][: len(data[key]) // 2]
+            text = compact_json(data)
+        if estimate_tokens(text) <= max_tokens:
+            break
+    return text
+
+
+def log_prompt(purpose: str, model_name: str, prompt: str) -> int:
+    """Log the estimated input size of one LLM call and return the token count."""
+    tokens = estimate_tokens(prompt)
+    logger.info(json.dumps({"event": "llm_prompt", "purpose": purpose, "model": model_name,
+                            "input_tokens": tokens, "budget": token_budget(model_name)}))
+    return tokens
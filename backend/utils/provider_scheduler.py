@@ -0,0 +1,344 @@
+"""
+Admission control for upstream LLM and speech calls. Every attempt made by
+providers.call_provider() first takes a permit from the lane for its
+provider and model. A lane grants permits in priority order (interactive,
+then normal, then background) only when:
+
+- its concurrency limit has room. The limit is adaptive: halved on a
+  429/quota error, grown by ~1 per limit's worth of successes (AIMD);
+- the request and token buckets of both the model and the provider have
+  capacity, refilled continuously from requests/tokens-per-minute quotas.
+
+Quotas come from PROVIDER_RATE_LIMITS, a JSON object keyed by provider or
+"provider/model", e.g. {"gemini": {"rpm": 300, "tpm": 1000000,
+"concurrency": 16}, "gemini/gemini-1.5-flash": {"rpm": 1000}}; "burst"
+sets how many seconds of quota a full bucket may spend at once. A call
+that cannot get a permit within its class's max wait raises
+ProviderBusyError (HTTP 503) instead of piling onto the provider. Routes
+let it propagate to the errorhandler install() registers, which adds
+Retry-After; their own `except Exception` blocks answer 500.
+
+Priority follows the request: install() marks the interactive interview
+routes, async jobs run as background (except answer feedback), and
+everything else is normal. See backend/benchmarks/bench_scheduler.py for a
+run against the simulated quota in fake_providers.
+"""
+import os
+import json
+import math
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from backend.utils.tracing import Counter, Gauge, log_error, record, register_metric
+
+INTERACTIVE, NORMAL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+# how long a call may queue for a permit before giving up with a 503
+MAX_WAIT_SECONDS = {
+    INTERACTIVE: float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", "30")),
+    NORMAL: float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", "30")),
+    BACKGROUND: float(os.getenv("SCHEDULER_BACKGROUND_MAX_WAIT_SECONDS", "600")),
+}
+# tokens reserved for the reply, which is unknown until the call returns
+OUTPUT_TOKEN_ESTIMATE = int(os.getenv("SCHEDULER_OUTPUT_TOKEN_ESTIMATE", "512"))
+# paid-tier quotas; rpm/tpm 0 means unlimited, concurrency is the ceiling the adaptive limit grows back to
+DEFAULT_LIMITS = {
+    "gemini": {"rpm": 2000, "tpm": 4_000_000, "concurrency": 32},
+    "cohere": {"rpm": 500, "tpm": 0, "concurrency": 16},
+    "speech": {"rpm": 900, "tpm": 0, "concurrency": 32},
+}
+# routes whose provider calls someone is actively waiting on
+INTERACTIVE_ENDPOINTS = {"interview_api.submit_answer", "interview_api.submit_answer_stream"}
+# async job kinds that still run ahead of normal traffic; other jobs are background
+INTERACTIVE_JOB_KINDS = {"submit-answer"}
+
+_priority = contextvars.ContextVar("provider_priority", default=NORMAL)
+
+THROTTLES = Counter("careerpilot_provider_throttles_total", "Quota/429 errors returned by a provider.",
+                    ("provider", "model"))
+TIMEOUTS = Counter("careerpilot_provider_queue_timeouts_total", "Calls that gave up waiting for a permit.",
+                   ("provider", "model", "priority"))
+
+
+class ProviderBusyError(RuntimeError):
+    """No permit within the wait budget, or the provider kept answering 429."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(e: ProviderBusyError) -> int:
+    return max(1, int(math.ceil(e.retry_after)))
+
+
+def busy_body(e: ProviderBusyError) -> dict:
+    """Error body for a 503, also used for error events of streams whose status has already gone out."""
+    return {"error": str(e), "retry_after": retry_after_seconds(e)}
+
+
+def route_error(event: str, e: Exception):
+    """
+    Body for a route's catch-all `except Exception`: logs `e` and answers
+    500. A ProviderBusyError is re-raised for install()'s 503 handler.
+    """
+    if isinstance(e, ProviderBusyError):
+        raise e
+    from flask import jsonify
+    log_error(event, e)
+    return jsonify({"error": str(e)}), 500
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def set_priority(level: int):
+    _priority.set(level)
+
+
+@contextmanager
+def priority(level: int):
+    """Run the block's provider calls at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def job_priority(kind: str) -> int:
+    return INTERACTIVE if kind in INTERACTIVE_JOB_KINDS else BACKGROUND
+
+
+class TokenBucket:
+    """Refills `rate` units per second up to `capacity`; thread-safe."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available; a request bigger than the bucket waits for a full one."""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = min(amount, self.capacity) - self.level
+            return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level -= amount
+
+    def empty(self):
+        """The provider says we are over quota, whatever our arithmetic thinks."""
+        with self._lock:
+            self.level = min(self.level, 0.0)
+            self.updated = time.monotonic()
+
+
+def _buckets(limits: dict):
+    rpm, tpm = limits.get("rpm", 0), limits.get("tpm", 0)
+    # a full bucket holds `burst` seconds of quota (default 1), so bursts barely overshoot a per-minute window
+    burst = limits.get("burst", 1)
+    requests = TokenBucket(rpm / 60, rpm / 60 * burst) if rpm else None
+    tokens = TokenBucket(tpm / 60, tpm / 60 * burst) if tpm else None
+    return requests, tokens
+
+
+class Lane:
+    """Queue, adaptive concurrency limit and buckets for one provider/model."""
+
+    def __init__(self, provider: str, model: str, concurrency: int, model_buckets: tuple, provider_buckets: tuple):
+        self.provider = provider
+        self.model = model
+        self.max_concurrency = max(1, int(concurrency))
+        self.limit = float(self.max_concurrency)
+        self.inflight = 0
+        self.request_buckets = [b for b in (model_buckets[0], provider_buckets[0]) if b]
+        self.token_buckets = [b for b in (model_buckets[1], provider_buckets[1]) if b]
+        self.queue = []
+        self.cond = threading.Condition()
+        self.waits = {name: {"count": 0, "total_ms": 0.0, "max_ms": 0.0} for name in PRIORITY_NAMES.values()}
+        self.throttles = 0
+        self.timeouts = 0
+
+    def _bucket_wait(self, tokens: int) -> float:
+        waits = [b.wait_time(1) for b in self.request_buckets] + [b.wait_time(tokens) for b in self.token_buckets]
+        return max(waits, default=0.0)
+
+    def acquire(self, tokens: int, level: int):
+        entry = (level, next(_sequence))
+        started = time.monotonic()
+        deadline = started + MAX_WAIT_SECONDS[level]
+        with self.cond:
+            heapq.heappush(self.queue, entry)
+            try:
+                while True:
+                    wait = None
+                    if self.queue[0] == entry and self.inflight < int(self.limit):
+                        wait = self._bucket_wait(tokens)
+                        if wait == 0:
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        TIMEOUTS.inc((self.provider, self.model, PRIORITY_NAMES[level]))
+                        raise ProviderBusyError(f"{self.provider} is at capacity; try again shortly",
+                                                retry_after=max(1.0, wait or 1.0))
+                    self.cond.wait(min(wait, remaining) if wait else remaining)
+            finally:
+                self.queue.remove(entry)
+                heapq.heapify(self.queue)
+                self.cond.notify_all()
+            for bucket in self.request_buckets:
+                bucket.take(1)
+            for bucket in self.token_buckets:
+                bucket.take(tokens)
+            self.inflight += 1
+            waited = time.monotonic() - started
+            stats = self.waits[PRIORITY_NAMES[level]]
+            stats["count"] += 1
+            stats["total_ms"] += waited * 1000
+            stats["max_ms"] = max(stats["max_ms"], waited * 1000)
+        record("queue", f"{self.provider}/{self.model}", waited, {"priority": PRIORITY_NAMES[level]})
+
+    def release(self, throttled: bool = False, succeeded: bool = True):
+        with self.cond:
+            self.inflight -= 1
+            if throttled:
+                self.throttles += 1
+                self.limit = max(1.0, self.limit / 2)
+                for bucket in self.request_buckets + self.token_buckets:
+                    bucket.empty()
+            elif succeeded:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self.cond.notify_all()
+        if throttled:
+            THROTTLES.inc((self.provider, self.model))
+
+    def stats(self) -> dict:
+        with self.cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for level, _ in self.queue:
+                depth[PRIORITY_NAMES[level]] += 1
+            return {
+                "queued": depth,
+                "inflight": self.inflight,
+                "concurrency_limit": int(self.limit),
+                "max_concurrency": self.max_concurrency,
+                "throttles": self.throttles,
+                "timeouts": self.timeouts,
+                "waits": {name: {"count": s["count"], "avg_ms": round(s["total_ms"] / s["count"], 1) if s["count"] else 0,
+                                 "max_ms": round(s["max_ms"], 1)} for name, s in self.waits.items()},
+            }
+
+
+_sequence = itertools.count()
+_lanes = {}
+_provider_buckets = {}
+_limits = {}
+_lock = threading.Lock()
+
+
+def configure(limits: dict = None, enabled: bool = None):
+    """Replace the quota table (and optionally switch scheduling on/off); drops existing lanes."""
+    global SCHEDULER_ENABLED, _limits
+    table = {k: dict(v) for k, v in DEFAULT_LIMITS.items()}
+    for key, value in (limits or {}).items():
+        table.setdefault(key, {}).update(value)
+    with _lock:
+        _limits = table
+        _lanes.clear()
+        _provider_buckets.clear()
+        if enabled is not None:
+            SCHEDULER_ENABLED = enabled
+
+
+def _lane(provider: str, model: str) -> Lane:
+    key = (provider, model or "default")
+    with _lock:
+        lane = _lanes.get(key)
+        if lane is None:
+            provider_limits = _limits.get(provider, {})
+            model_limits = _limits.get(f"{provider}/{key[1]}", {})
+            if provider not in _provider_buckets:
+                _provider_buckets[provider] = _buckets(provider_limits)
+            # a model entry adds its own buckets on top of the provider-wide ones
+            concurrency = model_limits.get("concurrency", provider_limits.get("concurrency", 8))
+            lane = _lanes[key] = Lane(provider, key[1], concurrency, _buckets(model_limits), _provider_buckets[provider])
+        return lane
+
+
+class _Permit:
+    def __init__(self, lane):
+        self.lane = lane
+
+    def release(self, throttled: bool = False, succeeded: bool = True):
+        if self.lane is not None:
+            self.lane.release(throttled, succeeded)
+            self.lane = None
+
+
+def acquire(provider: str, model: str = None, tokens: int = 0) -> _Permit:
+    """Block until the call may go out; the returned permit must be release()d."""
+    if not SCHEDULER_ENABLED:
+        return _Permit(None)
+    lane = _lane(provider, model)
+    lane.acquire(tokens + (OUTPUT_TOKEN_ESTIMATE if tokens else 0), current_priority())
+    return _Permit(lane)
+
+
+def scheduler_stats() -> dict:
+    with _lock:
+        lanes = dict(_lanes)
+    return {"enabled": SCHEDULER_ENABLED,
+            "lanes": {f"{provider}/{model}": lane.stats() for (provider, model), lane in sorted(lanes.items())}}
+
+
+def _queue_depths() -> dict:
+    with _lock:
+        lanes = dict(_lanes)
+    depths = {}
+    for (provider, model), lane in lanes.items():
+        for name, count in lane.stats()["queued"].items():
+            depths[(provider, model, name)] = count
+    return depths
+
+
+def install(app):
+    """Run the interview routes' provider calls ahead of everything else; answer 503s with Retry-After."""
+    from flask import request, jsonify
+
+    @app.before_request
+    def _request_priority():
+        set_priority(INTERACTIVE if request.endpoint in INTERACTIVE_ENDPOINTS else NORMAL)
+
+    @app.errorhandler(ProviderBusyError)
+    def _provider_busy(e):
+        response = jsonify(busy_body(e))
+        response.status_code = e.status_code
+        response.headers["Retry-After"] = str(retry_after_seconds(e))
+        return response
+
+
+register_metric(THROTTLES)
+register_metric(TIMEOUTS)
+register_metric(Gauge("careerpilot_provider_queue_depth", "Calls waiting for a provider permit.",
+                      ("provider", "model", "priority"), _queue_depths))
+configure(json.loads(os.getenv("PROVIDER_RATE_LIMITS", "{}") or "{}"))
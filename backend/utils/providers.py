@@ -0,0 +1,368 @@
+"""
+Single registry for the upstream AI providers (Gemini, Cohere, Speech).
+Clients are created lazily on first use and shared process-wide, and every
+call goes through call_provider() for uniform timeouts, jittered retries,
+circuit breaking and admission through the provider_scheduler quotas. GEMINI_PROVIDER / COHERE_PROVIDER / SPEECH_PROVIDER
+set to "fake" swap in the offline stand-ins from fake_providers.
+"""
+import os
+import time
+import random
+import itertools
+import threading
+from contextlib import closing
+from dotenv import load_dotenv
+
+from backend.utils import fake_providers
+from backend.utils.prompt_builder import log_prompt, estimate_tokens
+from backend.utils.tracing import span
+from backend.utils import provider_scheduler
+from backend.utils.provider_scheduler import ProviderBusyError
+
+load_dotenv()
+
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", "60"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "3"))
+PROVIDER_BACKOFF_BASE_SECONDS = float(os.getenv("PROVIDER_BACKOFF_BASE_SECONDS", "0.5"))
+PROVIDER_BACKOFF_MAX_SECONDS = float(os.getenv("PROVIDER_BACKOFF_MAX_SECONDS", "8"))
+# consecutive failures that open a provider's circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+    "TooManyRequestsError", "ServiceUnavailableError", "GatewayTimeoutError",
+    "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+}
+# the provider is telling us to slow down, not that it is broken
+THROTTLE_STATUS = {429}
+THROTTLE_ERROR_NAMES = {"ResourceExhausted", "TooManyRequestsError"}
+
+
+class CircuitOpenError(ProviderBusyError):
+    """Provider failed repeatedly; calls are short-circuited until the reset window passes."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        # set while the single half-open probe is in flight
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self, provider: str) -> bool:
+        """Raise CircuitOpenError while open; True when this call is the half-open probe."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self.probing:
+                raise CircuitOpenError(f"{provider} is temporarily unavailable; try again shortly",
+                                       max(remaining, 1.0))
+            # half-open: this call is the one probe; everyone else waits for its outcome
+            self.probing = True
+            return True
+
+    def end_probe(self):
+        """The probe ended without saying anything about the provider's health; let the next call probe."""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                # a failed probe restarts the reset window
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.probing else "open"
+
+
+def provider_mode(provider: str) -> str:
+    return os.getenv(f"{provider.upper()}_PROVIDER", "fake" if os.getenv("USE_FAKE_PROVIDERS") == "1" else "live")
+
+
+def use_fake_providers():
+    """Switch every provider to its offline fake and drop any cached live clients."""
+    os.environ["USE_FAKE_PROVIDERS"] = "1"
+    for provider in ("GEMINI", "COHERE", "SPEECH"):
+        os.environ[f"{provider}_PROVIDER"] = "fake"
+    reset_clients()
+
+
+_clients = {}
+_breakers = {p: CircuitBreaker() for p in ("gemini", "cohere", "speech")}
+_lock = threading.Lock()
+
+
+def reset_clients():
+    with _lock:
+        _clients.clear()
+
+
+def _get_or_create(key, factory):
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def get_gemini_model(model_name: str):
+    def factory():
+        if provider_mode("gemini") == "fake":
+            return fake_providers.FakeGeminiModel(model_name)
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        return genai.GenerativeModel(model_name=model_name)
+    return _get_or_create(("gemini", model_name, provider_mode("gemini")), factory)
+
+
+def get_cohere_client():
+    def factory():
+        if provider_mode("cohere") == "fake":
+            return fake_providers.FakeCohereClient()
+        import cohere
+        return cohere.Client(os.getenv("COHERE_API_KEY"), timeout=PROVIDER_TIMEOUT_SECONDS)
+    return _get_or_create(("cohere", provider_mode("cohere")), factory)
+
+
+def get_speech_client():
+    def factory():
+        if provider_mode("speech") == "fake":
+            return fake_providers.FakeSpeechRecognizer()
+        from google.cloud import speech
+        return speech.SpeechClient()
+    return _get_or_create(("speech", provider_mode("speech")), factory)
+
+
+def _is_retryable(err: Exception) -> bool:
+    if isinstance(err, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(err, "status_code", None) or getattr(err, "code", None)
+    if isinstance(status, int) and status in RETRYABLE_STATUS:
+        return True
+    return type(err).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def _is_throttle(err: Exception) -> bool:
+    status = getattr(err, "status_code", None) or getattr(err, "code", None)
+    return (isinstance(status, int) and status in THROTTLE_STATUS) or type(err).__name__ in THROTTLE_ERROR_NAMES
+
+
+def call_provider(provider: str, fn, /, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) against `provider` with circuit breaking and up
+    to PROVIDER_MAX_RETRIES retries on transient errors, sleeping with
+    full-jitter exponential backoff between attempts.
+    """
+    return call_model(provider, None, 0, fn, *args, **kwargs)
+
+
+def call_model(provider: str, model, tokens: int, fn, /, *args, **kwargs):
+    """
+    call_provider() for a specific model: each attempt first waits for a
+    scheduler permit covering one request and `tokens` prompt tokens. Quota
+    errors shrink the lane's concurrency; if they outlast the retries the
+    caller gets ProviderBusyError (503) rather than the raw provider error.
+    """
+    result, _ = _call(provider, model, tokens, fn, args, kwargs, hold=False)
+    return result
+
+
+def _call(provider: str, model, tokens: int, fn, args, kwargs, hold: bool, retries: int = None):
+    """call_model()'s loop; with `hold` the permit is returned unreleased for the caller to release()."""
+    breaker = _breakers[provider]
+    retries = PROVIDER_MAX_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        probe = breaker.before_call(provider)
+        try:
+            permit = provider_scheduler.acquire(provider, model, tokens)
+        except ProviderBusyError:
+            if probe:
+                breaker.end_probe()
+            raise
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            throttled = _is_throttle(e)
+            permit.release(throttled=throttled, succeeded=False)
+            retryable = _is_retryable(e)
+            if retryable and not throttled:
+                breaker.record_failure()
+            elif probe:
+                # a quota or request error says nothing about the provider's health
+                breaker.end_probe()
+            if not retryable or attempt >= retries:
+                if throttled:
+                    raise ProviderBusyError(f"{provider} quota exceeded; try again shortly") from e
+                raise
+            ceiling = min(PROVIDER_BACKOFF_MAX_SECONDS, PROVIDER_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            time.sleep(random.uniform(0, ceiling))
+            attempt += 1
+            continue
+        if not hold:
+            permit.release()
+        breaker.record_success()
+        return result, permit
+
+
+def _usage(response, input_field: str, output_field: str, usage_path: tuple):
+    """Token counts the provider reported, or (None, None) when it didn't."""
+    usage = response
+    for attr in usage_path:
+        usage = getattr(usage, attr, None)
+    return getattr(usage, input_field, None), getattr(usage, output_field, None)
+
+
+def _count_tokens(attrs: dict, prompt_tokens: int, text: str, reported=(None, None)):
+    """Prefer the provider's own counts; fall back to our estimate."""
+    attrs["input_tokens"] = int(reported[0] or prompt_tokens)
+    attrs["output_tokens"] = int(reported[1] or estimate_tokens(text))
+
+
+def gemini_generate(model_name: str, prompt: str, purpose: str = "generate") -> str:
+    """Generate with a Gemini model and return the response text."""
+    with span("llm", f"gemini:{purpose}", model=model_name) as attrs:
+        prompt_tokens = log_prompt(purpose, model_name, prompt)
+        model = get_gemini_model(model_name)
+        response = call_model(
+            "gemini", model_name, prompt_tokens, model.generate_content, prompt,
+            request_options={"timeout": PROVIDER_TIMEOUT_SECONDS},
+        )
+        _count_tokens(attrs, prompt_tokens, response.text,
+                      _usage(response, "prompt_token_count", "candidates_token_count", ("usage_metadata",)))
+        return response.text
+
+
+def cohere_chat(model: str, message: str, temperature: float, purpose: str = "chat") -> str:
+    """Single-turn Cohere chat; returns the reply text."""
+    with span("llm", f"cohere:{purpose}", model=model) as attrs:
+        prompt_tokens = log_prompt(purpose, model, message)
+        client = get_cohere_client()
+        response = call_model("cohere", model, prompt_tokens, client.chat,
+                              model=model, message=message, temperature=temperature)
+        _count_tokens(attrs, prompt_tokens, response.text,
+                      _usage(response, "input_tokens", "output_tokens", ("meta", "billed_units")))
+        return response.text
+
+
+class _HeldStream:
+    """
+    Raw chunks of a streaming call; its scheduler permit is held until they
+    run out or close() is called, and a failure mid-stream counts against
+    the provider's circuit breaker like a failed call.
+    """
+
+    def __init__(self, provider: str, permit, head: list, rest):
+        self.provider = provider
+        self.permit = permit
+        self.chunks = itertools.chain(head, rest)
+        self.rest = rest
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception as e:
+            throttled = _is_throttle(e)
+            self.permit.release(throttled=throttled, succeeded=False)
+            if _is_retryable(e) and not throttled:
+                _breakers[self.provider].record_failure()
+            raise
+
+    def close(self):
+        self.permit.release()
+        if hasattr(self.rest, "close"):
+            self.rest.close()
+
+    def __del__(self):
+        self.permit.release()
+
+
+def _open_stream(provider: str, model: str, tokens: int, open_stream, retries: int = None) -> _HeldStream:
+    """
+    Start a streaming call under call_model(). Retries cover connecting
+    and the first chunk only; once output has reached the caller a failure
+    is raised as-is. The permit covers the whole stream, so a lane's
+    concurrency counts streams still generating, not just ones connecting.
+    """
+    def first():
+        chunks = iter(open_stream())
+        head = next(chunks, None)
+        return [] if head is None else [head], chunks
+    (head, rest), permit = _call(provider, model, tokens, first, (), {}, hold=True, retries=retries)
+    return _HeldStream(provider, permit, head, rest)
+
+
+def call_provider_stream(provider: str, open_stream, replayable: bool = True) -> _HeldStream:
+    """
+    call_provider() for a streaming call: `open_stream()` starts it, and the
+    returned chunks hold a scheduler permit until they run out or close()
+    is called. A stream whose input cannot be sent twice (live audio) is
+    opened with `replayable=False` and is never retried.
+    """
+    return _open_stream(provider, None, 0, open_stream, retries=None if replayable else 0)
+
+
+def gemini_generate_stream(model_name: str, prompt: str, purpose: str = "generate"):
+    """Like gemini_generate() but yields the response text piece by piece."""
+    with span("llm", f"gemini:{purpose}:stream", model=model_name) as attrs:
+        prompt_tokens = log_prompt(purpose, model_name, prompt)
+        model = get_gemini_model(model_name)
+        pieces = []
+        with closing(_open_stream("gemini", model_name, prompt_tokens, lambda: model.generate_content(
+            prompt, stream=True, request_options={"timeout": PROVIDER_TIMEOUT_SECONDS},
+        ))) as chunks:
+            for chunk in chunks:
+                if chunk.text:
+                    pieces.append(chunk.text)
+                    yield chunk.text
+        _count_tokens(attrs, prompt_tokens, "".join(pieces))
+
+
+def cohere_chat_stream(model: str, message: str, temperature: float, purpose: str = "chat"):
+    """Like cohere_chat() but yields the reply text piece by piece."""
+    with span("llm", f"cohere:{purpose}:stream", model=model) as attrs:
+        prompt_tokens = log_prompt(purpose, model, message)
+        client = get_cohere_client()
+        pieces = []
+        with closing(_open_stream("cohere", model, prompt_tokens, lambda: client.chat_stream(
+            model=model, message=message, temperature=temperature,
+        ))) as events:
+            for event in events:
+                if getattr(event, "event_type", None) == "text-generation" and event.text:
+                    pieces.append(event.text)
+                    yield event.text
+        _count_tokens(attrs, prompt_tokens, "".join(pieces))
+
+
+def provider_status() -> dict:
+    status = {
+        name: {"mode": provider_mode(name), "circuit": breaker.state, "consecutive_failures": breaker.failures}
+        for name, breaker in _breakers.items()
+    }
+    status["scheduler"] = provider_scheduler.scheduler_stats()
+    return status
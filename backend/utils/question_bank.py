@@ -0,0 +1,428 @@
+"""
+Local bank of interview questions, so /generate-questions can be answered
+mostly by retrieval instead of a fresh LLM call.
+
+Questions live in the question_bank collection tagged with the skills they
+probe (plus role/company when known). Each process keeps an in-memory
+matrix of hashed bag-of-words embeddings and ranks candidates for all
+target skills in one NumPy matrix product. Only skills with no good match
+go to the LLM, and what it returns is added to the bank.
+
+    python -m backend.utils.question_bank seed [path]   # load curated questions
+    python -m backend.utils.question_bank stats
+"""
+import os
+import re
+import sys
+import json
+import zlib
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from backend.utils.db import get_collection
+from backend.utils.match_engine import normalize_skill, score_match
+from backend.utils.cohere_utils import (
+    generate_questions, generate_gap_questions, stream_questions, stream_gap_questions,
+)
+from backend.utils.llm_json import render_numbered_list
+from backend.utils.tracing import log_error
+
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "1") != "0"
+EMBED_DIM = 512
+# questions per generated set, and how many of them are behavioral
+QUESTION_COUNT = int(os.getenv("QUESTION_COUNT", "8"))
+BEHAVIORAL_COUNT = 2
+# most skills we try to cover in one set; missing required skills come first
+MAX_TARGET_SKILLS = 6
+# a candidate must carry the skill tag, or be at least this similar to the query
+MIN_SIMILARITY = float(os.getenv("QUESTION_MIN_SIMILARITY", "0.55"))
+TAG_BONUS = 0.5
+COMPANY_BONUS = 0.1
+# how often a process picks up questions other workers added or re-tagged
+BANK_REFRESH_SECONDS = 60
+# smallest embedding buffer; it doubles whenever it fills up
+MIN_MATRIX_ROWS = 256
+BEHAVIORAL_TAG = "behavioral"
+SEED_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "question_bank_seed.jsonl")
+
+bank_col = get_collection("question_bank")
+
+_WORD_RE = re.compile(r"[a-z0-9#+.]+")
+_BEHAVIORAL_RE = re.compile(r"^(tell me about a time|describe a (time|situation)|give an example of|how do you handle)", re.I)
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from have how i in is it me of on or our the this to "
+    "we what when where which who why will with would you your".split()
+)
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def question_id(text: str) -> str:
+    return hashlib.sha1(normalize_question(text).encode("utf-8")).hexdigest()
+
+
+def _features(text: str, tags=()):
+    words = [w.strip(".") for w in _WORD_RE.findall(str(text).lower())]
+    features = [w for w in words if w and w not in _STOPWORDS]
+    # tags count double: they are what the question is about
+    return features + [f"tag:{t}" for t in tags] * 2
+
+
+def embed(texts, tags=None) -> np.ndarray:
+    """
+    Hashed bag-of-words embeddings, L2-normalized, one row per text.
+    Feature hashing keeps this dependency-free, deterministic across
+    processes and fast enough to run per request.
+    """
+    tags = tags or [()] * len(texts)
+    matrix = np.zeros((len(texts), EMBED_DIM), dtype=np.float32)
+    for row, (text, row_tags) in enumerate(zip(texts, tags)):
+        for feature in _features(text, row_tags):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # the top bit picks a sign so collisions tend to cancel out
+            matrix[row, h % EMBED_DIM] += 1.0 if h & 0x80000000 else -1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class QuestionBank:
+    """
+    In-memory index over question_bank; safe to share between threads.
+    Embeddings live in the first len(self) rows of a buffer that doubles
+    when full, so adding a few questions does not copy the whole bank.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = []
+        self._ids = {}
+        self._by_tag = {}
+        self._matrix = np.zeros((MIN_MATRIX_ROWS, EMBED_DIM), dtype=np.float32)
+        self._loaded_at = None
+        self._refreshed = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _append(self, docs):
+        """Index new questions and merge new skill tags into known ones, re-embedding those rows in place."""
+        new, retagged = [], {}
+        for doc in docs:
+            index = self._ids.get(doc["_id"])
+            if index is None:
+                new.append(doc)
+                continue
+            current = self._docs[index]
+            skills = sorted(set(current.get("skills", [])) | set(doc.get("skills", [])))
+            if skills != current.get("skills", []):
+                retagged[index] = {**current, "skills": skills}
+
+        for index, doc in retagged.items():
+            for tag in set(doc["skills"]) - set(self._docs[index].get("skills", [])):
+                self._by_tag.setdefault(tag, []).append(index)
+            self._docs[index] = doc
+        if retagged:
+            rows = list(retagged)
+            self._matrix[rows] = embed([retagged[i]["text"] for i in rows], [retagged[i]["skills"] for i in rows])
+
+        new = list({doc["_id"]: doc for doc in new}.values())
+        if not new:
+            return
+        start, end = len(self._docs), len(self._docs) + len(new)
+        if end > len(self._matrix):
+            grown = np.zeros((max(end, 2 * len(self._matrix)), EMBED_DIM), dtype=np.float32)
+            grown[:start] = self._matrix[:start]
+            self._matrix = grown
+        self._matrix[start:end] = embed([d["text"] for d in new], [d.get("skills", []) for d in new])
+        for index, doc in enumerate(new, start):
+            self._ids[doc["_id"]] = index
+            self._docs.append(doc)
+            for tag in doc.get("skills", []):
+                self._by_tag.setdefault(tag, []).append(index)
+
+    def refresh(self, force: bool = False):
+        """Load questions added or re-tagged since the last refresh (all of them the first time)."""
+        if not force and time.monotonic() - self._refreshed < BANK_REFRESH_SECONDS:
+            return
+        query = {"updated_at": {"$gte": self._loaded_at}} if self._loaded_at else {}
+        try:
+            docs = list(bank_col.find(query, {"text": 1, "skills": 1, "role": 1, "company": 1, "created_at": 1,
+                                              "updated_at": 1}))
+        except PyMongoError as e:
+            log_error("question_bank_refresh_failed", e)
+            return
+        with self._lock:
+            self._append(docs)
+            # banks written before updated_at existed only have created_at
+            stamps = [d.get("updated_at") or d["created_at"] for d in docs if d.get("updated_at") or d.get("created_at")]
+            if stamps:
+                self._loaded_at = max(stamps + ([self._loaded_at] if self._loaded_at else []))
+            self._refreshed = time.monotonic()
+
+    def add(self, questions, role=None, company=None, source="llm") -> int:
+        """Upsert [{"text", "skills"}] into the bank and the local index; returns how many were new."""
+        now = datetime.now(timezone.utc)
+        docs = {
+            question_id(q["text"]): {
+                "_id": question_id(q["text"]),
+                "text": q["text"].strip(),
+                "skills": sorted({normalize_skill(s) for s in q.get("skills", []) if s}),
+                "role": role,
+                "company": company,
+                "source": source,
+                "created_at": now,
+            }
+            for q in questions if q.get("text", "").strip()
+        }
+        docs = list(docs.values())
+        if not docs:
+            return 0
+        try:
+            result = bank_col.bulk_write([
+                UpdateOne(
+                    {"_id": d["_id"]},
+                    {"$setOnInsert": {k: v for k, v in d.items() if k != "skills"},
+                     "$addToSet": {"skills": {"$each": d["skills"]}},
+                     "$set": {"updated_at": now}},
+                    upsert=True,
+                )
+                for d in docs
+            ], ordered=False)
+            added = result.upserted_count
+        except PyMongoError as e:
+            log_error("question_bank_write_failed", e, questions=len(docs))
+            added = 0
+        with self._lock:
+            self._append(docs)
+        return added
+
+    def rank(self, skills, role=None, company=None) -> np.ndarray:
+        """
+        Score every bank question against every skill in one pass: cosine
+        similarity to "<skill> <role>", plus bonuses for carrying the skill
+        tag and for coming from the same company. Untagged questions below
+        MIN_SIMILARITY get -inf. Returns a (len(skills), len(bank)) matrix.
+        """
+        with self._lock:
+            docs = list(self._docs)
+            # a view, not a copy: rows appended later are outside it; a row re-tagged meanwhile
+            # only shifts that one question's score
+            matrix = self._matrix[:len(docs)]
+            tag_rows = [list(self._by_tag.get(skill, [])) for skill in skills]
+        queries = embed([f"{skill} {role or ''}" for skill in skills], [(skill,) for skill in skills])
+        scores = queries @ matrix.T
+
+        tagged = np.zeros_like(scores, dtype=bool)
+        for row, indices in enumerate(tag_rows):
+            tagged[row, indices] = True
+        scores = np.where(tagged | (scores >= MIN_SIMILARITY), scores + TAG_BONUS * tagged, -np.inf)
+        if company:
+            same_company = np.fromiter(
+                ((d.get("company") or "").lower() == company.lower() for d in docs), dtype=bool, count=len(docs)
+            )
+            scores = scores + COMPANY_BONUS * same_company
+        return scores
+
+    def text(self, index: int) -> str:
+        return self._docs[index]["text"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"questions": len(self._docs), "skills": len(self._by_tag)}
+
+
+_bank = QuestionBank()
+_seed_lock = threading.Lock()
+
+
+def get_bank() -> QuestionBank:
+    if not len(_bank):
+        with _seed_lock:
+            if not len(_bank):
+                _ensure_seeded()
+                _bank.refresh(force=True)
+    _bank.refresh()
+    return _bank
+
+
+def _ensure_seeded():
+    try:
+        empty = bank_col.find_one({}, {"_id": 1}) is None
+    except PyMongoError:
+        return
+    if empty and os.path.exists(SEED_PATH):
+        seed(SEED_PATH)
+
+
+def seed(path: str = SEED_PATH) -> int:
+    """Load curated questions from a JSON-lines file of {"text", "skills", "role"?}."""
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    added = 0
+    for role in {r.get("role") for r in rows}:
+        added += _bank.add([r for r in rows if r.get("role") == role], role=role, source="curated")
+    return added
+
+
+def target_skills(resume_analysis: dict, jd_analysis: dict) -> list:
+    """JD skills to probe, most important first: missing required, matched required, then preferred."""
+    breakdown = score_match(resume_analysis, jd_analysis)["breakdown"]
+    ranked = sorted(breakdown, key=lambda b: (b["category"] != "required_skills", b["matched"]))
+    skills = []
+    for row in ranked:
+        key = row["matched_by"] or normalize_skill(row["skill"])
+        if key and key not in skills:
+            skills.append(key)
+    return skills[:MAX_TARGET_SKILLS]
+
+
+def tag_question(text: str, skills) -> list:
+    """Skills (from `skills`) a generated question mentions, plus "behavioral" when it is one."""
+    lowered = f" {normalize_question(text)} "
+    tags = [s for s in skills if re.search(rf"(?<![a-z0-9]){re.escape(s)}(?![a-z0-9])", lowered)]
+    if _BEHAVIORAL_RE.match(text.strip()):
+        tags.append(BEHAVIORAL_TAG)
+    return tags
+
+
+def retrieve(skills, role=None, company=None, count=QUESTION_COUNT):
+    """
+    Pick up to `count` bank questions: the best one per skill first, then
+    behavioral ones, then second-best per skill. Returns (questions, gaps)
+    where gaps are the skills nothing in the bank covers.
+    """
+    bank = get_bank()
+    if not len(bank):
+        return [], list(skills)
+
+    targets = list(skills) + [BEHAVIORAL_TAG]
+    scores = bank.rank(targets, role, company)
+    order = np.argsort(-scores, axis=1)
+    picked, gaps = [], []
+
+    def take(row, limit):
+        taken = 0
+        for index in order[row]:
+            if not np.isfinite(scores[row, index]) or taken >= limit:
+                break
+            if index not in picked:
+                picked.append(int(index))
+                taken += 1
+        return taken
+
+    skill_budget = max(count - BEHAVIORAL_COUNT, 1)
+    for row, skill in enumerate(skills):
+        if len(picked) >= skill_budget:
+            break
+        if not take(row, 1):
+            gaps.append(skill)
+    take(len(targets) - 1, BEHAVIORAL_COUNT)
+    # leave room for one generated question per gap
+    fill_to = count - len(gaps)
+    for row in range(len(skills)):
+        if len(picked) >= fill_to:
+            break
+        take(row, 1)
+    return [bank.text(i) for i in picked[:count]], gaps
+
+
+def build_question_set(resume_analysis: dict, jd_analysis: dict, role, company, count=QUESTION_COUNT) -> dict:
+    """
+    The /generate-questions payload: {"raw", "questions", "sources"}.
+    Bank questions come first; the LLM is asked only for the gap skills
+    (or to top up a short set) and its questions are added to the bank.
+    """
+    if not QUESTION_BANK_ENABLED:
+        return generate_questions(resume_analysis, jd_analysis, role, company)
+
+    def gap_source(gaps, needed):
+        return generate_gap_questions(resume_analysis, jd_analysis, role, company, gaps, needed)["questions"]
+
+    for event in _question_events(resume_analysis, jd_analysis, role, company, count, gap_source):
+        pass
+    return event["questions"]
+
+
+def stream_question_set(resume_analysis: dict, jd_analysis: dict, role, company, count=QUESTION_COUNT):
+    """
+    build_question_set() as events: {"type": "question", ...} for each
+    question as soon as it is available (bank hits immediately, generated
+    ones as the LLM finishes each), then {"type": "done", "questions": payload}.
+    """
+    if not QUESTION_BANK_ENABLED:
+        selected = []
+        for text in stream_questions(resume_analysis, jd_analysis, role, company):
+            selected.append(text)
+            yield {"type": "question", "index": len(selected), "text": text, "source": "llm"}
+        yield {"type": "done", "questions": _payload(selected, bank=0, gaps=[])}
+        return
+
+    def gap_source(gaps, needed):
+        return stream_gap_questions(resume_analysis, jd_analysis, role, company, gaps, needed)
+
+    yield from _question_events(resume_analysis, jd_analysis, role, company, count, gap_source)
+
+
+def _question_events(resume_analysis, jd_analysis, role, company, count, gap_source):
+    skills = target_skills(resume_analysis, jd_analysis)
+    questions, gaps = retrieve(skills, role, company, count)
+    for i, text in enumerate(questions, 1):
+        yield {"type": "question", "index": i, "text": text, "source": "bank"}
+
+    selected = list(questions)
+    if len(selected) < count:
+        seen = {normalize_question(q) for q in selected}
+        produced = []
+        try:
+            for text in gap_source(gaps, count - len(questions)):
+                produced.append(text)
+                if len(selected) < count and normalize_question(text) not in seen:
+                    seen.add(normalize_question(text))
+                    selected.append(text)
+                    yield {"type": "question", "index": len(selected), "text": text, "source": "llm"}
+        except Exception as e:
+            # a partial set beats an error page
+            if not selected:
+                raise
+            log_error("gap_questions_failed", e, serving=len(selected))
+        _bank.add([{"text": q, "skills": tag_question(q, skills)} for q in produced], role, company)
+
+    yield {"type": "done", "questions": _payload(selected, bank=len(questions), gaps=gaps)}
+
+
+def _payload(selected, bank, gaps) -> dict:
+    return {
+        "raw": render_numbered_list(selected),
+        "questions": selected,
+        "sources": {"bank": bank, "llm": len(selected) - bank, "gap_skills": gaps},
+    }
+
+
+def question_bank_stats() -> dict:
+    return _bank.stats()
+
+
+def main(argv=None) -> int:
+    argv = argv if argv is not None else sys.argv[1:]
+    command = argv[0] if argv else "stats"
+    if command == "seed":
+        added = seed(argv[1] if len(argv) > 1 else SEED_PATH)
+        print(f"✅ question_bank: {added} new questions")
+        return 0
+    if command == "stats":
+        print(json.dumps(get_bank().stats()))
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
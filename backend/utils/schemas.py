@@ -0,0 +1,171 @@
+"""
+Pydantic models for the structured output we ask the LLMs for. They are
+deliberately lenient: a comma-separated string where a list was asked for,
+"78%" for a score, or an extra key are accepted and normalized rather than
+treated as a failed call.
+"""
+import re
+from typing import Annotated, Optional
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, field_validator, model_validator
+
+
+def _as_str_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        parts = re.split(r"\n|;|,(?![^(]*\))", value)
+        return [p.strip(" -•*\t") for p in parts if p.strip(" -•*\t")]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        items = []
+        for item in value:
+            if isinstance(item, dict):
+                # {"name": "Python"} / {"skill": "Python", "level": ...}
+                item = item.get("name") or item.get("skill") or next(iter(item.values()), "")
+            if item is not None and str(item).strip():
+                items.append(str(item).strip())
+        return items
+    return [str(value)]
+
+
+def _as_optional_str(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return ", ".join(f"{k}: {v}" for k, v in value.items())
+    return str(value)
+
+
+StrList = Annotated[list[str], BeforeValidator(_as_str_list)]
+OptionalStr = Annotated[Optional[str], BeforeValidator(_as_optional_str)]
+
+
+class LLMModel(BaseModel):
+    # keep whatever extra keys the model volunteered; downstream code uses .get()
+    model_config = ConfigDict(extra="allow")
+
+
+class WorkExperience(LLMModel):
+    company: OptionalStr = None
+    role: OptionalStr = None
+    duration: OptionalStr = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _aliases(cls, data):
+        if isinstance(data, dict) and "role" not in data:
+            for alias in ("title", "position", "job_title"):
+                if alias in data:
+                    data = {**data, "role": data[alias]}
+                    break
+        return data
+
+
+class ResumeAnalysis(LLMModel):
+    summary: OptionalStr = ""
+    technical_skills: StrList = []
+    soft_skills: StrList = []
+    tools: StrList = []
+    work_experience: list[WorkExperience] = []
+    gaps: StrList = []
+
+    @field_validator("work_experience", mode="before")
+    @classmethod
+    def _experience_list(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [value]
+        if isinstance(value, list):
+            return [v if isinstance(v, dict) else {"role": str(v)} for v in value]
+        return [{"role": str(value)}]
+
+
+class ResumeSectionAnalyses(LLMModel):
+    """{"sections": {section id: ResumeAnalysis}}, one entry per section sent."""
+    sections: dict[str, ResumeAnalysis] = {}
+
+    @model_validator(mode="before")
+    @classmethod
+    def _bare_sections(cls, data):
+        if isinstance(data, dict) and "sections" not in data:
+            return {"sections": {k: v for k, v in data.items() if isinstance(v, dict)}}
+        if isinstance(data, dict) and isinstance(data["sections"], list):
+            return {**data, "sections": {str(v.get("id")): v for v in data["sections"] if isinstance(v, dict)}}
+        return data
+
+
+class JDAnalysis(LLMModel):
+    company: OptionalStr = None
+    role_title: OptionalStr = None
+    responsibilities: StrList = []
+    required_skills: StrList = []
+    preferred_skills: StrList = []
+    location: OptionalStr = None
+    compensation: OptionalStr = None
+
+
+class AnswerFeedback(LLMModel):
+    strengths: StrList = []
+    improvements: StrList = []
+    score: int = Field(ge=0, le=100)
+
+    @field_validator("score", mode="before")
+    @classmethod
+    def _percent(cls, value):
+        if isinstance(value, str):
+            match = re.search(r"\d+(\.\d+)?", value)
+            if not match:
+                raise ValueError("score has no number")
+            number = float(match.group()) if match.group(1) else int(match.group())
+            # "7/10" or "0.78" style answers
+            if "/10" in value.replace(" ", "") and "/100" not in value.replace(" ", ""):
+                number *= 10
+            value = number
+        if isinstance(value, float) and 0 < value <= 1:
+            value *= 100
+        if isinstance(value, (int, float)):
+            return int(round(min(max(value, 0), 100)))
+        return value
+
+
+class SegmentNote(LLMModel):
+    note: str
+
+    @model_validator(mode="before")
+    @classmethod
+    def _bare_note(cls, data):
+        if isinstance(data, str):
+            return {"note": data}
+        if isinstance(data, dict) and "note" not in data and len(data) == 1:
+            return {"note": str(next(iter(data.values())))}
+        return data
+
+
+class InterviewQuestions(LLMModel):
+    questions: StrList
+
+    @model_validator(mode="before")
+    @classmethod
+    def _bare_list(cls, data):
+        if isinstance(data, list):
+            return {"questions": data}
+        if isinstance(data, dict) and "questions" not in data:
+            for key in ("interview_questions", "items", "data"):
+                if key in data:
+                    return {**data, "questions": data[key]}
+        return data
+
+    @field_validator("questions", mode="before")
+    @classmethod
+    def _question_text(cls, value):
+        if isinstance(value, list):
+            return [
+                (v.get("question") or v.get("text") or "") if isinstance(v, dict) else v
+                for v in value
+            ]
+        return value
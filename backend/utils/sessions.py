@@ -0,0 +1,198 @@
+"""
+Per-session read model. Everything the routes need about one interview
+session lives in a single `sessions` document keyed by session_id:
+
+    {_id: session_id, user_id, created_at, updated_at,
+     resume: {filename, text_hash, file_hash, uploaded_at}, resume_analysis, resume_analyzed_at,
+     jd: {filename, text_hash, file_hash, source, uploaded_at}, jd_analysis, jd_analyzed_at,
+     questions: {role, company, items, generated_at},
+     match: {score, breakdown, company, role_title, explanation, scored_at},
+     answers: {<question key>: {question_id, transcript, feedback, answered_at}}}
+
+Each step $sets only the fields it owns (through write_behind.upsert_later),
+so steps of one session never overwrite each other, and re-running a step
+replaces its field instead of leaving a stale duplicate to be read. Routes
+read with one _id lookup. match_scores and answers stay append-only logs
+for /history. Sessions created before this model are backfilled with
+`python -m backend.utils.db_indexes backfill-sessions`. Uploaded text and
+files are stored once by hash in document_store; read text with
+document_store.session_text(session["resume"]).
+"""
+import heapq
+from datetime import datetime, timezone
+from itertools import groupby
+
+from pymongo import UpdateOne, DESCENDING
+
+from backend.utils.db import get_collection
+from backend.utils.document_store import put_text
+from backend.utils.write_behind import upsert_later, find_one, await_pending
+
+sessions_col = get_collection("sessions")
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def answer_key(question_id) -> str:
+    """Field name for a question id; MongoDB field names cannot contain "." or start with "$"."""
+    return str(question_id).replace(".", "_").lstrip("$") or "_"
+
+
+def update_session(session_id: str, fields: dict, user_id: str = None):
+    """$set `fields` on the session, creating it if needed; written behind the response."""
+    fields = {**fields, "updated_at": _now()}
+    if user_id:
+        fields["user_id"] = user_id
+    upsert_later("sessions", session_id, fields, on_insert={"created_at": fields["updated_at"]},
+                 session_id=session_id)
+
+
+def get_session(session_id: str, *fields):
+    """The session document (only `fields`, if given), or None."""
+    projection = {field: 1 for field in fields} or None
+    return find_one("sessions", {"_id": session_id}, projection, session_id=session_id)
+
+
+def get_sessions(session_ids, *fields) -> dict:
+    """{session_id: document} for every existing session in `session_ids`, in one query."""
+    session_ids = list(dict.fromkeys(session_ids))
+    await_pending("sessions", session_ids)
+    projection = {field: 1 for field in fields} or None
+    return {doc["_id"]: doc for doc in sessions_col.find({"_id": {"$in": session_ids}}, projection)}
+
+
+def record_resume(session_id: str, filename: str, text: str, file_hash: str = None):
+    update_session(session_id, {"resume": {"filename": filename, "text_hash": put_text(text, "resume"),
+                                           "file_hash": file_hash, "uploaded_at": _now()}})
+
+
+def record_jd(session_id: str, text: str, source: str, filename: str = None, file_hash: str = None):
+    update_session(session_id, {"jd": {"filename": filename, "text_hash": put_text(text, "jd"),
+                                       "file_hash": file_hash, "source": source,
+                                       "uploaded_at": _now()}})
+
+
+def record_resume_analysis(session_id: str, analysis, user_id: str = None):
+    update_session(session_id, {"resume_analysis": analysis, "resume_analyzed_at": _now()}, user_id)
+
+
+def record_jd_analysis(session_id: str, analysis, user_id: str = None):
+    update_session(session_id, {"jd_analysis": analysis, "jd_analyzed_at": _now()}, user_id)
+
+
+def record_questions(session_id: str, role, company, questions):
+    update_session(session_id, {"questions": {"role": role, "company": company, "items": questions,
+                                              "generated_at": _now()}})
+
+
+def record_match(session_id: str, match: dict, user_id: str = None):
+    update_session(session_id, {"match": {**match, "scored_at": _now()}}, user_id)
+
+
+def record_answer(session_id: str, question_id, transcript: str, feedback):
+    update_session(session_id, {f"answers.{answer_key(question_id)}": {
+        "question_id": question_id, "transcript": transcript, "feedback": feedback, "answered_at": _now(),
+    }})
+
+
+# session field -> {legacy collection: fields to copy from a document}; a field fed by
+# several collections takes the newest document for the session across all of them
+BACKFILL_SOURCES = [
+    ("resume", {"resumes": lambda d: {"filename": d.get("filename"), "text": d.get("resume_text"),
+                                      "uploaded_at": _created(d)}}),
+    ("jd", {"job_descriptions": lambda d: {"filename": None, "text": d.get("jd_text"), "source": "upload",
+                                           "uploaded_at": _created(d)},
+            "jds": lambda d: {"filename": None, "text": d.get("jd_text"), "source": "dashboard",
+                              "uploaded_at": _created(d)}}),
+    ("resume_analysis", {"resume_outputs": lambda d: d.get("analysis")}),
+    ("jd_analysis", {"jd_outputs": lambda d: d.get("analysis")}),
+    ("match", {"match_scores": lambda d: {"score": d.get("match_score"), "company": d.get("company"),
+                                          "role_title": d.get("role_title"),
+                                          "scored_at": d.get("created_at") or _created(d)}}),
+]
+
+
+def _created(doc):
+    return doc["_id"].generation_time if hasattr(doc["_id"], "generation_time") else None
+
+
+def _newest_per_session(collection: str, group_by=("session_id",)):
+    """Newest document per session (per session and question for answers), oldest sessions first."""
+    key = {name: f"${name}" for name in group_by}
+    pipeline = [
+        {"$match": {"session_id": {"$type": "string"}}},
+        {"$sort": {"_id": DESCENDING}},
+        {"$group": {"_id": key, "doc": {"$first": "$$ROOT"}}},
+        {"$sort": {"_id.session_id": 1}},
+    ]
+    return (row["doc"] for row in get_collection(collection).aggregate(pipeline, allowDiskUse=True))
+
+
+def _newest_across(sources: dict):
+    """(doc, value_of(doc)) for the newest document per session across {collection: value_of}, oldest first."""
+    def read(collection, value_of):
+        return ((doc, value_of) for doc in _newest_per_session(collection))
+
+    merged = heapq.merge(*(read(c, v) for c, v in sources.items()), key=lambda pair: pair[0]["session_id"])
+    for _, group in groupby(merged, key=lambda pair: pair[0]["session_id"]):
+        doc, value_of = max(group, key=lambda pair: pair[0]["_id"])
+        yield doc, value_of(doc)
+
+
+def _chunks(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _fill_missing(pairs: list, field_of, dry_run: bool) -> int:
+    """Upsert `field_of(doc)` = value on each (doc, value)'s session unless the session already has it."""
+    docs = [doc for doc, _ in pairs]
+    ids = list({d["session_id"] for d in docs})
+    present = {}
+    for session in sessions_col.find({"_id": {"$in": ids}}, {field.split(".")[0]: 1 for field in {field_of(d) for d in docs}}):
+        present[session["_id"]] = session
+    updates = []
+    for doc, value in pairs:
+        field = field_of(doc)
+        session = present.get(doc["session_id"], {})
+        head, _, rest = field.partition(".")
+        if head in session and (not rest or rest in (session[head] or {})):
+            continue  # newer data written by the running app wins
+        if value is None:
+            continue
+        fields = {field: value, "updated_at": _now()}
+        if doc.get("user_id"):
+            fields["user_id"] = doc["user_id"]
+        updates.append(UpdateOne({"_id": doc["session_id"]},
+                                 {"$set": fields, "$setOnInsert": {"created_at": _created(doc) or _now()}},
+                                 upsert=True))
+    if updates and not dry_run:
+        sessions_col.bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+def backfill_sessions(batch_size: int = 500, dry_run: bool = False) -> dict:
+    """
+    Build session documents from the per-step collections, taking the newest
+    document per session across every collection that feeds a field. Fields the session already has are left alone, so
+    the backfill can run (and re-run) while the app is serving traffic.
+    Returns {source collection(s): fields set}.
+    """
+    report = {}
+    for field, sources in BACKFILL_SOURCES:
+        report[" + ".join(sources)] = sum(_fill_missing(chunk, lambda d, field=field: field, dry_run)
+                                          for chunk in _chunks(_newest_across(sources), batch_size))
+    answers = ((d, {"question_id": d.get("question_id"), "transcript": d.get("transcript"),
+                    "feedback": d.get("feedback"), "answered_at": d.get("created_at") or _created(d)})
+               for d in _newest_per_session("answers", ("session_id", "question_id")))
+    report["answers"] = sum(_fill_missing(chunk, lambda d: f"answers.{answer_key(d.get('question_id'))}", dry_run)
+                            for chunk in _chunks(answers, batch_size))
+    return report
@@ -0,0 +1,161 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timezone, timedelta
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from backend.utils.db import get_collection
+from backend.utils.tracing import log_error
+
+# a leader that dies mid-flight stops blocking others after this long;
+# a live leader renews its lock every third of it, however long the provider takes
+FLIGHT_LOCK_SECONDS = int(os.getenv("FLIGHT_LOCK_SECONDS", "30"))
+FLIGHT_WAIT_SECONDS = int(os.getenv("FLIGHT_WAIT_SECONDS", "180"))
+# how long a finished flight's result stays readable for followers
+FLIGHT_RESULT_SECONDS = 600
+FLIGHT_POLL_SECONDS = 0.25
+
+locks_col = get_collection("flight_locks")
+results_col = get_collection("flight_results")
+
+_inflight = {}
+_lock = threading.Lock()
+_owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FlightTimeout(TimeoutError):
+    """Gave up waiting for another worker's identical request to finish."""
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def single_flight(key: str, compute):
+    """
+    Run compute() at most once at a time per key, across threads and
+    processes. Concurrent callers with the same key wait for the leader and
+    get its result instead of repeating the LLM call and the insert.
+    Threads coalesce on an in-process Future; processes coalesce on a lock
+    document in flight_locks, with the result handed over via flight_results.
+    """
+    with _lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+    if not leader:
+        return future.result(timeout=FLIGHT_WAIT_SECONDS)
+
+    try:
+        result = _run_across_processes(key, compute)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+
+def _run_across_processes(key, compute):
+    deadline = time.monotonic() + FLIGHT_WAIT_SECONDS
+    while True:
+        flight = f"{_owner_prefix}:{uuid.uuid4().hex}"
+        try:
+            acquired, holder = _acquire(key, flight)
+        except PyMongoError as e:
+            # lock store unavailable: still coalesce within this process
+            log_error("single_flight_lock_unavailable", e, key=key)
+            return compute()
+
+        if acquired:
+            return _lead(key, flight, compute)
+
+        result = _follow(key, holder, deadline)
+        if result is not None:
+            return result
+        if time.monotonic() > deadline:
+            raise FlightTimeout(f"Timed out waiting for in-flight request {key}")
+        # holder gave up or its lock expired without a result; try to lead
+
+
+def _acquire(key, flight):
+    now = _now()
+    lock = {"_id": key, "flight": flight, "expires_at": now + timedelta(seconds=FLIGHT_LOCK_SECONDS)}
+    try:
+        locks_col.insert_one(lock)
+        return True, flight
+    except DuplicateKeyError:
+        pass
+    # take over a lock whose holder died
+    taken = locks_col.find_one_and_update(
+        {"_id": key, "expires_at": {"$lt": now}},
+        {"$set": {"flight": flight, "expires_at": lock["expires_at"]}},
+    )
+    if taken:
+        return True, flight
+    current = locks_col.find_one({"_id": key}, {"flight": 1})
+    return False, current["flight"] if current else None
+
+
+def _renew(key, flight, done: threading.Event):
+    """Push the lock's expiry forward until `done` is set or the lock is lost."""
+    while not done.wait(FLIGHT_LOCK_SECONDS / 3):
+        try:
+            renewed = locks_col.update_one(
+                {"_id": key, "flight": flight},
+                {"$set": {"expires_at": _now() + timedelta(seconds=FLIGHT_LOCK_SECONDS)}},
+            )
+        except PyMongoError:
+            continue
+        if not renewed.matched_count:
+            return
+
+
+def _lead(key, flight, compute):
+    done = threading.Event()
+    threading.Thread(target=_renew, args=(key, flight, done), name="single-flight-renew", daemon=True).start()
+    try:
+        result = compute()
+        # a (body, status) tuple is stored as two fields so followers get a tuple back
+        body, status = result if isinstance(result, tuple) else (result, None)
+        try:
+            results_col.replace_one(
+                {"_id": key},
+                {"_id": key, "flight": flight, "result": body, "status": status, "created_at": _now()},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            log_error("single_flight_result_not_shared", e, key=key)
+        return result
+    finally:
+        done.set()
+        try:
+            locks_col.delete_one({"_id": key, "flight": flight})
+        except PyMongoError:
+            pass
+
+
+def _follow(key, flight, deadline):
+    """Wait for the lock held by `flight` to go away, then read that flight's result."""
+    while time.monotonic() < deadline:
+        lock = locks_col.find_one({"_id": key}, {"flight": 1, "expires_at": 1})
+        if lock is None or lock["flight"] != flight:
+            break
+        expires_at = lock["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at < _now():
+            return None
+        time.sleep(FLIGHT_POLL_SECONDS)
+    doc = results_col.find_one({"_id": key, "flight": flight}, {"result": 1, "status": 1})
+    if doc is None:
+        return None
+    return doc["result"] if doc.get("status") is None else (doc["result"], doc["status"])
@@ -1,28 +1,149 @@
-from google.cloud import speech
-from google.api_core.exceptions import PermissionDenied
+import io
+import time
+import wave
+from contextlib import closing
+from backend.utils.providers import (
+    get_speech_client, provider_mode, call_provider, call_provider_stream, PROVIDER_TIMEOUT_SECONDS,
+)
+from backend.utils.tracing import traced, span_iter, log_error
 
-# Initialize once
-_speech_client = speech.SpeechClient()
+DEFAULT_SAMPLE_RATE = 44100
+# synchronous recognize() rejects audio longer than about a minute
+SYNC_MAX_SECONDS = 55
+# streaming_recognize sessions are cut off after ~5 minutes (of audio and of wall-clock); roll over before that
+STREAM_MAX_SECONDS = 240
+STREAM_CHUNK_BYTES = 32 * 1024
 
-def transcribe_audio_bytes(audio_bytes: bytes, sample_rate: int = 44100) -> str:
+# names of speech.RecognitionConfig.AudioEncoding members accepted from clients
+ENCODINGS = ("LINEAR16", "FLAC", "OGG_OPUS", "WEBM_OPUS")
+# raw PCM can be cut anywhere; the others carry their headers only at the start of the stream
+ROLLOVER_ENCODINGS = ("LINEAR16",)
+
+PERMISSION_DENIED_MESSAGE = (
+    "Cloud Speech-to-Text is not enabled on your GCP project. "
+    "Please enable speech.googleapis.com in the Cloud Console."
+)
+
+
+def _config(sample_rate: int, encoding: str = "LINEAR16"):
+    from google.cloud import speech
+    return speech.RecognitionConfig(
+        encoding=getattr(speech.RecognitionConfig.AudioEncoding, encoding),
+        sample_rate_hertz=sample_rate,
+        language_code="en-US",
+        enable_automatic_punctuation=True,
+    )
+
+
+def wav_sample_rate(audio_bytes: bytes):
+    """Sample rate from a RIFF/WAV header, or None for headerless PCM."""
+    if audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+        return None
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as wav:
+            return wav.getframerate()
+    except wave.Error:
+        return None
+
+
+@traced("speech", "recognize")
+def transcribe_audio_bytes(audio_bytes: bytes, sample_rate: int = None) -> str:
+    """
+    Send raw audio bytes to Google Speech-to-Text and return the transcript.
+    Assumes LINEAR16 PCM. The rate comes from the WAV header when present;
+    recordings too long for recognize() are routed through the streaming API.
+    """
+    sample_rate = sample_rate or wav_sample_rate(audio_bytes) or DEFAULT_SAMPLE_RATE
+    if provider_mode("speech") == "fake":
+        return call_provider("speech", get_speech_client().recognize, audio_bytes, sample_rate)
+
+    if len(audio_bytes) > SYNC_MAX_SECONDS * sample_rate * 2:
+        view = memoryview(audio_bytes)
+        chunks = (view[i:i + STREAM_CHUNK_BYTES].tobytes() for i in range(0, len(view), STREAM_CHUNK_BYTES))
+        return " ".join(r["transcript"] for r in transcribe_stream(chunks, sample_rate) if r["is_final"])
+
+    from google.cloud import speech
+    from google.api_core.exceptions import PermissionDenied
     try:
-        """
-        Send raw audio bytes to Google Speech-to-Text and return the transcript.
-        Assumes LINEAR16 PCM; adjust config if you use another codec.
-        """
         audio = speech.RecognitionAudio(content=audio_bytes)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=sample_rate,
-            language_code="en-US",
-            enable_automatic_punctuation=True,
+        response = call_provider(
+            "speech", get_speech_client().recognize,
+            config=_config(sample_rate), audio=audio, timeout=PROVIDER_TIMEOUT_SECONDS,
         )
-        response = _speech_client.recognize(config=config, audio=audio)
         # Concatenate all results
         return " ".join(result.alternatives[0].transcript for result in response.results)
     except PermissionDenied as e:
         # ServiceDisabled / API not enabled
-        raise RuntimeError(
-          "Cloud Speech-to-Text is not enabled on your GCP project. "
-          "Please enable speech.googleapis.com in the Cloud Console."
-        )   
+        raise RuntimeError(PERMISSION_DENIED_MESSAGE)
+
+
+def _stream_window(chunks, first_chunk: bytes, deadline: float, budget_bytes: int = None, window: dict = None):
+    """
+    Yield chunks for one streaming session until the wall-clock `deadline`
+    passes or, for PCM, `budget_bytes` of audio went in. `window["full"]`
+    tells the caller the session was cut short, not that the audio ended.
+    """
+    sent = 0
+    chunk = first_chunk
+    while chunk is not None:
+        yield chunk
+        sent += len(chunk)
+        if time.monotonic() >= deadline or (budget_bytes is not None and sent >= budget_bytes):
+            window["full"] = True
+            return
+        chunk = next(chunks, None)
+
+
+def transcribe_stream(chunks, sample_rate: int = 16000, encoding: str = "LINEAR16"):
+    """
+    Transcribe an iterable of audio chunks as they arrive, yielding
+    {"transcript", "is_final"} dicts for interim and final results. Only the
+    current chunk is held in memory. Long LINEAR16 recordings are split over
+    successive streaming sessions before the per-session limit. Compressed
+    encodings cannot be split mid-stream, so they end at the limit and the
+    rest of the audio is not transcribed. Each session holds a speech
+    scheduler permit and reports to the speech circuit breaker.
+    """
+    if provider_mode("speech") == "fake":
+        with closing(call_provider_stream("speech", lambda: get_speech_client().stream(chunks, sample_rate, encoding),
+                                          replayable=False)) as results:
+            yield from span_iter("speech", "stream", results)
+        return
+
+    from google.cloud import speech
+    from google.api_core.exceptions import PermissionDenied
+    streaming_config = speech.StreamingRecognitionConfig(
+        config=_config(sample_rate, encoding),
+        interim_results=True,
+    )
+    # audio sent faster than real time reaches the audio limit before the wall-clock one
+    budget_bytes = STREAM_MAX_SECONDS * sample_rate * 2 if encoding in ROLLOVER_ENCODINGS else None
+    chunks = iter(chunks)
+    try:
+        while True:
+            first = next(chunks, None)
+            if first is None:
+                return
+            window = {"full": False}
+            requests = (
+                speech.StreamingRecognizeRequest(audio_content=chunk)
+                for chunk in _stream_window(chunks, first, time.monotonic() + STREAM_MAX_SECONDS,
+                                            budget_bytes, window)
+            )
+            # a half-consumed audio stream cannot be replayed, so sessions are not retried
+            with closing(call_provider_stream("speech", lambda: get_speech_client().streaming_recognize(
+                config=streaming_config, requests=requests,
+            ), replayable=False)) as responses:
+                for response in span_iter("speech", "stream", responses):
+                    for result in response.results:
+                        if result.alternatives:
+                            yield {
+                                "transcript": result.alternatives[0].transcript.strip(),
+                                "is_final": result.is_final,
+                            }
+            if window["full"] and encoding not in ROLLOVER_ENCODINGS:
+                log_error("speech_stream_truncated", f"{encoding} answer exceeded {STREAM_MAX_SECONDS}s",
+                          encoding=encoding)
+                return
+    except PermissionDenied as e:
+        raise RuntimeError(PERMISSION_DENIED_MESSAGE)
@@ -0,0 +1,47 @@
+"""Server-sent-event helpers shared by the streaming variants of the routes."""
+import json
+from flask import Response, request, stream_with_context
+
+from backend.utils.tracing import log_error
+from backend.utils.provider_scheduler import ProviderBusyError, busy_body
+
+TRUTHY = ("1", "true", "yes")
+
+
+def wants_event_stream(payload=None) -> bool:
+    """True when the caller asked for SSE via Accept, ?stream=1 or {"stream": true}."""
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        return True
+    if request.args.get("stream", "").lower() in TRUTHY:
+        return True
+    if request.form.get("stream", "").lower() in TRUTHY:
+        return True
+    return bool(payload and payload.get("stream") is True)
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events) -> Response:
+    """
+    Stream (event, data) pairs as text/event-stream. An exception mid-way
+    becomes a final "error" event, since the 200 status has already gone out;
+    a busy provider's event carries retry_after in place of the header.
+    """
+    def body():
+        try:
+            for event, data in events:
+                yield sse_event(event, data)
+        except ProviderBusyError as e:
+            log_error("event_stream_failed", e)
+            yield sse_event("error", busy_body(e))
+        except Exception as e:
+            log_error("event_stream_failed", e)
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(body()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,155 @@
+import os
+import codecs
+from html.parser import HTMLParser
+
+from backend.utils.pdf_extract import ExtractionError, spool_upload, extract_pdf_text
+from backend.utils.tracing import span
+
+TEXT_MAX_BYTES = int(os.getenv("TEXT_MAX_BYTES", str(2 * 1024 * 1024)))
+TEXT_CHUNK_BYTES = 64 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def _detect_encoding(sample: bytes) -> tuple:
+    """Return (encoding, bom length) for the first chunk of a text upload."""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+    try:
+        # final=False tolerates a multi-byte character cut off at the chunk edge
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(sample).best()
+        if best is not None:
+            return best.encoding, 0
+    except ImportError:
+        pass
+    return "cp1252", 0
+
+
+def iter_decoded_text(file, max_bytes: int = TEXT_MAX_BYTES):
+    """
+    Decode an uploaded text file chunk by chunk. The charset is sniffed from
+    the first chunk and the rest is fed through an incremental decoder, so
+    the raw bytes are never buffered as a whole.
+    """
+    declared = file.content_length or 0
+    if declared > max_bytes:
+        raise ExtractionError(f"File is larger than {max_bytes // 1024} KB", 413)
+
+    stream = file.stream
+    first = stream.read(TEXT_CHUNK_BYTES)
+    encoding, skip = _detect_encoding(first)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    size = len(first)
+    yield decoder.decode(first[skip:])
+    while True:
+        chunk = stream.read(TEXT_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise ExtractionError(f"File is larger than {max_bytes // 1024} KB", 413)
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def extract_plain_text(file) -> str:
+    return "".join(iter_decoded_text(file))
+
+
+class _HTMLTextParser(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "template", "head"}
+    _BLOCK = {"p", "div", "br", "li", "ul", "ol", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+        if tag == "li":
+            self.parts.append("- ")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def extract_html_text(file) -> str:
+    parser = _HTMLTextParser()
+    for piece in iter_decoded_text(file):
+        parser.feed(piece)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def extract_docx_text(file) -> str:
+    try:
+        import docx  # python-docx, only needed for .docx uploads
+    except ImportError:
+        raise ExtractionError("DOCX support is not installed on this server", 415)
+
+    path, _ = spool_upload(file, suffix=".docx")
+    try:
+        document = docx.Document(path)
+    except Exception as e:
+        raise ExtractionError(f"Could not open DOCX: {e}")
+    finally:
+        os.remove(path)
+    parts = [p.text for p in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            parts.append(" | ".join(cell.text for cell in row.cells))
+    return "\n".join(p for p in parts if p.strip())
+
+
+# extension -> extractor(FileStorage) -> str; add entries with register_extractor
+EXTRACTORS = {
+    ".txt": extract_plain_text,
+    ".md": extract_plain_text,
+    ".html": extract_html_text,
+    ".htm": extract_html_text,
+    ".docx": extract_docx_text,
+    ".pdf": extract_pdf_text,
+}
+
+
+def register_extractor(extension: str, extractor):
+    EXTRACTORS[extension.lower()] = extractor
+
+
+def supported_extensions() -> list:
+    return sorted(EXTRACTORS)
+
+
+def extract_upload_text(file) -> str:
+    """Dispatch an upload to the extractor registered for its file extension."""
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ExtractionError(f"Unsupported file type; use one of {', '.join(supported_extensions())}", 415)
+    with span("extract", extension.lstrip(".")):
+        return extractor(file)
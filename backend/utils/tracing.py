@@ -0,0 +1,297 @@
+"""
+Request-scoped timing for the hot path. Work is wrapped in
+span(kind, name): "db" (every MongoDB command, via a pymongo command
+listener), "pdf"/"extract", "prompt", "llm" (with token counts), "speech",
+"audio", "parse" and "score". For each request the spans are
+
+- summed per kind into a Server-Timing header (visible in browser devtools),
+- written as one JSON log line with the route, status and any error,
+- folded into process-wide histograms served by /metrics in the
+  Prometheus text format.
+
+Spans outside a request (async jobs, CLI) still feed the histograms. Each
+span costs two perf_counter() calls and one lock, so tracing stays on in
+production; TRACING_ENABLED=0 turns it off. Under gunicorn every worker
+keeps its own metrics, so scrape workers individually or sum per pid.
+"""
+import os
+import json
+import bisect
+import time
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+# histogram bucket bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# a runaway loop should not grow one request's trace without bound
+MAX_SPANS_PER_REQUEST = 500
+
+logger = logging.getLogger("backend.requests")
+
+_current = contextvars.ContextVar("careerpilot_trace", default=None)
+
+
+class Trace:
+    """Spans collected for one request."""
+
+    __slots__ = ("started", "spans", "errors", "dropped")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.errors = []
+        self.dropped = 0
+
+    def add(self, kind: str, seconds: float, attrs: dict):
+        if len(self.spans) < MAX_SPANS_PER_REQUEST:
+            self.spans.append((kind, seconds, attrs))
+        else:
+            self.dropped += 1
+
+    def by_kind(self) -> dict:
+        totals = {}
+        for kind, seconds, attrs in self.spans:
+            entry = totals.setdefault(kind, {"ms": 0.0, "count": 0})
+            entry["ms"] += seconds * 1000
+            entry["count"] += 1
+            for key in ("input_tokens", "output_tokens"):
+                if key in attrs:
+                    entry[key] = entry.get(key, 0) + attrs[key]
+        return totals
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values: tuple, seconds: float):
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                # one slot per bucket plus overflow, then sum and count; cumulated in render()
+                series = self._series[values] = [0] * (len(BUCKETS) + 1) + [0.0, 0]
+            series[bisect.bisect_left(BUCKETS, seconds)] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        for values, series in items:
+            labels = _labels(self.labels, values)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values: tuple, amount: float = 1):
+        with self._lock:
+            self._series[values] = self._series.get(values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._series.items())
+        lines.extend(f"{self.name}{{{_labels(self.labels, values)}}} {amount:g}" for values, amount in items)
+        return lines
+
+
+class Gauge:
+    """Current values read from `collect()` (a {label values: number} dict) at scrape time."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple, collect):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.collect = collect
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        lines.extend(f"{self.name}{{{_labels(self.labels, values)}}} {value:g}"
+                     for values, value in sorted(self.collect().items()))
+        return lines
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return ",".join(f'{n}="{v}"' for n, v in zip(names, escaped))
+
+
+REQUEST_SECONDS = Histogram("careerpilot_request_duration_seconds",
+                            "Time to produce a response (streamed bodies excluded).", ("route", "method", "status"))
+SPAN_SECONDS = Histogram("careerpilot_span_duration_seconds", "Time spent per span kind and name.", ("kind", "name"))
+SPAN_ERRORS = Counter("careerpilot_span_errors_total", "Spans that raised.", ("kind", "name", "error"))
+LLM_TOKENS = Counter("careerpilot_llm_tokens_total", "LLM tokens by direction.", ("model", "direction"))
+_METRICS = [REQUEST_SECONDS, SPAN_SECONDS, SPAN_ERRORS, LLM_TOKENS]
+
+
+def register_metric(metric):
+    """Add a Histogram, Counter or Gauge from another module to /metrics."""
+    _METRICS.append(metric)
+
+
+def record(kind: str, name: str, seconds: float, attrs: dict = None):
+    """Record a finished span: the histograms always, the current request's trace if any."""
+    if not TRACING_ENABLED:
+        return
+    attrs = attrs or {}
+    SPAN_SECONDS.observe((kind, name), seconds)
+    if "error" in attrs:
+        SPAN_ERRORS.inc((kind, name, attrs["error"]))
+    if "model" in attrs:
+        for direction in ("input", "output"):
+            tokens = attrs.get(f"{direction}_tokens")
+            if tokens:
+                LLM_TOKENS.inc((attrs["model"], direction), tokens)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(kind, seconds, {"name": name, **attrs})
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    """
+    Time the enclosed block. Yields the attrs dict so the block can attach
+    results such as token counts; an exception is recorded and re-raised.
+    """
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record(kind, name, time.perf_counter() - started, attrs)
+
+
+def traced(kind: str, name: str = None):
+    """Decorator form of span() for whole functions."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def span_iter(kind: str, name: str, iterable, **attrs):
+    """Yield from `iterable` inside one span, for generators and streamed responses."""
+    with span(kind, name, **attrs):
+        yield from iterable
+
+
+def log_error(event: str, error, **fields):
+    """
+    Structured replacement for print()-ing an error: one JSON log line, also
+    attached to the current request's log entry. `error` is an exception or
+    a message.
+    """
+    entry = {"event": event, "error": str(error)}
+    if isinstance(error, BaseException):
+        entry["error_type"] = type(error).__name__
+    trace = _current.get()
+    if trace is not None:
+        trace.errors.append(dict(entry))
+    logger.error(json.dumps({**entry, **fields}, default=str))
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Turns every MongoDB command into a "db" span; pymongo reports the duration itself."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record("db", event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        failure = event.failure if isinstance(event.failure, dict) else {}
+        record("db", event.command_name, event.duration_micros / 1e6,
+               {"error": str(failure.get("codeName", "CommandFailure"))})
+
+
+def server_timing(trace: Trace, total_seconds: float) -> str:
+    parts = [f'{kind};dur={entry["ms"]:.1f};desc="{entry["count"]}x"' for kind, entry in sorted(trace.by_kind().items())]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def install(app):
+    """Trace every request on `app`: Server-Timing header, JSON request log, request histogram."""
+    if not TRACING_ENABLED:
+        return
+    from flask import request
+
+    @app.before_request
+    def _start_trace():
+        request.environ["careerpilot.trace"] = _current.set(Trace())
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = _current.get()
+        if trace is None:
+            return response
+        elapsed = time.perf_counter() - trace.started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe((route, request.method, str(response.status_code)), elapsed)
+        response.headers["Server-Timing"] = server_timing(trace, elapsed)
+
+        entry = {
+            "event": "request",
+            "method": request.method,
+            "route": route,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 1),
+            "spans": {kind: {k: round(v, 1) if isinstance(v, float) else v for k, v in totals.items()}
+                      for kind, totals in trace.by_kind().items()},
+        }
+        if trace.errors:
+            entry["errors"] = trace.errors
+        if trace.dropped:
+            entry["dropped_spans"] = trace.dropped
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        logger.log(level, json.dumps(entry, default=str))
+        return response
+
+    @app.teardown_request
+    def _end_trace(exc=None):
+        token = request.environ.pop("careerpilot.trace", None)
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:  # teardown ran in another context, e.g. after a streamed body
+                _current.set(None)
@@ -0,0 +1,492 @@
+"""
+Write-behind persistence for documents a response does not have to wait
+for: uploaded texts, analysis outputs, match scores and interview answers.
+insert_later() buffers a document in-process and returns at once; one flusher
+thread per process writes the buffer as unordered bulk_write batches per
+collection. A flush runs as soon as WRITE_BATCH_SIZE documents are
+waiting, or WRITE_FLUSH_INTERVAL_MS after the oldest one arrived.
+
+- Durability: batches use WRITE_CONCERN_W (default "majority", Atlas's own
+  default) with WRITE_CONCERN_TIMEOUT_MS. Network errors retry the batch
+  with backoff. _id is assigned at insert_later() time, so a retried batch cannot
+  duplicate documents. drain() and interpreter exit flush what is left.
+- Backpressure: at most WRITE_BUFFER_MAX documents are buffered. When
+  MongoDB falls behind, insert_later() waits up to WRITE_BACKPRESSURE_SECONDS for
+  room and then writes synchronously, so memory stays bounded and nothing
+  is dropped.
+- Upserts: upsert_later() buffers a $set on one document. Updates to the
+  same _id in a batch are merged into one UpdateOne (later fields win), so
+  an unordered batch cannot apply them out of order.
+- Read-your-writes: readers go through find_one()/await_pending(), which
+  first push this process's pending writes for the same session_id (or
+  collection) to MongoDB. Across gunicorn workers, install() holds each
+  response until the request's writes to READ_YOUR_WRITES_COLLECTIONS
+  (the session documents and uploaded texts later requests read) are
+  acknowledged; durable_writes() does the same for background jobs. Those
+  writes still share batches with concurrent requests. Append-only logs
+  (match_scores, answers) stay behind the response. Streamed responses
+  settle when the stream ends.
+- Documents are BSON-encoded when they are buffered, so a value MongoDB
+  cannot store raises in the caller, as insert_one() would.
+
+WRITE_BEHIND_ENABLED=0 writes every document synchronously, as before.
+"""
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import defaultdict
+
+import bson
+from bson import ObjectId
+from flask import has_request_context, jsonify, request
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from pymongo.write_concern import WriteConcern
+
+from backend.utils.db import get_collection
+from backend.utils.tracing import Counter, Gauge, log_error, register_metric, span
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+WRITE_FLUSH_INTERVAL_MS = int(os.getenv("WRITE_FLUSH_INTERVAL_MS", "50"))
+WRITE_BUFFER_MAX = int(os.getenv("WRITE_BUFFER_MAX", "5000"))
+WRITE_BACKPRESSURE_SECONDS = float(os.getenv("WRITE_BACKPRESSURE_SECONDS", "2"))
+# a batch that keeps failing on network errors is given up after this many attempts
+WRITE_MAX_ATTEMPTS = int(os.getenv("WRITE_MAX_ATTEMPTS", "5"))
+# how long a reader waits for its session's pending writes before reading anyway
+READ_YOUR_WRITES_TIMEOUT_SECONDS = float(os.getenv("READ_YOUR_WRITES_TIMEOUT_SECONDS", "5"))
+WRITE_CONCERN_W = os.getenv("WRITE_CONCERN_W", "majority")
+WRITE_CONCERN_TIMEOUT_MS = int(os.getenv("WRITE_CONCERN_TIMEOUT_MS", "10000"))
+# collections a follow-up request may read from another worker; writes to them settle before the response
+READ_YOUR_WRITES_COLLECTIONS = frozenset(
+    c.strip() for c in os.getenv("READ_YOUR_WRITES_COLLECTIONS", "sessions,documents").split(",") if c.strip())
+
+DUPLICATE_KEY = 11000
+
+WRITES = Counter("careerpilot_write_behind_documents_total", "Buffered documents by outcome.",
+                 ("collection", "outcome"))
+
+
+def write_concern() -> WriteConcern:
+    w = int(WRITE_CONCERN_W) if WRITE_CONCERN_W.isdigit() else WRITE_CONCERN_W
+    return WriteConcern(w=w, wtimeout=WRITE_CONCERN_TIMEOUT_MS or None)
+
+
+class _Pending:
+    """A document to insert, or (with upsert_id) the $set fields for one upserted document."""
+
+    __slots__ = ("collection", "doc", "session_id", "upsert_id", "on_insert", "on_written", "queued_at", "attempts",
+                 "outcome")
+
+    def __init__(self, collection: str, doc: dict, session_id=None, upsert_id=None, on_insert=None, on_written=None):
+        self.collection = collection
+        self.doc = doc
+        self.session_id = session_id
+        self.upsert_id = upsert_id
+        self.on_insert = on_insert or {}
+        self.on_written = on_written
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+        self.outcome = None
+
+
+def _requests(items: list):
+    """(bulk_write requests, the _Pending items behind each request) for one collection."""
+    requests, owners, upserts = [], [], {}
+    for item in items:
+        if item.upsert_id is None:
+            requests.append(InsertOne(item.doc))
+            owners.append([item])
+            continue
+        index = upserts.get(item.upsert_id)
+        if index is None:
+            index = upserts[item.upsert_id] = len(requests)
+            requests.append(({}, {}))
+            owners.append([])
+        fields, on_insert = requests[index]
+        fields.update(item.doc)
+        for key, value in item.on_insert.items():
+            on_insert.setdefault(key, value)
+        owners[index].append(item)
+    for upsert_id, index in upserts.items():
+        fields, on_insert = requests[index]
+        # content-addressed documents upsert with $setOnInsert alone; MongoDB rejects an empty $set
+        update = {"$set": fields} if fields else {}
+        on_insert = {k: v for k, v in on_insert.items() if k not in fields}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+        requests[index] = UpdateOne({"_id": upsert_id}, update, upsert=True)
+    return requests, owners
+
+
+class WriteBehindBuffer:
+    """The in-process buffer and its flusher thread."""
+
+    def __init__(self):
+        self.items = []
+        self.cond = threading.Condition()
+        # (collection, session_id) and collection -> documents buffered or being written
+        self.by_session = defaultdict(int)
+        self.by_collection = defaultdict(int)
+        # collection -> readers blocked in await_pending()
+        self.awaited = defaultdict(int)
+        self.urgent = False
+        self.stopping = False
+        self.thread = None
+        self.stats = {"queued": 0, "written": 0, "failed": 0, "retried_batches": 0, "batches": 0,
+                      "sync_writes": 0, "backpressure_waits": 0, "max_batch": 0, "last_flush_ms": 0.0}
+
+    def _start(self):
+        if self.thread is None or not self.thread.is_alive():
+            # started lazily so gunicorn workers get their own thread after fork
+            self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self.thread.start()
+
+    def add(self, item: _Pending) -> bool:
+        """Buffer `item`; False when the buffer stayed full (or is shut down) and the caller must write it."""
+        with self.cond:
+            if self.stopping:
+                return False
+            if len(self.items) >= WRITE_BUFFER_MAX:
+                self.stats["backpressure_waits"] += 1
+                self.urgent = True
+                self.cond.notify_all()
+                if not self.cond.wait_for(lambda: len(self.items) < WRITE_BUFFER_MAX or self.stopping,
+                                          WRITE_BACKPRESSURE_SECONDS) or self.stopping:
+                    return False
+            self.items.append(item)
+            self.by_collection[item.collection] += 1
+            if item.session_id is not None:
+                self.by_session[(item.collection, item.session_id)] += 1
+            self.stats["queued"] += 1
+            self._start()
+            # the first document starts the flush timer, a full batch flushes at once
+            if len(self.items) == 1 or len(self.items) >= WRITE_BATCH_SIZE:
+                self.cond.notify_all()
+            return True
+
+    def _due(self):
+        """Seconds until the next flush should run (0 = now, None = nothing buffered); call with the lock held."""
+        if not self.items:
+            return None
+        if self.urgent or self.stopping or len(self.items) >= WRITE_BATCH_SIZE:
+            return 0.0
+        return max(0.0, self.items[0].queued_at + WRITE_FLUSH_INTERVAL_MS / 1000 - time.monotonic())
+
+    def _run(self):
+        while True:
+            try:
+                if self._flush_once():
+                    return
+            except Exception as e:
+                # never let one bad batch stop the flusher; _write has already settled its documents
+                log_error("write_behind_flusher_error", e)
+
+    def _flush_once(self) -> bool:
+        """Wait for and write one batch; True once stopping with nothing left."""
+        with self.cond:
+            while True:
+                due = self._due()
+                if due == 0:
+                    break
+                if due is None and self.stopping:
+                    return True
+                self.cond.wait(due)
+            batch = self.items[:WRITE_BATCH_SIZE]
+            del self.items[:WRITE_BATCH_SIZE]
+            if not self.items:
+                self.urgent = False
+            # room in the buffer again for inserts held back by backpressure
+            self.cond.notify_all()
+        retry = self._write(batch)
+        if retry:
+            delay = min(5.0, 0.1 * 2 ** retry[0].attempts)
+            with self.cond:
+                self.items[:0] = retry
+                self.cond.wait(delay)
+        return False
+
+    def _write(self, batch: list) -> list:
+        """Write one batch, one bulk_write per collection; returns the documents to retry."""
+        started = time.perf_counter()
+        groups = defaultdict(list)
+        for item in batch:
+            groups[item.collection].append(item)
+        with self.cond:
+            # collections a reader is blocked on go first
+            order = sorted(groups, key=lambda c: not self.awaited.get(c))
+        retry = []
+        for collection in order:
+            items = groups[collection]
+            requests, owners = _requests(items)
+            done = []
+            col = get_collection(collection).with_options(write_concern=write_concern())
+            try:
+                with span("db", "write_behind", collection=collection, documents=len(items)):
+                    col.bulk_write(requests, ordered=False)
+                done.extend((item, "written") for item in items)
+            except BulkWriteError as e:
+                # with ordered=False every other request was applied
+                errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+                for index, owned in enumerate(owners):
+                    err = errors.get(index)
+                    for item in owned:
+                        if err is None or (err.get("code") == DUPLICATE_KEY and item.upsert_id is None):
+                            # a duplicate _id on insert means an earlier attempt landed
+                            done.append((item, "written"))
+                        elif err.get("code") == DUPLICATE_KEY and item.attempts + 1 < WRITE_MAX_ATTEMPTS:
+                            # two workers raced to upsert the same new document; the retry updates it
+                            item.attempts += 1
+                            retry.append(item)
+                        else:
+                            done.append((item, "failed"))
+                if e.details.get("writeConcernErrors"):
+                    log_error("write_behind_unacknowledged", str(e.details["writeConcernErrors"][0].get("errmsg")),
+                              collection=collection, documents=len(items))
+                for index, err in errors.items():
+                    if err.get("code") != DUPLICATE_KEY:
+                        log_error("write_behind_failed", err.get("errmsg", "write error"),
+                                  collection=collection, session_id=owners[index][0].session_id)
+            except PyMongoError as e:
+                for item in items:
+                    item.attempts += 1
+                    if item.attempts < WRITE_MAX_ATTEMPTS:
+                        retry.append(item)
+                    else:
+                        done.append((item, "failed"))
+                log_error("write_behind_batch_failed", e, collection=collection, documents=len(items),
+                          will_retry=len(done) < len(items))
+            except Exception as e:
+                # not a MongoDB error, so retrying the same documents would fail the same way
+                done = [(item, "failed") for item in items]
+                log_error("write_behind_batch_failed", e, collection=collection, documents=len(items),
+                          will_retry=False)
+            self._finish(done)
+        with self.cond:
+            self.stats["batches"] += 1
+            self.stats["retried_batches"] += int(bool(retry))
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return retry
+
+    def _finish(self, done: list):
+        """Settle written/failed documents and wake readers waiting on them."""
+        with self.cond:
+            for item, outcome in done:
+                item.outcome = outcome
+                self._forget(item)
+                self.stats[outcome] += 1
+                WRITES.inc((item.collection, outcome))
+            self.cond.notify_all()
+        for item, outcome in done:
+            if outcome == "written" and item.on_written:
+                item.on_written()
+
+    def _forget(self, item: _Pending):
+        self.by_collection[item.collection] -= 1
+        if not self.by_collection[item.collection]:
+            del self.by_collection[item.collection]
+        if item.session_id is not None:
+            key = (item.collection, item.session_id)
+            self.by_session[key] -= 1
+            if not self.by_session[key]:
+                del self.by_session[key]
+
+    def await_pending(self, collection: str, session_ids=None, timeout: float = READ_YOUR_WRITES_TIMEOUT_SECONDS) -> bool:
+        """Flush now and wait until nothing for `collection` (and `session_ids`, if given) is pending."""
+        def settled():
+            if session_ids is None:
+                return not self.by_collection.get(collection)
+            return not any(self.by_session.get((collection, sid)) for sid in session_ids)
+
+        with self.cond:
+            if settled():
+                return True
+            self.urgent = True
+            self.awaited[collection] += 1
+            self.cond.notify_all()
+            try:
+                return self.cond.wait_for(settled, timeout)
+            finally:
+                self.awaited[collection] -= 1
+                if not self.awaited[collection]:
+                    del self.awaited[collection]
+
+    def await_items(self, items: list, timeout: float = READ_YOUR_WRITES_TIMEOUT_SECONDS) -> bool:
+        """Flush now and wait until every one of `items` is written or has failed."""
+        collections = {item.collection for item in items}
+        with self.cond:
+            if all(item.outcome for item in items):
+                return True
+            self.urgent = True
+            for collection in collections:
+                self.awaited[collection] += 1
+            self.cond.notify_all()
+            try:
+                return self.cond.wait_for(lambda: all(item.outcome for item in items), timeout)
+            finally:
+                for collection in collections:
+                    self.awaited[collection] -= 1
+                    if not self.awaited[collection]:
+                        del self.awaited[collection]
+
+    def flush(self, timeout: float) -> int:
+        """Stop buffering, write everything within `timeout`; returns how many documents are still unwritten."""
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+        with self.cond:
+            return sum(self.by_collection.values())
+
+    def depth(self) -> dict:
+        with self.cond:
+            return dict(self.by_collection)
+
+
+_buffer = WriteBehindBuffer()
+# buffered writes the current background job must see acknowledged before it finishes
+_job_writes = ContextVar("write_behind_job_writes", default=None)
+
+
+class WriteNotDurable(Exception):
+    """A write a follow-up request depends on failed, or was not acknowledged in time."""
+
+    status_code = 503
+
+
+def _track(item: _Pending):
+    """Remember `item` for the current request or job if later requests will read it."""
+    if item.collection not in READ_YOUR_WRITES_COLLECTIONS:
+        return
+    tracked = request.environ.get("careerpilot.writes") if has_request_context() else _job_writes.get()
+    if tracked is not None:
+        tracked.append(item)
+
+
+def _settle(items: list):
+    """Wait for `items`; raise WriteNotDurable if any failed or is still unwritten."""
+    if not items:
+        return
+    with span("db", "read_your_writes", documents=len(items)):
+        acknowledged = _buffer.await_items(items)
+    failed = [item for item in items if item.outcome != "written"]
+    if failed:
+        log_error("write_behind_not_durable", "timed out" if not acknowledged else "write failed",
+                  collection=failed[0].collection, session_id=failed[0].session_id, documents=len(failed))
+        raise WriteNotDurable("Your changes could not be saved; please try again")
+
+
+def _buffered(item: _Pending) -> bool:
+    """Buffer `item`; False when the caller has to write it synchronously."""
+    if not (WRITE_BEHIND_ENABLED and _buffer.add(item)):
+        with _buffer.cond:
+            _buffer.stats["sync_writes"] += 1
+        return False
+    _track(item)
+    return True
+
+
+def insert_later(collection: str, doc: dict) -> dict:
+    """
+    insert_one() off the request path. `doc` gets its _id immediately, so
+    newest-first reads by _id keep insertion order.
+    """
+    doc.setdefault("_id", ObjectId())
+    bson.encode(doc)  # InvalidDocument here, not in the flusher
+    if not _buffered(_Pending(collection, doc, doc.get("session_id"))):
+        get_collection(collection).with_options(write_concern=write_concern()).insert_one(doc)
+    return doc
+
+
+def upsert_later(collection: str, _id, fields: dict, on_insert: dict = None, session_id=None, on_written=None):
+    """
+    update_one({"_id": _id}, {"$set": fields, "$setOnInsert": on_insert},
+    upsert=True) off the request path. `session_id` makes the write visible
+    to find_one(..., session_id=...) readers; `on_written()` is called once
+    the write is acknowledged, and never if it fails.
+    """
+    item = _Pending(collection, fields, session_id, _id, on_insert, on_written)
+    bson.encode({"_id": _id, "$set": fields, "$setOnInsert": item.on_insert})
+    if not _buffered(item):
+        requests, _ = _requests([item])
+        get_collection(collection).with_options(write_concern=write_concern()).bulk_write(requests)
+        if on_written:
+            on_written()
+
+
+def await_pending(collection: str, session_ids=None) -> bool:
+    """Make this process's buffered writes for `collection` (optionally only `session_ids`) visible."""
+    return _buffer.await_pending(collection, session_ids)
+
+
+def find_one(collection: str, filter: dict, *args, session_id=None, **kwargs):
+    """
+    find_one() that sees writes buffered by insert_later()/upsert_later():
+    this process's pending writes for the session (`session_id`, else the
+    filter's) are flushed first. Writes from other workers were settled
+    before their response (see install()).
+    """
+    session_id = session_id if session_id is not None else filter.get("session_id")
+    await_pending(collection, None if session_id is None else [session_id])
+    return get_collection(collection).find_one(filter, *args, **kwargs)
+
+
+@contextmanager
+def durable_writes():
+    """For background jobs: writes to READ_YOUR_WRITES_COLLECTIONS inside the block are acknowledged when it exits."""
+    items = []
+    token = _job_writes.set(items)
+    try:
+        yield
+    finally:
+        _job_writes.reset(token)
+    _settle(items)
+
+
+def install(app):
+    """Hold each response until the request's writes to READ_YOUR_WRITES_COLLECTIONS are acknowledged."""
+
+    @app.before_request
+    def _track_writes():
+        request.environ["careerpilot.writes"] = []
+
+    @app.after_request
+    def _settle_writes(response):
+        if response.is_streamed:
+            return response  # writes made while streaming settle in teardown
+        try:
+            _settle(request.environ.pop("careerpilot.writes", []))
+        except WriteNotDurable as e:
+            response = jsonify({"error": str(e)})
+            response.status_code = e.status_code
+        return response
+
+    @app.teardown_request
+    def _settle_streamed_writes(exc=None):
+        try:
+            _settle(request.environ.pop("careerpilot.writes", []))
+        except WriteNotDurable:
+            pass  # the stream has been sent; _settle logged it
+
+
+def flush(timeout: float) -> int:
+    """Write everything buffered, for shutdown; returns how many documents are still unwritten."""
+    return _buffer.flush(timeout)
+
+
+def write_behind_stats() -> dict:
+    with _buffer.cond:
+        stats = dict(_buffer.stats)
+    return {"enabled": WRITE_BEHIND_ENABLED, "pending": _buffer.depth(), **stats}
+
+
+register_metric(WRITES)
+register_metric(Gauge("careerpilot_write_behind_pending", "Documents buffered or being written.",
+                      ("collection",), lambda: {(c,): n for c, n in _buffer.depth().items()}))
+atexit.register(flush, READ_YOUR_WRITES_TIMEOUT_SECONDS)
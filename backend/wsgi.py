@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+"""
+from backend.app import create_app
+
+app = create_app()